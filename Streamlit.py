@@ -4,13 +4,178 @@
 # In[ ]:
 
 
+import json
+import os
+import time
+
 import streamlit as st
 import pandas as pd
 from PIL import Image
 
+import charts
+import cube
+import quality
+import table_view
+from columnar import read_encoded
+from loader import fingerprint, load_sales
+import outliers
+import profiling
+from preprocessing import fill_missing
+
+
+# O fingerprint do arquivo faz parte da chave do cache: se o CSV mudar, o dataset é recarregado
+@st.cache_data
+def load_data(path, version):
+    return load_sales(path)
+
+
+@st.cache_data
+def load_csv(path, version):
+    return pd.read_csv(path)
+
+
+@st.cache_data
+def load_quality_report(path, version):
+    return quality.load_report(path)
+
+
+# cache_resource devolve o mesmo objeto a todas as sessões, sem copiar: as colunas continuam
+# apontando para o memory-map do arquivo Arrow
+@st.cache_resource
+def load_encoded(path, version):
+    return read_encoded(path)
+
+
+# Dados limpos e sem outliers, calculados uma vez por versão do dataset e compartilhados
+# pelas agregações, pelo relatório de outliers e pelo cubo
+@st.cache_data
+def filtered_data(path, version):
+    return outliers.remove_outliers(fill_missing(load_data(path, version)))
+
+
+# Agregações dos gráficos, recalculadas apenas quando o dataset muda
+@st.cache_data
+def analysis_aggregates(path, version):
+    df, _ = filtered_data(path, version)
+    return charts.compute_aggregates(df)
+
+
+@st.cache_data
+def outlier_report(path, version):
+    _, report = filtered_data(path, version)
+    return report
+
+
+# Cubo de agregação dos dados sem outliers; cache_resource evita copiar os arrays a cada consulta
+@st.cache_resource
+def purchase_cube(path, version):
+    df, _ = filtered_data(path, version)
+    return cube.build(df)
+
+
+@st.cache_data
+def correlation_table(path, version):
+    return charts.correlation(load_encoded(path, version))
+
+
+# Índice filtrado/ordenado de cada tabela; trocar de página não recalcula o índice
+@st.cache_data(max_entries=32)
+def table_index(name, version, filters, sort_by, ascending, _df):
+    return table_view.query_index(_df, filters, sort_by, ascending)
+
+
+def show_table(name, df, version):
+    # Cabeçalho com o resumo do dataset
+    summary = table_view.summarize(df)
+    col1, col2, col3 = st.columns(3)
+    col1.metric('Registros', f"{summary['rows']:,}".replace(',', '.'))
+    col2.metric('Colunas', summary['columns'])
+    col3.metric('Memória', f"{summary['memory_mb']:.1f} MB")
+    with st.expander('Tipos das colunas'):
+        st.dataframe(summary['dtypes'])
+
+    with st.expander('Filtros e ordenação'):
+        filters = []
+        for column in df.columns:
+            choices = table_view.filter_choices(df, column)
+            if choices is not None:
+                selected = st.multiselect(column, choices, key=f'{name}_{column}')
+                if selected:
+                    filters.append((column, 'in', tuple(selected)))
+            elif pd.api.types.is_numeric_dtype(df[column]):
+                low, high = float(df[column].min()), float(df[column].max())
+                selected = st.slider(column, low, high, (low, high), key=f'{name}_{column}')
+                if selected != (low, high):
+                    filters.append((column, 'range', selected))
+        sort_by = st.selectbox('Ordenar por', [None] + list(df.columns), key=f'{name}_sort')
+        ascending = st.radio('Ordem', ['Crescente', 'Decrescente'], horizontal=True,
+                             key=f'{name}_order') == 'Crescente'
+
+    index = table_index(name, version, tuple(filters), sort_by, ascending, df)
+
+    col1, col2 = st.columns([1, 3])
+    page_size = col1.selectbox('Linhas por página', table_view.PAGE_SIZES, key=f'{name}_page_size')
+    pages = table_view.page_count(len(index), page_size)
+    # Se os filtros reduzirem o número de páginas, volta para a última página válida
+    if st.session_state.get(f'{name}_page', 1) > pages:
+        st.session_state[f'{name}_page'] = pages
+    page = col2.number_input(f'Página (de {pages})', 1, pages, key=f'{name}_page')
+    st.dataframe(table_view.get_page(df, index, page, page_size))
+    st.caption(f'{len(index):,} registros após os filtros'.replace(',', '.'))
+
+
+def show_image(path, caption):
+    with profiling.section(f'imagem {path}'):
+        st.image(Image.open(path), caption=caption)
+
+
+def cube_explorer(purchases):
+    st.subheader('Explorador de compras')
+    st.write('Combine filtros e escolha até duas dimensões para detalhar o valor das compras:')
+    filters = {}
+    with st.expander('Filtros', expanded=True):
+        columns = st.columns(4)
+        for i, (name, labels) in enumerate(purchases.dimensions.items()):
+            selected = columns[i % 4].multiselect(name, labels, key=f'cube_{name}')
+            if selected:
+                filters[name] = selected
+    col1, col2 = st.columns(2)
+    by = col1.multiselect('Detalhar por', list(purchases.dimensions), default=['Age'], max_selections=2,
+                          key='cube_by')
+    measure = col2.selectbox('Medida', cube.MEASURES, index=2, key='cube_measure')
+
+    start = time.perf_counter()
+    table = purchases.query(filters, by)
+    seconds = time.perf_counter() - start
+    rows = int(table['Registros'].sum())
+    st.caption(f'{rows:,}'.replace(',', '.') + f' registros, consulta em {seconds * 1e3:.1f} ms')
+    if not by:
+        st.metric(measure, f'{table[measure].iloc[0]:.2f}' if len(table) else '-')
+    else:
+        st.altair_chart(charts.cube_chart(table, by, measure), width='stretch')
+    st.dataframe(table, hide_index=True)
+
+
+def debug_panel(run):
+    st.title('Desempenho do dashboard')
+    col1, col2, col3 = st.columns(3)
+    col1.metric('Execução', f'{run.number} ({run.kind})')
+    col2.metric('Tempo total', f'{run.seconds * 1e3:.0f} ms')
+    col3.metric('Memória (RSS)', f'{run.rss_delta / 1e6:+.1f} MB')
+    st.write('Trechos desta execução:')
+    st.dataframe(run.table(), hide_index=True)
+    st.write('Execução fria (primeira do processo) x execuções quentes:')
+    st.dataframe(profiling.summary(), hide_index=True)
+    st.download_button('Baixar trace (chrome://tracing)', json.dumps(profiling.trace()),
+                       file_name=profiling.TRACE_PATH, mime='application/json')
+
+
 def function():
     
     st.set_page_config(layout='wide')
+    run = profiling.start_run()
+    # Painel de desempenho: pela barra lateral ou abrindo o dashboard com ?debug=1
+    debug = st.sidebar.checkbox('Painel de desempenho', value=st.query_params.get('debug') == '1')
     
     st.title('Dashboard do Projeto - Black Friday Sales')
     st.write('''O objetivo do projeto é entender o comportamento (valor) de compra do cliente em relação a vários produtos de diversas categorias, durante a Black Friday.
@@ -18,9 +183,11 @@ def function():
     Com isso, pretende-se mensurar o valor da compra de um cliente com base em um determinado conjunto de características.''')
     
     st.subheader('Dataset original')
-    data = pd.read_csv('black_friday_sales.csv')
-    df = pd.DataFrame(data)
-    st.write(df)
+    with profiling.section('leitura do dataset original'):
+        version = fingerprint('black_friday_sales.csv')
+        df = load_data('black_friday_sales.csv', version)
+    with profiling.section('tabela do dataset original'):
+        show_table('original', df, version)
 
     st.subheader('Entendendo as variáveis:')
     st.markdown('''
@@ -37,32 +204,39 @@ def function():
     - **Product_Category_3:** categoria terciária do produto
     - **Purchase:** valor da compra (variável alvo)''')
 
+    if os.path.exists(quality.REPORT_PATH):
+        with profiling.section('qualidade dos dados'):
+            st.subheader('Qualidade dos dados')
+            report = load_quality_report(quality.REPORT_PATH, fingerprint(quality.REPORT_PATH))
+            col1, col2, col3 = st.columns(3)
+            col1.metric('Registros', f"{report['rows']:,}".replace(',', '.'))
+            col2.metric('Duplicados', report['duplicates'])
+            col3.metric('Regras violadas', len(report['breaches']))
+            st.dataframe(quality.summary(report))
+            for breach in report['breaches']:
+                st.warning(breach)
+
     st.title('Análise Exploratória dos dados')
     st.write('Iniciamos o projeto tratando os dados ausentes:')
     
     col1, col2 = st.columns(2)
     
     with col1:
-        img = Image.open('ausentes.png')
-        st.image(img, caption='Visualizando os dados ausentes')
+        show_image('ausentes.png', 'Visualizando os dados ausentes')
     
     with col2:
-        img = Image.open('ausentes_2.png')
-        st.image(img, caption='Verificando se os dados ausentes foram tratados')
+        show_image('ausentes_2.png', 'Verificando se os dados ausentes foram tratados')
 
     st.write('Em seguida, foi analisada a variável alvo:')
 
     st.subheader('Gráfico de Distribuição da variável alvo - Purchase')
-    img = Image.open('distribuicao.png')
-    st.image(img, caption='Distribuição de Purchase')
+    show_image('distribuicao.png', 'Distribuição de Purchase')
     st.write('A média maior que a mediana indica uma assimetria à direita na curva representativa dos dados.')
 
     st.subheader('Boxplot da variável alvo - Purchase')
-    img = Image.open('boxplot_alvo.png')
-    st.image(img, caption='Boxplot de Purchase')
+    show_image('boxplot_alvo.png', 'Boxplot de Purchase')
 
-    img = Image.open('purchase_desc.png')
-    st.image(img, caption='Descrição de Purchase')
+    show_image('purchase_desc.png', 'Descrição de Purchase')
 
     st.write('Os gráficos refletem que os dados seguem uma distribuição quase normal. Também podem ser observados alguns outliers em valores acima de, aproximadamente, 20.000, como representado no boxplot, justificando a assimetria da curva representativa dos dados.')
     st.write('O desvio padrão relativamente alto em relação à média sugere que os valores são dispersos, e a presença de outliers pode ser uma razão para essa dispersão. Os quartis também ajudam a entender como os valores estão distribuídos ao longo do intervalo de dados:')
@@ -73,77 +247,92 @@ def function():
     st.write('A diferença entre o terceiro e o primeiro quartil (IQR) é de aproximadamente 6,231, um IQR relativamente grande também sugere uma dispersão considerável nos dados. A grande diferença entre o terceiro quartil (75%) e o valor máximo (max) reforça a existência de outliers no lado superior da distribuição, indicando observações com valores muito acima da média.')
     
     st.subheader('Analisando outliers das variáveis numéricas')
-    img = Image.open('outliers.png')
-    st.image(img, caption='Outliers')
+    show_image('outliers.png', 'Outliers')
     st.write('''Verificamos a existência de outliers nas colunas Product_Category_1 e Purchase, mas como a porcentagem de outliers 
     é baixa, então, como temos uma quantidade razoável de dados, optamos por deletar esses registros para que os mesmos não influenciem no estudo.''')
+    st.write('Os limites de cada coluna são calculados pelo IQR, os mesmos bigodes do boxplot:')
+    with profiling.section('tabela de outliers'):
+        st.dataframe(outlier_report('black_friday_sales.csv', version), hide_index=True)
     
     col1, col2 = st.columns(2)
     col3, col4 = st.columns(2)
     col5, col6 = st.columns(2)
     col7, col8 = st.columns(2)
     
-    with col1:
+    with profiling.section('agregações dos gráficos'):
+        aggregates = analysis_aggregates('black_friday_sales.csv', version)
+
+    with col1, profiling.section('gráfico 1: Gender x Purchase'):
         st.subheader('Gender x Purchase')
-        img = Image.open('gender_purchase.png')
-        st.image(img, caption='Gender x Purchase')
+        st.altair_chart(charts.bar_chart(aggregates['gender_mean'], 'Gender', 'Purchase',
+                                         'Valor médio da compra por gênero'), width='stretch')
         st.write('Em média, homens gastam mais que mulheres na Black Friday.')
 
-    with col2:
+    with col2, profiling.section('gráfico 2: Age x Purchase'):
         st.subheader('Age x Purchase')
-        img = Image.open('age_purchase.png')
-        st.image(img, caption='Age x Purchase')
+        st.altair_chart(charts.grouped_count_chart(aggregates['age_gender_count'], 'Age', 'Gender',
+                                                   'Contagem de compras por faixa etária e gênero'),
+                        width='stretch')
         st.write('Os maiores consumidores são homens na faixa etária de 26 a 35 anos. Os menores de idade são quem menos consomem na Black Friday.')
 
-    with col3:
+    with col3, profiling.section('gráfico 3: Occupation x Purchase'):
         st.subheader('Occupation x Purchase')
-        img = Image.open('occ_purchase.png')
-        st.image(img, caption='Occupation x Purchase')
+        st.altair_chart(charts.bar_chart(aggregates['occupation_sum'], 'Occupation', 'Purchase',
+                                         'Total gasto em compras por profissão do cliente'),
+                        width='stretch')
         st.write('O total gasto em compras varia bastante em relação à profissão do cliente.')
 
-    with col4:
+    with col4, profiling.section('gráfico 4: City_Category x Purchase'):
         st.subheader('City_Category x Purchase')
-        img = Image.open('city_purchase.png')
-        st.image(img, caption='City_Category x Purchase')
+        st.altair_chart(charts.bar_chart(aggregates['city_sum'], 'City_Category', 'Purchase',
+                                         'Total gasto em cada cidade'), width='stretch')
         st.write('Clientes de cidades da categoria B são os que mais consomem no período da Black Friday. Isso pode ser influenciado por diversos fatores, como: tamanho da população, nível de renda, demografia, acesso a lojas, necessidades e preferências do consumidor, entre outros.')
 
-    with col5:
+    with col5, profiling.section('gráfico 5: Stay_In_Current_City_Years x Purchase'):
         st.subheader('Stay_In_Current_City_Years x Purchase')
-        img = Image.open('years_purchase.png')
-        st.image(img, caption='Years in city x Purchase')
+        st.altair_chart(charts.scatter_chart(aggregates['years_sum'], 'Stay_In_Current_City_Years', 'Purchase',
+                                             'Valor total das compras pelo tempo na cidade'),
+                        width='stretch')
         st.write('Pessoas que vivem há mais de um ano na cidade compram e gastam menos durante a Black Friday. O maior consumo é de pessoas entre 1 e 2 anos na cidade.')
 
-    with col6:
+    with col6, profiling.section('gráfico 6: Marital_Status x Purchase'):
         st.subheader('Marital_Status x Purchase')
-        img = Image.open('ms_purchase.png')
-        st.image(img, caption='Marital Status x Purchase')
+        st.altair_chart(charts.pie_chart(aggregates['marital_count'], 'Marital_Status', 'Count'),
+                        width='stretch')
         st.write('Solteiros consomem mais na black friday do que os casados.')
 
-    with col7:
+    with col7, profiling.section('gráfico 7: Product_Category_1 x Purchase'):
         st.subheader('Product_Category_1 x Purchase')
-        img = Image.open('categories_purchase_1.png')
-        st.image(img, caption='Category_1 x Purchase')
+        st.altair_chart(charts.bar_chart(aggregates['category_count'], 'Product_Category_1', 'Count',
+                                         'Total de observações de cada categoria principal'),
+                        width='stretch')
         st.write('Os produtos com mais vendas são os produtos que tem a categoria 5 como categoria principal.')
 
-    with col8:
+    with col8, profiling.section('gráfico 8: Product_Category_1 x Purchase'):
         st.subheader('Product_Category_1 x Purchase')
-        img = Image.open('categories_purchase_2.png')
-        st.image(img, caption='Category_1 x Purchase')
+        st.altair_chart(charts.bar_chart(aggregates['category_mean'], 'Product_Category_1', 'Purchase',
+                                         'Total gasto em cada categoria'), width='stretch')
         st.write('Já os produtos da Categoria 10 promovem compras com o maior valor médio total.')
 
+    with profiling.section('explorador de compras'):
+        cube_explorer(purchase_cube('black_friday_sales.csv', version))
+
     st.title('Pré-processamento dos dados')
     st.write('''Na fase de pré-processamento, foram removidas do dataframe as colunas User_ID e Product_ID, por serem variáveis apenas com fins de identificação do cliente e do produto.
     Também foi realizada a codificação das variáveis Gender, Age, City_Category e Stay_In_Current_City_Years, pois são variáveis que possuem dados no formato object e devem ser transformados em valores numéricos antes de serem usadas em um modelo de regressão linear.
     Já na coluna Stay_In_Current_City_Years, apenas substituímos a string "4+" pelo valor inteiro 4 e converteremos todos os dados da coluna para o formato int.
     Também removemos as colunas Product_Category_2 e Product_Category_3.''')
     st.write('O resultado final foi o dataframe abaixo:')
-    new_data = pd.read_csv('encoded_black_friday.csv')
-    new_df = pd.DataFrame(new_data)
-    st.write(new_df)
+    with profiling.section('leitura do dataset codificado'):
+        encoded_version = fingerprint('encoded_black_friday.arrow')
+        new_df = load_encoded('encoded_black_friday.arrow', encoded_version)
+    with profiling.section('tabela do dataset codificado'):
+        show_table('encoded', new_df, encoded_version)
 
     st.subheader('Correlação entre as Variáveis')
-    img = Image.open('heatmap.png')
-    st.image(img, caption='Correlação entre as Variáveis')
+    with profiling.section('gráfico de correlação'):
+        st.altair_chart(charts.heatmap_chart(correlation_table('encoded_black_friday.arrow', encoded_version)),
+                        width='stretch')
     st.write('''O heatmap reflete que as variáveis possuem uma relação linear fraca. De forma geral, elas variam independentemente uma da outra. 
     Isso pode ocorrer devido ao fato de as variáveis independentes serem categóricas, mesmo sendo numéricas.
     Também pode haver uma relação não linear, ou a relação entre as variáveis pode ser complexa e não pode ser capturada por uma simples medida de correlação linear.
@@ -155,25 +344,37 @@ def function():
     col1, col2 = st.columns(2)
     
     with col1:
-        img = Image.open('regressao.png')
-        st.image(img, caption='Valores Reais x Previsões do modelo')
+        show_image('regressao.png', 'Valores Reais x Previsões do modelo')
     
     with col2:
-        img = Image.open('regplot.png')
-        st.image(img, caption='Resultados do modelo')
+        show_image('regplot.png', 'Resultados do modelo')
 
 
     st.title('Regressão Linear - Métricas de Avaliação')
     st.write('Após a aplicação do modelo de Regressão Linear, foram calculadas as seguintes métricas de avaliação:')
-    metrics_data = pd.read_csv('metrics.csv')
-    metrics_df = pd.DataFrame(metrics_data)
-    st.write(metrics_df)
+    with profiling.section('métricas'):
+        metrics_data = pd.read_csv('metrics.csv')
+        metrics_df = pd.DataFrame(metrics_data)
+        st.write(metrics_df)
     
     st.write('''Considerando essas métricas, um modelo ideal teria valores de MSE, RMSE e MAE próximos de zero, o que indicaria que as previsões do modelo são muito próximas dos valores reais.
     Porém, os resultados obtidos e as métricas calculadas sugerem que o modelo de regressão linear possui um desempenho razoável, porém com um erro considerável nas previsões em relação aos valores reais.
     Assim, chegamos à conclusão de que a regressão modelar pode não ser o melhor modelo a ser aplicado ao conjuntos de dados em questão para prever o valor da compra.
     É importante aplicar outros modelos mais complexos que consigam prever valores mais próximos dos reais e que atinjam métricas mais satisfatórias.''')
 
+    # Resultados do benchmark_models.py, quando disponíveis
+    if os.path.exists('model_results.csv'):
+        with profiling.section('comparação de modelos'):
+            st.subheader('Comparação de modelos')
+            results = load_csv('model_results.csv', fingerprint('model_results.csv'))
+            st.dataframe(results, hide_index=True)
+            st.altair_chart(charts.tradeoff_chart(results), width='stretch')
+        st.write('Os modelos podem ser escolhidos considerando tanto o erro das previsões quanto o custo de treino e predição.')
+
+    profiling.finish_run()
+    if debug:
+        debug_panel(run)
+
 if __name__ == "__main__":
     function()
 
@@ -7,8 +7,10 @@
 
 
 import pandas as pd
+from loader import load_sales
 
-df = pd.read_csv('/work/black_friday_sales.csv')
+# Carregando o dataset com tipos compactos (usa o cache colunar quando o CSV não mudou)
+df = load_sales('/work/black_friday_sales.csv')
 df.head()
 
 
@@ -48,7 +50,13 @@ df.shape
 # In[4]:
 
 
-df.duplicated().sum()
+# Perfil de qualidade em uma única passada: duplicados (hash das linhas), ausentes,
+# valores distintos, valores fora do domínio e taxa de outliers pelo IQR
+import quality
+
+report = quality.profile_frame(df)
+print('Registros duplicados:', report['duplicates'])
+quality.summary(report)
 
 
 # **Conclusão:** não há valores duplicados no dataset.
@@ -74,14 +82,17 @@ for i, category in enumerate(unique_categories):
 
 
 # Verificando se os campos com valores ausentes foram preenchidos
+# (contagens e matriz de ausentes reduzida a faixas de linhas, em vez do heatmap linha a linha)
 import matplotlib.pyplot as plt
-import seaborn as sns
+import missingness
 
-sns.heatmap(df.isnull(), cbar=False)
+missing = missingness.profile(df)
+missingness.plot(missing)
 plt.title('Verificando valores ausentes')
 
 plt.savefig('/work/ausentes.png', bbox_inches='tight')
 plt.show()
+missing.summary()
 
 
 # Como verificamos acima, não existe uma categoria "0", então, para tratar esses casos ausentes, preencheremos os valores "nan" com o valor "0", para representar a ausência de categoria.
@@ -97,14 +108,17 @@ df['Product_Category_3'].fillna(0, inplace=True)
 
 
 # Verificando se os campos com valores ausentes foram preenchidos
+# (contagens e matriz de ausentes reduzida a faixas de linhas, em vez do heatmap linha a linha)
 import matplotlib.pyplot as plt
-import seaborn as sns
+import missingness
 
-sns.heatmap(df.isnull(), cbar=False)
+missing = missingness.profile(df)
+missingness.plot(missing)
 plt.title('Verificando preenchimento de ausentes')
 
 plt.savefig('/work/ausentes_2.png', bbox_inches='tight')
 plt.show()
+missing.summary()
 
 
 # ## Analisando a distribuição da variável alvo - Purchase
@@ -113,6 +127,7 @@ plt.show()
 
 
 import numpy as np
+import seaborn as sns
 
 sns.histplot(data=df, x='Purchase')
 plt.xlabel('Purchase')
@@ -144,7 +159,11 @@ plt.savefig('/work/boxplot_alvo.png', bbox_inches='tight')
 # In[12]:
 
 
-purchase_desc = df['Purchase'].describe()
+# Estatísticas descritivas calculadas pelo motor de agregação (quantis exatos via histograma)
+from aggregation import aggregate
+
+_, purchase_moments = aggregate(df, [], moments=['Purchase'], histograms=['Purchase'])
+purchase_desc = purchase_moments.describe()['Purchase']
 purchase_desc
 
 
@@ -190,15 +209,14 @@ plt.savefig('/work/outliers.png', bbox_inches='tight')
 # In[15]:
 
 
-# Verificando outliers na coluna Product_Category_1
-# Calculando a porcentagem de dados acima de 17,5
-category_1_outliers_percent = df[df['Product_Category_1'] > 17.5].shape[0]/df.shape[0] * 100
-print(f'Outliers de Product_Category_1: {category_1_outliers_percent:.2f}%')
+# Verificando outliers nas colunas Product_Category_1 e Purchase
+# Os limites vêm do IQR de cada coluna (os mesmos bigodes do boxplot) e o relatório mostra
+# a porcentagem de registros que cada regra remove
+import outliers
 
-# Verificando outliers na coluna Purchase
-# Calculando a porcentagem de dados acima de 20000
-purchase_outliers_percent = df[df['Purchase'] > 20000].shape[0]/df.shape[0] * 100
-print(f'Outliers de Purchase: {purchase_outliers_percent:.2f}%')
+outlier_filter = outliers.OutlierFilter(outliers.fit(df, outliers.DEFAULT_RULES))
+outlier_flags = outlier_filter.mask(df)
+outlier_filter.report()
 
 
 # **Conclusão:** a porcentagem de outliers é baixa, então, como temos uma quantidade razoável de dados, optamos por deletar esses registros para que os mesmos não influenciem no estudo.
@@ -206,8 +224,8 @@ print(f'Outliers de Purchase: {purchase_outliers_percent:.2f}%')
 # In[16]:
 
 
-# Deletando os registros com outliers
-df = df.drop(df[(df['Product_Category_1']>17.5) | (df['Purchase']>20000)].index)
+# Deletando os registros com outliers (máscara única de todas as regras, uma única cópia)
+df = df[~outlier_flags]
 
 
 # In[17]:
@@ -220,14 +238,23 @@ plt.tight_layout()
 
 
 # ## Analisando a relação entre cada variável e a variável alvo
-# 
+
+# In[ ]:
+
+
+# Calculando, em uma única passada pelos dados, todas as agregações usadas nos gráficos abaixo
+from aggregation import EDA_SPECS
+
+aggregates, _ = aggregate(df, EDA_SPECS)
+
+
 # ### Gender x Purchase
 
 # In[18]:
 
 
-# Calculando a média de "Purchase" por gênero
-gender_df = df.groupby('Gender')['Purchase'].mean().reset_index()
+# Média de "Purchase" por gênero
+gender_df = aggregates['gender_mean']
 
 # Plotando o gráfico
 ax = sns.barplot(x='Gender', y='Purchase', data=gender_df)
@@ -244,7 +271,7 @@ plt.show()
 # In[19]:
 
 
-sns.countplot(x=df['Age'], hue=df['Gender'])
+sns.barplot(x='Age', y='Count', hue='Gender', data=aggregates['age_gender_count'])
 plt.title('Contagem de compras por faixa etária e gênero')
 
 plt.savefig('/work/age_purchase.png', bbox_inches='tight')
@@ -258,8 +285,8 @@ plt.show()
 # In[20]:
 
 
-# Calculando o somatório de "Purchase" por profissão
-occupation_df = df.groupby('Occupation')['Purchase'].sum().reset_index()
+# Somatório de "Purchase" por profissão
+occupation_df = aggregates['occupation_sum']
 
 # Plotando o gráfico
 ax = sns.barplot(x='Occupation', y='Purchase', data=occupation_df)
@@ -276,7 +303,7 @@ plt.show()
 # In[21]:
 
 
-purchase_per_city = df.groupby('City_Category')['Purchase'].sum().reset_index()
+purchase_per_city = aggregates['city_sum']
 sns.barplot(x='City_Category', y='Purchase', data=purchase_per_city)
 plt.title('Total gasto em cada cidade')
 plt.xticks(rotation=45)
@@ -292,8 +319,8 @@ plt.show()
 # In[22]:
 
 
-# Calculando a soma das compras de acordo com o tempo na cidade
-current_city = df.groupby('Stay_In_Current_City_Years')['Purchase'].sum()
+# Soma das compras de acordo com o tempo na cidade
+current_city = aggregates['years_sum'].set_index('Stay_In_Current_City_Years')['Purchase']
 
 sns.scatterplot(data=current_city)
 plt.title('Valor total das compras pelo tempo na cidade')
@@ -309,8 +336,8 @@ plt.savefig('/work/years_purchase.png', bbox_inches='tight')
 # In[23]:
 
 
-# Fazendo a contagem de cada valor em "Marital_Status"
-marital_status = df['Marital_Status'].value_counts()
+# Contagem de cada valor em "Marital_Status" (0 - solteiro, 1 - casado)
+marital_status = aggregates['marital_count'].set_index('Marital_Status')['Count']
 
 plt.pie(marital_status, labels=['Not married', 'Married'], autopct='%1.1f%%')
 
@@ -325,7 +352,7 @@ plt.show()
 # In[24]:
 
 
-sns.countplot(x=df['Product_Category_1'], data=df)
+sns.barplot(x='Product_Category_1', y='Count', data=aggregates['category_count'])
 plt.title('Total de observações de cada categoria principal')
 
 plt.savefig('/work/categories_purchase_1.png', bbox_inches='tight')
@@ -335,7 +362,7 @@ plt.show()
 # In[25]:
 
 
-purchase_per_category = df.groupby('Product_Category_1')['Purchase'].mean().reset_index()
+purchase_per_category = aggregates['category_mean']
 
 sns.barplot(x='Product_Category_1', y='Purchase', data=purchase_per_category)
 plt.title('Total gasto em cada categoria')
@@ -362,48 +389,28 @@ clean_df = clean_df.drop('Product_ID', axis=1)
 
 # ## Codificando variáveis
 # 
-# As colunas *Gender*, *Age*, *City_Category* e *Stay_In_Current_City_Years* possuem dados no formato object e devem ser transformadas em valores numéricos antes de serem usadas em um modelo de regressão linear, ou seja, é necessária uma codificação para que o modelo possa interpretar essas categorias. Usaremos o método map() para substituir cada valor categórico por um valor correspondente nas três primeiras colunas.
+# As colunas *Gender*, *Age*, *City_Category* e *Stay_In_Current_City_Years* possuem dados no formato object e devem ser transformadas em valores numéricos antes de serem usadas em um modelo de regressão linear, ou seja, é necessária uma codificação para que o modelo possa interpretar essas categorias. Usaremos tabelas de códigos fixas (encoder.py) para substituir cada valor categórico por um valor correspondente.
 
 # In[27]:
 
 
-# Criando uma cópia do dataframe para não sobrescrever o dataframe limpo
-encoded_df = clean_df.copy()
-
-# Tratando a coluna 'Gender'
-mapping_gender = {
-                    'F': 0,
-                    'M': 1
-                 }
-encoded_df['Gender'] = encoded_df['Gender'].map(mapping_gender)
-
-# Tratando a coluna 'Age'
-mapping_age = {
-                    '0-17': 1,
-                    '18-25': 2,
-                    '26-35': 3,
-                    '36-45': 4,
-                    '46-50': 5,
-                    '51-55': 6,
-                    '55+': 7
-                 }                 
-encoded_df['Age'] = encoded_df['Age'].map(mapping_age)
+# As tabelas de códigos de cada coluna ficam no encoder.py e são as mesmas usadas no dashboard e na predição
+from encoder import CategoricalEncoder, MAPPING_GENDER, MAPPING_AGE, MAPPING_CITY_CATEGORY
 
-# Tratando a coluna 'City_Category'
-mapping_city_category = {
-                            'A': 1,
-                            'B': 2,
-                            'C': 3
-                        }
-encoded_df['City_Category'] = encoded_df['City_Category'].map(mapping_city_category) 
+print(MAPPING_GENDER)
+print(MAPPING_AGE)
+print(MAPPING_CITY_CATEGORY)
 
 
-# Na coluna *Stay_In_Current_City_Years*, apenas substituiremos a string "4+" pelo valor inteiro 4 e converteremos todos os dados da coluna para o formato int. 
+# Na coluna *Stay_In_Current_City_Years*, a string "4+" corresponde ao valor inteiro 4 e os demais valores são convertidos para int. 
 
 # In[28]:
 
 
-encoded_df['Stay_In_Current_City_Years'] = encoded_df['Stay_In_Current_City_Years'].replace('4+', 4).astype(int)
+# Gerando o dataframe codificado: cada coluna categórica vira um vetor de códigos int8
+# (valores fora das tabelas geram erro em vez de virarem NaN)
+encoder = CategoricalEncoder()
+encoded_df = encoder.transform(clean_df)
 
 
 # In[29]:
@@ -426,7 +433,8 @@ encoded_df
 # In[31]:
 
 
-sns.heatmap(encoded_df.corr(), cmap = 'coolwarm', vmin=-1, vmax=1, annot=True)
+_, encoded_moments = aggregate(encoded_df, [], moments=encoded_df.columns)
+sns.heatmap(encoded_moments.correlation(), cmap = 'coolwarm', vmin=-1, vmax=1, annot=True)
 plt.savefig('/work/heatmap.png', bbox_inches='tight')
 
 
@@ -471,7 +479,10 @@ print(after_encoding)
 # In[34]:
 
 
-encoded_df.to_csv('encoded_black_friday.csv', index=False)
+# Salvando o dataset codificado em formato colunar binário (Arrow), lido com memory-map pelo treino e pelo dashboard
+from columnar import write_encoded
+
+write_encoded(encoded_df, 'encoded_black_friday.arrow')
 
 
 # ## Separando os dados em grupos de treinamento e teste
@@ -571,6 +582,75 @@ metrics_df.to_csv('metrics.csv', index=False)
 # 
 # Assim, as métricas de avaliação indicam que o modelo de regressão linear em questão tem um desempenho limitado na previsão dos dados. O modelo pode não estar capturando adequadamente os padrões nos dados ou pode ser necessário considerar outros modelos mais complexos ou features adicionais para melhorar a precisão das previsões.
 
+# ## Tabela de predições
+#
+# Todas as features do modelo são códigos inteiros com poucos valores, então o espaço de entradas tem 2 x 7 x 21 x 3 x 5 x 2 x 20 = 176.400 combinações. O lookup_table.py calcula a predição do modelo para cada uma delas; prever passa a ser uma consulta à tabela, para qualquer tipo de modelo. A conferência compara a tabela com o reg.predict nos dados de teste.
+
+# In[ ]:
+
+
+from lookup_table import PredictionTable
+
+prediction_table = PredictionTable.build(reg)
+prediction_table.check(reg, x_test)
+
+
+# In[ ]:
+
+
+# Salvando o modelo treinado, o encoder e a tabela de predições como um artefato versionado
+# (carregado pelo serve.py e pelo score.py, que consultam a tabela no lugar do modelo)
+from model_store import save_model
+
+model_version = save_model(reg, encoder, x_train.columns, table=prediction_table,
+                           metrics={'MSE': mse, 'RMSE': rmse, 'MAE': mae})
+print(f'Modelo salvo: models/{model_version}')
+
+
+# ## Features de cliente e de produto
+# 
+# As colunas *User_ID* e *Product_ID* foram excluídas do modelo, mas o histórico de compras de cada cliente e de cada produto ajuda a prever o valor da compra. O feature_store.py calcula, por cliente e por produto, o número de compras, a média e a mediana de Purchase, e a participação da categoria do produto nas compras do cliente. As tabelas são calculadas somente com os dados de treino; para as próprias linhas de treino, a média e a mediana de Purchase vêm de validação cruzada (cada linha recebe agregações calculadas sem o seu Purchase), evitando vazamento da variável alvo. As contagens e a participação da categoria não usam Purchase e vêm do treino inteiro, com os mesmos valores que terão na predição.
+
+# In[ ]:
+
+
+from feature_store import FeatureStore
+
+store = FeatureStore()
+ids = df[store.inputs]
+store_train = store.fit_transform(ids.loc[x_train.index].assign(Purchase=y_train))
+store_test = store.transform(ids.loc[x_test.index])
+
+x_train_fs = pd.concat([x_train, store_train], axis=1)
+x_test_fs = pd.concat([x_test, store_test], axis=1)
+store_train.describe()
+
+
+# In[ ]:
+
+
+reg_fs = LinearRegression().fit(x_train_fs, y_train)
+y_pred_fs = np.round(reg_fs.predict(x_test_fs), 2)
+
+mse_fs = mean_squared_error(y_test, y_pred_fs)
+rmse_fs = np.sqrt(mse_fs)
+mae_fs = mean_absolute_error(y_test, y_pred_fs)
+
+print(f'MSE: {mse_fs:.2f}')
+print(f'RMSE: {rmse_fs:.2f}')
+print(f'MAE: {mae_fs:.2f}')
+
+
+# In[ ]:
+
+
+# Salvando também o modelo com as features de cliente e de produto, com as tabelas do feature store;
+# por ser o último salvo, é a versão carregada por padrão pelo serve.py e pelo score.py
+fs_model_version = save_model(reg_fs, encoder, x_train_fs.columns, store=store,
+                              metrics={'MSE': mse_fs, 'RMSE': rmse_fs, 'MAE': mae_fs})
+print(f'Modelo salvo: models/{fs_model_version}')
+
+
 
 
 # <a style='text-decoration:none;line-height:16px;display:flex;color:#5B5B62;padding:10px;justify-content:end;' href='https://deepnote.com?utm_source=created-in-deepnote-cell&projectId=43b9c1cf-c283-413b-9f4d-02fa2982479a' target="_blank">
@@ -0,0 +1,407 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Motor de agregação da análise exploratória.
+#
+# Em vez de um groupby/value_counts/describe/corr separado para cada gráfico (cada um
+# percorrendo o dataset inteiro), as agregações são declaradas como uma lista de specs
+# (chave, métrica, coluna) e calculadas juntas: as chaves são convertidas em códigos
+# inteiros e todas as contagens/somas saem de poucos np.bincount sobre esses códigos.
+# Os dados podem ser entregues em blocos (update), o que permite processar arquivos em
+# pedaços sem manter o dataset inteiro em memória.
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+METRICS = ('count', 'sum', 'mean', 'std')
+
+# Acima deste número de combinações, chaves compostas são codificadas com np.unique
+MAX_DENSE_CODES = 1 << 22
+
+# Número máximo de faixas de cada histograma
+MAX_HISTOGRAM_BINS = 1 << 16
+
+
+@dataclass(frozen=True)
+class Spec:
+    """Uma agregação: `metric` de `value` agrupado por `key` (coluna ou tupla de colunas)."""
+    name: str
+    key: object
+    metric: str
+    value: str = None
+
+    @property
+    def key_columns(self):
+        return self.key if isinstance(self.key, tuple) else (self.key,)
+
+
+def _local_codes(series):
+    """Códigos inteiros do bloco e o rótulo de cada código."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.int64), list(series.cat.categories)
+    values = series.to_numpy()
+    if np.issubdtype(values.dtype, np.integer) and len(values):
+        low, high = int(values.min()), int(values.max())
+        if high - low < MAX_DENSE_CODES:
+            return values.astype(np.int64) - low, list(range(low, high + 1))
+    labels, codes = np.unique(values, return_inverse=True)
+    return codes.astype(np.int64), labels.tolist()
+
+
+class _KeyIndex:
+    """Mapeia os rótulos de uma chave para códigos globais, estáveis entre blocos."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.labels = []
+        self.codes = {}
+
+    def encode(self, block):
+        parts = [_local_codes(block[column]) for column in self.columns]
+        if len(parts) == 1:
+            codes, labels = parts[0]
+        else:
+            codes, labels = self._combine(parts)
+
+        # Tabela de conversão código local -> código global
+        lut = np.full(len(labels), -1, dtype=np.int64)
+        for local, label in enumerate(labels):
+            if label is None:
+                continue
+            code = self.codes.get(label)
+            if code is None:
+                code = self.codes[label] = len(self.labels)
+                self.labels.append(label)
+            lut[local] = code
+        # Valores ausentes (código -1 em categorias) ficam de fora, como no groupby
+        valid = codes >= 0
+        return np.where(valid, lut[np.where(valid, codes, 0)], -1)
+
+    @staticmethod
+    def _combine(parts):
+        # Combina as colunas da chave em um único código (base mista); só as combinações
+        # presentes no bloco recebem rótulo
+        sizes = [len(labels) for _, labels in parts]
+        missing = np.zeros(len(parts[0][0]), dtype=bool)
+        for codes, _ in parts:
+            missing |= codes < 0
+        if int(np.prod(sizes)) <= MAX_DENSE_CODES:
+            codes = np.zeros(len(missing), dtype=np.int64)
+            for (column_codes, _), size in zip(parts, sizes):
+                codes = codes * size + column_codes
+            codes[missing] = 0
+            present = np.flatnonzero(np.bincount(codes[~missing], minlength=int(np.prod(sizes))))
+            labels = [None] * int(np.prod(sizes))
+            for code in present:
+                locals_, rest = [], int(code)
+                for size in reversed(sizes):
+                    rest, local = divmod(rest, size)
+                    locals_.append(local)
+                labels[code] = tuple(column_labels[local] for (_, column_labels), local
+                                     in zip(parts, reversed(locals_)))
+        else:
+            stacked = np.stack([column_codes for column_codes, _ in parts])
+            unique, codes = np.unique(stacked, axis=1, return_inverse=True)
+            codes = codes.reshape(-1)
+            labels = [tuple(column_labels[unique[j, i]] for j, (_, column_labels) in enumerate(parts))
+                      for i in range(unique.shape[1])]
+        codes[missing] = -1
+        return codes, labels
+
+
+class Histogram:
+    """Histograma de valores numéricos com número de faixas limitado.
+
+    Cada faixa cobre `width` valores consecutivos. Enquanto a amplitude dos dados couber em
+    `max_bins` faixas, width = 1 e, para colunas inteiras, os quantis são exatos; acima disso as
+    faixas vizinhas são unidas (width dobra) e o erro dos quantis fica limitado a width / 2.
+    """
+
+    def __init__(self, max_bins=MAX_HISTOGRAM_BINS):
+        self.max_bins = max_bins
+        self.width = 1
+        self.first = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        low, high = values.min(), values.max()
+        if len(self.counts):
+            low = min(low, self.first * self.width)
+            high = max(high, (self.first + len(self.counts)) * self.width - 1)
+        while np.floor(high / self.width) - np.floor(low / self.width) + 1 > self.max_bins:
+            self._coarsen()
+        bins = np.floor(values / self.width).astype(np.int64)
+        first = int(np.floor(low / self.width))
+        counts = np.bincount(bins - first, minlength=int(np.floor(high / self.width)) - first + 1)
+        if len(self.counts):
+            offset = self.first - first
+            counts[offset:offset + len(self.counts)] += self.counts
+        self.first, self.counts = first, counts
+
+    def _coarsen(self):
+        if len(self.counts):
+            bins = np.arange(self.first, self.first + len(self.counts)) // 2
+            self.counts = np.bincount(bins - bins[0], weights=self.counts).astype(np.int64)
+            self.first = int(bins[0])
+        self.width *= 2
+
+    def merge(self, other):
+        """Soma outro histograma (por exemplo, calculado por outro processo) a este.
+
+        A faixa coberta pelos dois é calculada antes: este histograma é unido até que ela caiba em
+        max_bins faixas, e as faixas de `other` são então unidas até a mesma largura.
+        """
+        if not len(other.counts):
+            return self
+        while self.width < other.width:
+            self._coarsen()
+        low = other.first * other.width
+        high = (other.first + len(other.counts)) * other.width - 1
+        if len(self.counts):
+            low = min(low, self.first * self.width)
+            high = max(high, (self.first + len(self.counts)) * self.width - 1)
+        while high // self.width - low // self.width + 1 > self.max_bins:
+            self._coarsen()
+
+        other_counts, other_first, width = other.counts, other.first, other.width
+        while width < self.width:
+            bins = np.arange(other_first, other_first + len(other_counts)) // 2
+            other_counts = np.bincount(bins - bins[0], weights=other_counts).astype(np.int64)
+            other_first, width = int(bins[0]), width * 2
+
+        first = low // self.width
+        counts = np.zeros(high // self.width - first + 1, dtype=np.int64)
+        if len(self.counts):
+            counts[self.first - first:self.first - first + len(self.counts)] += self.counts
+        counts[other_first - first:other_first - first + len(other_counts)] += other_counts
+        self.first, self.counts = first, counts
+        return self
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    @property
+    def error(self):
+        """Erro máximo dos quantis (em unidades dos dados) para valores inteiros."""
+        return (self.width - 1) / 2
+
+    def value(self, rank):
+        """Valor da observação na posição `rank` (a partir de 0) dos dados ordenados."""
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, rank, side='right'))
+        return (self.first + index) * self.width + (self.width - 1) / 2
+
+    def quantile(self, q):
+        """Quantil com interpolação linear entre posições, como no pandas."""
+        position = q * (self.total - 1)
+        below, above = int(np.floor(position)), int(np.ceil(position))
+        value_below = self.value(below)
+        return value_below + (self.value(above) - value_below) * (position - below)
+
+    def boxplot(self, whis=1.5):
+        """Quartis, limites dos bigodes e quantidade de outliers de um boxplot."""
+        q1, median, q3 = self.quantile(0.25), self.quantile(0.5), self.quantile(0.75)
+        iqr = q3 - q1
+        low, high = q1 - whis * iqr, q3 + whis * iqr
+        centers = (np.arange(len(self.counts)) + self.first) * self.width + (self.width - 1) / 2
+        inside = (centers >= low) & (centers <= high)
+        outliers = int(self.counts[~inside].sum())
+        present = inside & (self.counts > 0)
+        return {
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'whisker_low': centers[present].min() if present.any() else np.nan,
+            'whisker_high': centers[present].max() if present.any() else np.nan,
+            'outliers': outliers,
+        }
+
+
+class _Moments:
+    """Contagem, soma, produtos cruzados, mínimo, máximo e histograma de colunas numéricas."""
+
+    def __init__(self, columns, histograms):
+        self.columns = list(columns)
+        self.histograms = set(histograms)
+        k = len(self.columns)
+        self.n = 0
+        # Os valores são acumulados deslocados pela média do primeiro bloco, o que evita
+        # perda de precisão ao subtrair n·média² de somas de quadrados grandes
+        self.shift = None
+        self.total = np.zeros(k)
+        self.cross = np.zeros((k, k))
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+        self.hist = {}
+
+    def update(self, block):
+        if not self.columns:
+            return
+        values = block[self.columns].to_numpy(dtype=np.float64)
+        if not len(values):
+            return
+        if self.shift is None:
+            self.shift = values.mean(axis=0)
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+        values = values - self.shift
+        self.n += len(values)
+        self.total += values.sum(axis=0)
+        self.cross += values.T @ values
+        for column in self.histograms:
+            self.hist.setdefault(column, Histogram()).update(block[column].to_numpy())
+
+    def mean(self):
+        return self.shift + self.total / self.n
+
+    def covariance(self):
+        mean = self.total / self.n
+        return (self.cross - self.n * np.outer(mean, mean)) / (self.n - 1)
+
+    def correlation(self):
+        cov = self.covariance()
+        std = np.sqrt(np.diag(cov))
+        corr = cov / np.outer(std, std)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def quantile(self, column, q):
+        return self.hist[column].quantile(q)
+
+    def describe(self):
+        """Equivalente ao df.describe() para as colunas acumuladas."""
+        std = np.sqrt(np.diag(self.covariance()))
+        table = pd.DataFrame({
+            'count': float(self.n),
+            'mean': self.mean(),
+            'std': std,
+            'min': self.min,
+            'max': self.max,
+        }, index=self.columns)
+        for q, label in ((0.25, '25%'), (0.5, '50%'), (0.75, '75%')):
+            table[label] = [self.quantile(column, q) if column in self.hist else np.nan
+                            for column in self.columns]
+        return table[['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']].T
+
+
+class Aggregator:
+    """Calcula todas as specs (e momentos/histogramas das colunas numéricas) em uma passada."""
+
+    def __init__(self, specs, moments=(), histograms=()):
+        for spec in specs:
+            if spec.metric not in METRICS:
+                raise ValueError(f'Métrica desconhecida: {spec.metric}')
+            if spec.metric != 'count' and spec.value is None:
+                raise ValueError(f'A métrica {spec.metric} exige uma coluna de valores ({spec.name})')
+        self.specs = list(specs)
+        self.keys = {}
+        for spec in self.specs:
+            self.keys.setdefault(spec.key_columns, _KeyIndex(spec.key_columns))
+        # Somas (e somas dos quadrados) necessárias para cada coluna de valores
+        self.values = {}
+        for spec in self.specs:
+            if spec.value is not None:
+                needs_squares = self.values.get(spec.value, False) or spec.metric == 'std'
+                self.values[spec.value] = needs_squares
+        self.count = {key: np.zeros(0) for key in self.keys}
+        self.sums = {(key, value): np.zeros(0) for key in self.keys for value in self.values}
+        self.squares = {(key, value): np.zeros(0) for key in self.keys
+                        for value, squares in self.values.items() if squares}
+        self.moments = _Moments(moments, histograms)
+
+    def update(self, block):
+        """Acumula um bloco de linhas."""
+        self.moments.update(block)
+        if not self.keys:
+            return
+        codes = {key: index.encode(block) for key, index in self.keys.items()}
+        # Todos os códigos de todas as chaves em um único vetor, com deslocamentos
+        offsets, total = {}, 0
+        for key, index in self.keys.items():
+            offsets[key] = total
+            total += len(index.labels)
+        fused = np.concatenate([np.where(codes[key] >= 0, codes[key] + offsets[key], total)
+                                for key in self.keys])
+        counts = np.bincount(fused, minlength=total + 1)
+        self._add(self.count, counts, offsets)
+
+        for value, squares in self.values.items():
+            weights = block[value].to_numpy(dtype=np.float64)
+            tiled = np.tile(weights, len(self.keys))
+            sums = np.bincount(fused, weights=tiled, minlength=total + 1)
+            self._add(self.sums, sums, offsets, value)
+            if squares:
+                sq = np.bincount(fused, weights=tiled * tiled, minlength=total + 1)
+                self._add(self.squares, sq, offsets, value)
+
+    def _add(self, target, values, offsets, value=None):
+        for key, index in self.keys.items():
+            size = len(index.labels)
+            part = values[offsets[key]:offsets[key] + size]
+            slot = key if value is None else (key, value)
+            current = target[slot]
+            if len(current) < size:
+                current = np.concatenate([current, np.zeros(size - len(current))])
+            current += part
+            target[slot] = current
+
+    def result(self):
+        """Tabelas no mesmo formato de groupby(...).reset_index(), uma por spec."""
+        tables = {}
+        for spec in self.specs:
+            key = spec.key_columns
+            labels = self.keys[key].labels
+            count = self.count[key]
+            order = sorted(range(len(labels)), key=lambda i: labels[i])
+            order = [i for i in order if count[i] > 0]
+            if spec.metric == 'count':
+                values, column = count[order].astype(np.int64), 'Count'
+            else:
+                sums = self.sums[(key, spec.value)][order]
+                n = count[order]
+                column = spec.value
+                if spec.metric == 'sum':
+                    values = sums
+                elif spec.metric == 'mean':
+                    values = sums / n
+                else:
+                    squares = self.squares[(key, spec.value)][order]
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        values = np.sqrt(np.maximum(squares - sums * sums / n, 0) / (n - 1))
+            table = pd.DataFrame([labels[i] if len(key) > 1 else (labels[i],) for i in order],
+                                 columns=list(key))
+            table[column] = values
+            tables[spec.name] = table
+        return tables
+
+
+def aggregate(df, specs, moments=(), histograms=(), block_size=1 << 20):
+    """Executa as specs sobre um DataFrame em memória, em blocos de `block_size` linhas.
+
+    Retorna (tabelas, momentos): um dicionário com uma tabela por spec e o acumulador de
+    momentos, de onde saem describe() e correlation().
+    """
+    aggregator = Aggregator(specs, moments, histograms)
+    for start in range(0, len(df), block_size):
+        aggregator.update(df.iloc[start:start + block_size])
+    return aggregator.result(), aggregator.moments
+
+
+# Agregações usadas nos gráficos da análise exploratória (TP9.py e dashboard)
+EDA_SPECS = [
+    Spec('gender_mean', 'Gender', 'mean', 'Purchase'),
+    Spec('age_gender_count', ('Age', 'Gender'), 'count'),
+    Spec('occupation_sum', 'Occupation', 'sum', 'Purchase'),
+    Spec('city_sum', 'City_Category', 'sum', 'Purchase'),
+    Spec('years_sum', 'Stay_In_Current_City_Years', 'sum', 'Purchase'),
+    Spec('marital_count', 'Marital_Status', 'count'),
+    Spec('category_count', 'Product_Category_1', 'count'),
+    Spec('category_mean', 'Product_Category_1', 'mean', 'Purchase'),
+]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Comparação de modelos de regressão para o valor de Purchase.
+#
+# Treina uma lista configurável de regressores sobre o dataset codificado, cada um em um
+# processo do pool, e registra para cada modelo o tempo de treino, a vazão de predição
+# (linhas/s), o pico de memória e as métricas MSE/RMSE/MAE na mesma divisão treino/teste
+# do TP9.py. O resultado vai para model_results.csv, lido pelo dashboard.
+#
+# Os tempos são medidos sem instrumentação de alocação; o pico de memória é o VmHWM do
+# processo (zerado antes do treino, como no memory.py) acima do RSS inicial, o que inclui a
+# memória alocada fora do Python (OpenMP, BLAS). Cada processo do pool roda com um único
+# thread nas bibliotecas nativas, para que os modelos avaliados ao mesmo tempo não disputem
+# os mesmos núcleos.
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsRegressor
+from threadpoolctl import threadpool_limits
+
+from columnar import ENCODED_PATH, read_frame
+from memory import peak_rss, reset_peak
+from profiling import rss
+
+
+RESULTS_PATH = 'model_results.csv'
+
+# Modelos disponíveis; n_jobs=1 porque o paralelismo já vem do pool de processos (os threads
+# do OpenMP/BLAS, usados pelo HistGradientBoosting, são limitados no inicializador)
+MODELS = {
+    'linear': lambda: LinearRegression(),
+    'ridge': lambda: Ridge(alpha=1.0),
+    'hist_gradient_boosting': lambda: HistGradientBoostingRegressor(random_state=42),
+    'random_forest': lambda: RandomForestRegressor(n_estimators=50, min_samples_leaf=20, n_jobs=1,
+                                                   random_state=42),
+    'knn': lambda: KNeighborsRegressor(n_neighbors=25, n_jobs=1),
+}
+
+# Cada processo carrega e divide os dados uma vez, no inicializador
+_data = {}
+
+
+def _load(path, target, test_size, seed):
+    # Um thread por processo em OpenMP/BLAS; o limite vale até o fim do processo
+    _data['limits'] = threadpool_limits(1)
+    df = read_frame(path)
+    x = df.drop(columns=target)
+    y = df[target]
+    _data['split'] = train_test_split(x, y, test_size=test_size, random_state=seed)
+
+
+def evaluate_model(name):
+    """Treina e avalia um modelo da lista MODELS no processo atual."""
+    x_train, x_test, y_train, y_test = _data['split']
+    model = MODELS[name]()
+
+    # Sem o reset do VmHWM (fora do Linux) o pico fica indisponível
+    exact = reset_peak()
+    baseline = rss()
+    start = time.perf_counter()
+    model.fit(x_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(x_test)
+    predict_seconds = time.perf_counter() - start
+    peak = peak_rss() - baseline if exact else np.nan
+
+    mse = mean_squared_error(y_test, y_pred)
+    return {
+        'Modelo': name,
+        'MSE': mse,
+        'RMSE': np.sqrt(mse),
+        'MAE': mean_absolute_error(y_test, y_pred),
+        'Treino (s)': fit_seconds,
+        'Predição (linhas/s)': len(x_test) / predict_seconds,
+        'Memória pico (MB)': peak / 1e6,
+    }
+
+
+def run_benchmark(path=ENCODED_PATH, models=None, target='Purchase', test_size=0.4, seed=42,
+                  processes=None):
+    """Avalia os modelos em paralelo e devolve uma tabela ordenada pelo RMSE."""
+    models = list(models or MODELS)
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        raise ValueError(f'Modelos desconhecidos: {sorted(unknown)}')
+    processes = processes or min(len(models), os.cpu_count() or 1)
+    with ProcessPoolExecutor(processes, initializer=_load,
+                             initargs=(path, target, test_size, seed)) as pool:
+        results = list(pool.map(evaluate_model, models))
+    return pd.DataFrame(results).sort_values('RMSE', ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara modelos de regressão para o valor da compra.')
+    parser.add_argument('--data', default=ENCODED_PATH, help='dataset codificado (.arrow ou .csv)')
+    parser.add_argument('--models', nargs='+', choices=list(MODELS), help='modelos a avaliar (padrão: todos)')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--output', default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.data, args.models, processes=args.processes)
+    results.to_csv(args.output, index=False)
+    print(results.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
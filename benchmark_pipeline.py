@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Benchmark das etapas do pipeline do TP9.py com dados sintéticos em escala.
+#
+# Para cada escala (0,5M, 5M e 50M linhas por padrão) o synthetic.py gera o CSV uma única
+# vez, e as etapas são executadas em sequência, como no pipeline.py: leitura, limpeza,
+# outliers, codificação, agregações dos gráficos, treino, predição e gravação do dataset
+# codificado. De cada etapa são registrados o tempo, a vazão, o pico de memória durante a
+# etapa e o RSS do processo ao final. O pico é o VmHWM do Linux (zerado no início de cada
+# etapa, como no memory.py) acima do RSS inicial: inclui o que o leitor de CSV do pandas e o
+# pyarrow alocam fora do Python e não distorce os tempos. Cada escala roda em um processo
+# novo, para que a memória de uma não contamine a outra. Os resultados são acrescentados a
+# pipeline_benchmarks.csv com a versão do código (commit do git), e --compare confronta a
+# versão atual com uma anterior, apontando as etapas que ficaram mais lentas ou mais pesadas.
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import aggregation
+import loader
+import outliers
+import pipeline
+import preprocessing
+import synthetic
+from columnar import write_encoded
+from memory import peak_rss, reset_peak
+from profiling import rss
+
+
+RESULTS_PATH = 'pipeline_benchmarks.csv'
+DATA_DIR = 'bench_data'
+SCALES = ['0.5M', '5M', '50M']
+STAGES = ('load', 'clean', 'outliers', 'encode', 'aggregate', 'train', 'predict', 'write')
+# Aumento relativo (tempo ou memória) a partir do qual uma etapa é apontada como regressão;
+# diferenças absolutas menores que o ruído da medição são ignoradas
+TOLERANCE = 0.10
+MIN_SECONDS = 0.05
+MIN_MB = 1.0
+
+
+def code_version():
+    """Commit atual do repositório ('+' quando há alterações não commitadas)."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=directory,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=directory,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecida'
+    return commit + ('+' if dirty else '')
+
+
+def dataset_path(rows, data_dir=DATA_DIR, seed=42):
+    """CSV sintético com `rows` linhas, gerado na primeira vez em que é pedido."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'synthetic_{rows}_{seed}.csv')
+    if not os.path.exists(path):
+        partial = path + '.part'
+        synthetic.write(partial, rows, seed)
+        os.replace(partial, path)
+    return path
+
+
+class _Recorder:
+    def __init__(self):
+        self.results = []
+
+    def run(self, stage, func, rows=None):
+        """Executa func() medindo tempo e memória; rows=None usa o tamanho do resultado."""
+        # Sem o reset do VmHWM (fora do Linux) o pico fica indisponível
+        exact = reset_peak()
+        baseline = rss()
+        start = time.perf_counter()
+        value = func()
+        seconds = time.perf_counter() - start
+        peak = peak_rss() - baseline if exact else float('nan')
+        self.results.append({
+            'Etapa': stage,
+            'Tempo (s)': seconds,
+            'Linhas/s': (len(value) if rows is None else rows) / max(seconds, 1e-9),
+            'Memória pico (MB)': peak / 1e6,
+            'RSS (MB)': rss() / 1e6,
+        })
+        return value
+
+
+def run_stages(path, output_dir, rules=outliers.DEFAULT_RULES, test_size=0.4, seed=42):
+    """Executa as etapas sobre o CSV e devolve uma linha de resultados por etapa."""
+    recorder = _Recorder()
+    raw = recorder.run('load', lambda: loader.read_csv(path))
+    clean = recorder.run('clean', lambda: pipeline.clean(raw)['clean'])
+    # Os intermediários são liberados assim que deixam de ser usados
+    del raw
+    filtered = recorder.run('outliers', lambda: pipeline.filter_outliers(clean, rules)['filtered'], len(clean))
+    del clean
+    encoded = recorder.run('encode', lambda: preprocessing.encode(filtered))
+    recorder.run('aggregate', lambda: aggregation.aggregate(filtered, aggregation.EDA_SPECS), len(filtered))
+    del filtered
+    data = pipeline.split(encoded, test_size, seed)
+    model = recorder.run('train', lambda: pipeline.train(data['x_train'], data['y_train'])['model'],
+                         len(data['x_train']))
+    recorder.run('predict', lambda: model.predict(data['x_test']))
+    recorder.run('write', lambda: write_encoded(encoded, os.path.join(output_dir, 'encoded_black_friday.arrow')),
+                 len(encoded))
+    return recorder.results
+
+
+def _benchmark_scale(rows, data_dir, seed):
+    path = dataset_path(rows, data_dir, seed)
+    with tempfile.TemporaryDirectory() as output_dir:
+        results = run_stages(path, output_dir, seed=seed)
+    for result in results:
+        result['Linhas'] = rows
+    return results
+
+
+def run_benchmark(scales=SCALES, data_dir=DATA_DIR, seed=42):
+    """Mede cada escala em um processo próprio; devolve a tabela de resultados."""
+    version = code_version()
+    created = time.strftime('%Y-%m-%dT%H:%M:%S')
+    results = []
+    for scale in scales:
+        rows = synthetic.parse_rows(scale)
+        with ProcessPoolExecutor(1) as pool:
+            results += pool.submit(_benchmark_scale, rows, data_dir, seed).result()
+    df = pd.DataFrame(results)
+    df.insert(0, 'Versão', version)
+    df.insert(1, 'Data', created)
+    return df[['Versão', 'Data', 'Linhas', 'Etapa', 'Tempo (s)', 'Linhas/s', 'Memória pico (MB)', 'RSS (MB)']]
+
+
+def save_results(df, path=RESULTS_PATH):
+    """Acrescenta os resultados ao histórico."""
+    df.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+
+def compare(history, baseline, version, tolerance=TOLERANCE):
+    """Tempo e memória de `version` em relação a `baseline`, por escala e etapa.
+
+    Com várias execuções da mesma versão vale a mais recente.
+    """
+    def latest(name):
+        runs = history[history['Versão'] == name]
+        if runs.empty:
+            raise ValueError(f'Versão sem resultados: {name}')
+        return runs.drop_duplicates(['Linhas', 'Etapa'], keep='last').set_index(['Linhas', 'Etapa'])
+
+    before, after = latest(baseline), latest(version)
+    table = pd.DataFrame({
+        'Tempo antes (s)': before['Tempo (s)'],
+        'Tempo depois (s)': after['Tempo (s)'],
+        'Memória antes (MB)': before['Memória pico (MB)'],
+        'Memória depois (MB)': after['Memória pico (MB)'],
+    }).dropna()
+    table['Tempo (razão)'] = table['Tempo depois (s)'] / table['Tempo antes (s)']
+    table['Memória (razão)'] = table['Memória depois (MB)'] / table['Memória antes (MB)'].clip(lower=1e-3)
+    slower = ((table['Tempo (razão)'] > 1 + tolerance)
+              & (table['Tempo depois (s)'] - table['Tempo antes (s)'] > MIN_SECONDS))
+    heavier = ((table['Memória (razão)'] > 1 + tolerance)
+               & (table['Memória depois (MB)'] - table['Memória antes (MB)'] > MIN_MB))
+    table['Regressão'] = slower | heavier
+    table = table.reset_index()
+    table['Etapa'] = pd.Categorical(table['Etapa'], STAGES, ordered=True)
+    return table.sort_values(['Linhas', 'Etapa'], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede as etapas do pipeline com dados sintéticos em escala.')
+    parser.add_argument('--rows', nargs='+', default=SCALES, help='escalas (ex.: 500k 5M 50M)')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='onde ficam os CSVs sintéticos gerados')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--compare', metavar='VERSÃO', default=None,
+                        help='compara a versão atual com uma versão anterior do histórico')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--no-run', action='store_true', help='apenas compara, sem medir novamente')
+    args = parser.parse_args()
+
+    version = code_version()
+    if not args.no_run:
+        results = run_benchmark(args.rows, args.data_dir, args.seed)
+        save_results(results, args.output)
+        with pd.option_context('display.width', 200, 'display.float_format', '{:,.2f}'.format):
+            print(results.drop(columns=['Versão', 'Data']).to_string(index=False))
+        print(f'Versão {version} -> {args.output}')
+
+    if args.compare:
+        table = compare(pd.read_csv(args.output), args.compare, version, args.tolerance)
+        with pd.option_context('display.width', 200, 'display.float_format', '{:,.2f}'.format):
+            print(table.to_string(index=False))
+        if table['Regressão'].any():
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
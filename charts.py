@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Gráficos do dashboard gerados a partir de tabelas agregadas.
+#
+# As agregações por trás de cada gráfico do TP9.py são calculadas uma vez por versão do
+# dataset; os gráficos são desenhados no navegador (Vega-Lite/Altair) a partir dessas
+# tabelas pequenas, em vez de abrir PNGs exportados pelo notebook.
+
+import altair as alt
+
+from aggregation import EDA_SPECS, aggregate
+
+
+def _as_labels(table, *columns):
+    # Altair trata melhor rótulos como texto do que categorias do pandas
+    table = table.copy()
+    for column in columns:
+        table[column] = table[column].astype(str)
+    return table
+
+
+def compute_aggregates(df):
+    """Tabelas agregadas dos gráficos da análise exploratória (df já sem outliers)."""
+    tables, _ = aggregate(df, EDA_SPECS)
+    tables['gender_mean'] = _as_labels(tables['gender_mean'], 'Gender')
+    tables['age_gender_count'] = _as_labels(tables['age_gender_count'], 'Age', 'Gender')
+    tables['city_sum'] = _as_labels(tables['city_sum'], 'City_Category')
+    tables['years_sum'] = _as_labels(tables['years_sum'], 'Stay_In_Current_City_Years')
+    tables['marital_count']['Marital_Status'] = tables['marital_count']['Marital_Status'].map(
+        {0: 'Not married', 1: 'Married'})
+    return tables
+
+
+def correlation(encoded_df):
+    """Matriz de correlação no formato longo (linha, coluna, valor), usada pelo heatmap."""
+    _, moments = aggregate(encoded_df, [], moments=encoded_df.columns)
+    corr = moments.correlation()
+    return corr.rename_axis('Variável 1').reset_index().melt(
+        id_vars='Variável 1', var_name='Variável 2', value_name='Correlação')
+
+
+def bar_chart(table, x, y, title, sort=None):
+    return alt.Chart(table, title=title).mark_bar().encode(
+        x=alt.X(f'{x}:N', sort=sort),
+        y=alt.Y(f'{y}:Q'),
+        tooltip=[x, y],
+    )
+
+
+def grouped_count_chart(table, x, color, title):
+    return alt.Chart(table, title=title).mark_bar().encode(
+        x=alt.X(f'{x}:N'),
+        xOffset=f'{color}:N',
+        y='Count:Q',
+        color=f'{color}:N',
+        tooltip=[x, color, 'Count'],
+    )
+
+
+def scatter_chart(table, x, y, title):
+    return alt.Chart(table, title=title).mark_circle(size=80).encode(
+        x=alt.X(f'{x}:N'),
+        y=alt.Y(f'{y}:Q'),
+        tooltip=[x, y],
+    )
+
+
+def pie_chart(table, category, value):
+    total = table[value].sum()
+    table = table.assign(Percentual=(table[value] / total * 100).round(1))
+    return alt.Chart(table).mark_arc().encode(
+        theta=f'{value}:Q',
+        color=f'{category}:N',
+        tooltip=[category, value, 'Percentual'],
+    )
+
+
+def heatmap_chart(table):
+    base = alt.Chart(table).encode(
+        x=alt.X('Variável 2:N', sort=None, title=None),
+        y=alt.Y('Variável 1:N', sort=None, title=None),
+    )
+    cells = base.mark_rect().encode(
+        color=alt.Color('Correlação:Q', scale=alt.Scale(scheme='redblue', domain=[-1, 1], reverse=True)),
+    )
+    text = base.mark_text(fontSize=10).encode(text=alt.Text('Correlação:Q', format='.2f'))
+    return cells + text
+
+
+def tradeoff_chart(results):
+    """Erro (RMSE) x custo (vazão de predição) de cada modelo comparado."""
+    return alt.Chart(results, title='RMSE x vazão de predição').mark_circle(size=120).encode(
+        x=alt.X('Predição (linhas/s):Q', scale=alt.Scale(type='log')),
+        y=alt.Y('RMSE:Q', scale=alt.Scale(zero=False)),
+        color='Modelo:N',
+        tooltip=list(results.columns),
+    )
+
+
+def cube_chart(table, by, value):
+    """Consulta do cubo: barras para uma dimensão, mapa de calor para duas."""
+    table = _as_labels(table, *by)
+    if len(by) == 1:
+        return bar_chart(table, by[0], value, f'{value} por {by[0]}')
+    return alt.Chart(table, title=f'{value} por {by[0]} e {by[1]}').mark_rect().encode(
+        x=alt.X(f'{by[1]}:N'),
+        y=alt.Y(f'{by[0]}:N'),
+        color=alt.Color(f'{value}:Q', scale=alt.Scale(scheme='blues')),
+        tooltip=list(by) + ['Registros', value],
+    )
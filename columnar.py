@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Dataset codificado em formato colunar binário (Arrow IPC), no lugar do encoded_black_friday.csv.
+#
+# As colunas são gravadas com os tipos compactos do encoder (int8/int32), sem compressão, para
+# que os consumidores (treino, dashboard, scorer) abram o arquivo com memory-map em vez de
+# interpretar texto: as páginas do arquivo são compartilhadas entre processos e as colunas
+# numéricas viram arrays do numpy sem cópia. Ao lado do arquivo fica um manifesto JSON com o
+# esquema, o número de linhas, a versão do formato e o SHA-256 do arquivo. O esquema e o número
+# de linhas são conferidos em toda leitura; o hash, que exige ler o arquivo inteiro, só quando
+# pedido (verify=True), por exemplo depois de copiar o arquivo para outra máquina.
+
+import hashlib
+import json
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+
+ENCODED_PATH = 'encoded_black_friday.arrow'
+FORMAT_VERSION = 1
+
+
+def manifest_path(path):
+    return path + '.json'
+
+
+def _schema_dict(schema):
+    return {field.name: str(field.type) for field in schema}
+
+
+class EncodedWriter:
+    """Grava o dataset codificado em blocos (ex.: pelo pipeline em streaming)."""
+
+    def __init__(self, path=ENCODED_PATH):
+        self.path = path
+        self.rows = 0
+        self._sink = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._sink = pa.OSFile(self.path, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, table.schema)
+            self._schema = table.schema
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._sink.close()
+        self._writer = None
+        manifest = {
+            'format': 'arrow-ipc',
+            'format_version': FORMAT_VERSION,
+            'rows': self.rows,
+            'schema': _schema_dict(self._schema),
+            'sha256': _file_hash(self.path),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with open(manifest_path(self.path), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_encoded(df, path=ENCODED_PATH):
+    with EncodedWriter(path) as writer:
+        writer.write(df)
+
+
+def read_manifest(path=ENCODED_PATH):
+    with open(manifest_path(path)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f'{path}: versão de formato {manifest.get("format_version")} não suportada')
+    return manifest
+
+
+def verify(path=ENCODED_PATH, manifest=None):
+    """Confere o SHA-256 do arquivo com o registrado no manifesto."""
+    manifest = manifest or read_manifest(path)
+    if _file_hash(path) != manifest.get('sha256'):
+        raise ValueError(f'{path}: conteúdo não corresponde ao hash do manifesto')
+
+
+def open_table(path=ENCODED_PATH, verify_hash=False):
+    """Tabela Arrow com memory-map do arquivo, conferida contra o esquema do manifesto."""
+    manifest = read_manifest(path)
+    if verify_hash:
+        verify(path, manifest)
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    if _schema_dict(table.schema) != manifest['schema'] or table.num_rows != manifest['rows']:
+        raise ValueError(f'{path} não corresponde ao manifesto')
+    return table
+
+
+def read_encoded(path=ENCODED_PATH, verify_hash=False):
+    """DataFrame do dataset codificado; colunas numéricas sem ausentes apontam para o memory-map."""
+    return open_table(path, verify_hash).to_pandas(split_blocks=True)
+
+
+def read_frame(path, verify_hash=False):
+    """Lê o dataset codificado em Arrow ou, para arquivos antigos, em CSV."""
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    return read_encoded(path, verify_hash)
+
+
+def read_chunks(path, chunksize=100_000, verify_hash=False):
+    """Blocos de até `chunksize` linhas do dataset codificado (Arrow ou CSV)."""
+    if path.endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=chunksize)
+        return
+    table = open_table(path, verify_hash)
+    for start in range(0, table.num_rows, chunksize):
+        yield table.slice(start, chunksize).to_pandas(split_blocks=True)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Validação cruzada k-fold em paralelo.
+#
+# A matriz de features e o alvo são gravados uma única vez como .npy e abertos por cada
+# processo do pool com memory-map: os processos leem as mesmas páginas do arquivo (sem
+# cópias serializadas de x_train por fold). Cada tarefa recebe apenas o número do fold e
+# recalcula os índices a partir da semente, então a memória não cresce com o número de folds.
+
+import argparse
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+from sklearn.model_selection import KFold
+
+from benchmark_models import MODELS
+from columnar import ENCODED_PATH, read_frame
+
+
+_data = {}
+
+
+def share_matrix(x, y, directory):
+    """Grava x e y como .npy em `directory` e devolve os caminhos."""
+    x_path = os.path.join(directory, 'x.npy')
+    y_path = os.path.join(directory, 'y.npy')
+    np.save(x_path, np.ascontiguousarray(x))
+    np.save(y_path, np.ascontiguousarray(y))
+    return x_path, y_path
+
+
+def _open(x_path, y_path):
+    _data['x'] = np.load(x_path, mmap_mode='r')
+    _data['y'] = np.load(y_path, mmap_mode='r')
+
+
+def fold_indices(n, n_splits, fold, seed):
+    splitter = KFold(n_splits, shuffle=True, random_state=seed)
+    for i, (train, test) in enumerate(splitter.split(np.empty((n, 0)))):
+        if i == fold:
+            return train, test
+    raise ValueError(f'Fold inválido: {fold}')
+
+
+def run_fold(model_name, fold, n_splits, seed):
+    """Treina e avalia um fold, lendo os dados do memory-map do processo."""
+    x, y = _data['x'], _data['y']
+    train, test = fold_indices(len(y), n_splits, fold, seed)
+    model = MODELS[model_name]()
+    model.fit(x[train], y[train])
+    y_pred = model.predict(x[test])
+    mse = mean_squared_error(y[test], y_pred)
+    return {
+        'Modelo': model_name,
+        'Fold': fold + 1,
+        'MSE': mse,
+        'RMSE': np.sqrt(mse),
+        'MAE': mean_absolute_error(y[test], y_pred),
+    }
+
+
+def cross_validate(x, y, models=('linear',), n_splits=5, seed=42, processes=None, directory=None):
+    """Métricas por fold e resumo (média e desvio padrão) de cada modelo."""
+    models = list(models)
+    tasks = [(model, fold) for model in models for fold in range(n_splits)]
+    processes = processes or min(len(tasks), os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        x_path, y_path = share_matrix(x, y, tmp)
+        with ProcessPoolExecutor(processes, initializer=_open, initargs=(x_path, y_path)) as pool:
+            folds = list(pool.map(run_fold, [model for model, _ in tasks], [fold for _, fold in tasks],
+                                  [n_splits] * len(tasks), [seed] * len(tasks)))
+    folds = pd.DataFrame(folds)
+    summary = folds.groupby('Modelo')[['MSE', 'RMSE', 'MAE']].agg(['mean', 'std'])
+    return folds, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validação cruzada k-fold em paralelo com dados em memory-map.')
+    parser.add_argument('--data', default=ENCODED_PATH, help='dataset codificado (.arrow ou .csv)')
+    parser.add_argument('--target', default='Purchase')
+    parser.add_argument('--models', nargs='+', default=['linear'], choices=list(MODELS))
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--verify', action='store_true', help='confere o hash do arquivo com o manifesto')
+    args = parser.parse_args()
+
+    df = read_frame(args.data, args.verify)
+    x = df.drop(columns=args.target).to_numpy()
+    y = df[args.target].to_numpy()
+    del df
+    folds, summary = cross_validate(x, y, args.models, args.folds, processes=args.processes)
+    print(folds.to_string(index=False))
+    print()
+    print(summary.to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Cubo de agregação de Purchase sobre as dimensões de baixa cardinalidade do dataset.
+#
+# Cada combinação de Gender, Age, Occupation, City_Category, Stay_In_Current_City_Years,
+# Marital_Status e Product_Category_1 é uma célula de um array denso (2 x 7 x 21 x 3 x 5 x
+# 2 x 20 = 176.400 células) com contagem, soma e soma dos quadrados de Purchase, calculadas
+# em uma passada com np.bincount sobre o código de base mista de cada linha. Qualquer
+# combinação de filtros e de dimensões de detalhamento é respondida fatiando o cubo
+# (np.take nos valores filtrados) e somando os eixos restantes, sem voltar às linhas; média
+# e desvio padrão saem das três medidas. O cubo pode ser montado em blocos (update/merge) e
+# salvo em .npz.
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from encoder import MAPPING_AGE, MAPPING_CITY_CATEGORY, MAPPING_GENDER, MAPPING_STAY_YEARS
+from feature_store import LookupIndex
+
+
+CUBE_PATH = 'purchase_cube.npz'
+
+# Dimensões e seus rótulos, na ordem dos eixos do cubo
+DIMENSIONS = {
+    'Gender': list(MAPPING_GENDER),
+    'Age': list(MAPPING_AGE),
+    'Occupation': list(range(21)),
+    'City_Category': list(MAPPING_CITY_CATEGORY),
+    'Stay_In_Current_City_Years': list(MAPPING_STAY_YEARS),
+    'Marital_Status': [0, 1],
+    'Product_Category_1': list(range(1, 21)),
+}
+
+MEASURES = ('Registros', 'Total', 'Média', 'Desvio padrão')
+
+
+class Cube:
+    def __init__(self, dimensions=DIMENSIONS, measure='Purchase'):
+        self.dimensions = {name: list(labels) for name, labels in dimensions.items()}
+        self.measure = measure
+        self.shape = tuple(len(labels) for labels in self.dimensions.values())
+        size = int(np.prod(self.shape))
+        self.count = np.zeros(size, dtype=np.float64)
+        self.sum = np.zeros(size, dtype=np.float64)
+        self.sumsq = np.zeros(size, dtype=np.float64)
+        # Linhas com valor fora dos rótulos de alguma dimensão ficam fora do cubo
+        self.dropped = 0
+        self._indexes = {name: LookupIndex(labels) for name, labels in self.dimensions.items()}
+
+    def update(self, block):
+        """Acumula um bloco de linhas nas células do cubo."""
+        codes = np.zeros(len(block), dtype=np.int64)
+        valid = np.ones(len(block), dtype=bool)
+        for (name, index), size in zip(self._indexes.items(), self.shape):
+            local = index.rows(block[name])
+            valid &= local >= 0
+            codes = codes * size + local
+        y = block[self.measure].to_numpy(dtype=np.float64)
+        valid &= ~np.isnan(y)
+        codes, y = codes[valid], y[valid]
+        self.dropped += int(len(block) - len(codes))
+        self.count += np.bincount(codes, minlength=len(self.count))
+        self.sum += np.bincount(codes, weights=y, minlength=len(self.sum))
+        self.sumsq += np.bincount(codes, weights=y * y, minlength=len(self.sumsq))
+        return self
+
+    def merge(self, other):
+        if other.dimensions != self.dimensions or other.measure != self.measure:
+            raise ValueError('Só é possível unir cubos com as mesmas dimensões e medida')
+        self.count += other.count
+        self.sum += other.sum
+        self.sumsq += other.sumsq
+        self.dropped += other.dropped
+        return self
+
+    @property
+    def rows(self):
+        return int(self.count.sum())
+
+    def query(self, filters=None, by=()):
+        """Medidas agregadas por `by` (lista de dimensões), só nas células que passam em `filters`.
+
+        `filters` é um dicionário dimensão -> rótulos aceitos; dimensões ausentes não filtram.
+        Combinações sem nenhum registro não aparecem no resultado.
+        """
+        filters = filters or {}
+        by = list(by)
+        unknown = (set(filters) | set(by)) - set(self.dimensions)
+        if unknown:
+            raise ValueError(f'Dimensões desconhecidas: {sorted(unknown)}')
+
+        arrays = [a.reshape(self.shape) for a in (self.count, self.sum, self.sumsq)]
+        labels = {}
+        for axis, (name, dimension_labels) in enumerate(self.dimensions.items()):
+            if name in filters:
+                wanted = set(filters[name])
+                positions = [i for i, label in enumerate(dimension_labels) if label in wanted]
+                arrays = [np.take(a, positions, axis=axis) for a in arrays]
+                labels[name] = [dimension_labels[i] for i in positions]
+            else:
+                labels[name] = dimension_labels
+
+        names = list(self.dimensions)
+        reduce = tuple(axis for axis, name in enumerate(names) if name not in by)
+        kept = [name for name in names if name in by]
+        count, total, sumsq = (np.transpose(a.sum(axis=reduce), [kept.index(name) for name in by])
+                               for a in arrays)
+        count, total, sumsq = count.reshape(-1), total.reshape(-1), sumsq.reshape(-1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            # Desvio padrão amostral (ddof=1), como no pandas
+            variance = np.maximum(sumsq - total * mean, 0) / (count - 1)
+        table = pd.DataFrame({
+            'Registros': count.astype(np.int64),
+            'Total': total,
+            'Média': mean,
+            'Desvio padrão': np.where(count > 1, np.sqrt(variance), np.nan),
+        })
+        if by:
+            index = pd.MultiIndex.from_product([labels[name] for name in by], names=by)
+            table = table.set_index(index).reset_index()
+        return table[table['Registros'] > 0].reset_index(drop=True)
+
+    def save(self, path=CUBE_PATH):
+        arrays = {f'labels_{i}': np.asarray(labels) for i, labels in enumerate(self.dimensions.values())}
+        np.savez(path, count=self.count, sum=self.sum, sumsq=self.sumsq, dropped=self.dropped,
+                 names=np.asarray(list(self.dimensions)), measure=self.measure, **arrays)
+
+    @classmethod
+    def load(cls, path=CUBE_PATH):
+        with np.load(path) as data:
+            names = data['names'].tolist()
+            dimensions = {name: data[f'labels_{i}'].tolist() for i, name in enumerate(names)}
+            cube = cls(dimensions, str(data['measure']))
+            cube.count, cube.sum, cube.sumsq = data['count'], data['sum'], data['sumsq']
+            cube.dropped = int(data['dropped'])
+        return cube
+
+
+def build(df, dimensions=DIMENSIONS, measure='Purchase', block_size=1 << 20):
+    """Cubo de um DataFrame já carregado, montado em blocos."""
+    cube = Cube(dimensions, measure)
+    for start in range(0, len(df), block_size):
+        cube.update(df.iloc[start:start + block_size])
+    return cube
+
+
+def main():
+    from loader import DTYPES
+    from preprocessing import drop_outliers, fill_missing
+
+    parser = argparse.ArgumentParser(description='Monta o cubo de agregação de Purchase a partir do CSV.')
+    parser.add_argument('source', nargs='?', default='black_friday_sales.csv')
+    parser.add_argument('--output', default=CUBE_PATH)
+    parser.add_argument('--keep-outliers', action='store_true', help='não remove os outliers antes de agregar')
+    args = parser.parse_args()
+
+    df = fill_missing(pd.read_csv(args.source, dtype=DTYPES))
+    if not args.keep_outliers:
+        df = drop_outliers(df)
+    cube = build(df)
+    cube.save(args.output)
+    print(f'{cube.rows} registros em {len(cube.count)} células ({cube.dropped} fora das dimensões) -> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
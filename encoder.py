@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Codificação das variáveis categóricas com tabelas de códigos fixas.
+#
+# Cada coluna tem uma tabela rótulo -> código definida uma única vez. Codificar um bloco é
+# uma consulta em vetor de inteiros: para colunas categóricas (como as do loader.py) os
+# códigos internos do pandas são convertidos por uma tabela pequena (uma entrada por
+# categoria); para texto, os valores são primeiro convertidos para o tipo categórico fixo.
+# O resultado é int8. Rótulos fora da tabela geram erro em vez de virar NaN, e o encoder
+# pode ser salvo em JSON para que a mesma codificação seja aplicada na predição.
+
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# Tabelas de códigos do TP9.py
+MAPPING_GENDER = {'F': 0, 'M': 1}
+MAPPING_AGE = {'0-17': 1, '18-25': 2, '26-35': 3, '36-45': 4, '46-50': 5, '51-55': 6, '55+': 7}
+MAPPING_CITY_CATEGORY = {'A': 1, 'B': 2, 'C': 3}
+MAPPING_STAY_YEARS = {'0': 0, '1': 1, '2': 2, '3': 3, '4+': 4}
+
+DEFAULT_TABLES = {
+    'Gender': MAPPING_GENDER,
+    'Age': MAPPING_AGE,
+    'City_Category': MAPPING_CITY_CATEGORY,
+    'Stay_In_Current_City_Years': MAPPING_STAY_YEARS,
+}
+
+
+class UnknownCategoryError(ValueError):
+    """Valor de uma coluna categórica sem código na tabela do encoder."""
+
+
+class CategoricalEncoder:
+    """Converte colunas categóricas em códigos int8 segundo tabelas fixas."""
+
+    def __init__(self, tables=None):
+        tables = DEFAULT_TABLES if tables is None else tables
+        self.tables = {column: dict(table) for column, table in tables.items()}
+        self._dtypes = {}
+        self._codes = {}
+        for column, table in self.tables.items():
+            codes = np.array(list(table.values()))
+            if codes.min() < np.iinfo(np.int8).min or codes.max() > np.iinfo(np.int8).max:
+                raise ValueError(f'Os códigos de {column} não cabem em int8')
+            self._dtypes[column] = pd.CategoricalDtype(list(table))
+            self._codes[column] = codes.astype(np.int8)
+
+    @property
+    def columns(self):
+        return list(self.tables)
+
+    def encode_column(self, column, values):
+        """Códigos int8 de uma coluna (Series, array ou lista de rótulos)."""
+        series = values if isinstance(values, pd.Series) else pd.Series(values)
+        table, codes = self.tables[column], self._codes[column]
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Converte as categorias do bloco (poucas) para posições na tabela fixa
+            position = {label: i for i, label in enumerate(table)}
+            lut = np.array([position.get(str(label), -1) for label in series.cat.categories], dtype=np.int64)
+            local = series.cat.codes.to_numpy()
+            index = np.where(local >= 0, lut[local] if len(lut) else local, -1)
+        else:
+            index = pd.Categorical(series.astype(str).where(series.notna()),
+                                   dtype=self._dtypes[column]).codes
+
+        unknown = index < 0
+        if unknown.any():
+            invalid = series[unknown]
+            labels = sorted(invalid.dropna().astype(str).unique())
+            if invalid.isna().any():
+                labels.append('<ausente>')
+            raise UnknownCategoryError(f'{column}: valores sem código na tabela: {labels}')
+        return codes[index]
+
+    def encode_values(self, column, values):
+        """Códigos de uma lista curta de rótulos por consulta direta à tabela.
+
+        Para poucos valores (uma requisição de predição) é mais rápido que passar pelo pandas.
+        """
+        table = self.tables[column]
+        try:
+            return np.array([table[str(value)] for value in values], dtype=np.int8)
+        except KeyError as error:
+            raise UnknownCategoryError(f'{column}: valor sem código na tabela: {error.args[0]}') from None
+
+    def transform(self, df):
+        """Novo DataFrame com as colunas do encoder codificadas; as demais colunas são reaproveitadas."""
+        columns = {}
+        for column in df.columns:
+            if column in self.tables:
+                columns[column] = pd.Series(self.encode_column(column, df[column]), index=df.index, name=column)
+            else:
+                columns[column] = df[column]
+        return pd.DataFrame(columns, index=df.index, copy=False)
+
+    def to_dict(self):
+        return {'tables': self.tables}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['tables'])
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Features agregadas por cliente (User_ID) e por produto (Product_ID).
+#
+# O TP9.py descarta os IDs, mas o histórico de compras de cada cliente e de cada produto é o
+# sinal mais forte para prever Purchase. As agregações (número de compras, média suavizada e
+# mediana de Purchase, e a participação de cada categoria principal nas compras do cliente)
+# são calculadas uma vez, só com os dados de treino, e guardadas em tabelas indexadas pelo
+# código inteiro da chave. Consultar as features de um bloco é um gather nesses vetores: o
+# rótulo é convertido em linha da tabela por um vetor denso (IDs inteiros) ou pela tabela
+# de categorias (Product_ID categórico), sem merge do pandas. Chaves desconhecidas caem na
+# última linha de cada tabela, com os valores globais.
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import KFold
+
+from aggregation import MAX_DENSE_CODES, _local_codes
+
+
+KEYS = {'User_ID': 'user', 'Product_ID': 'product'}
+CATEGORY_COLUMN = 'Product_Category_1'
+STATS = ('count', 'mean', 'median')
+FEATURES = [f'{prefix}_{stat}' for prefix in KEYS.values() for stat in STATS] + ['user_category_share']
+# Features que não usam o Purchase: no treino vêm das tabelas do treino inteiro, como na predição
+TARGET_FREE = [f'{prefix}_count' for prefix in KEYS.values()] + ['user_category_share']
+
+# Peso (em número de compras) da média global na média suavizada de cada chave
+SMOOTHING = 20
+
+
+class LookupIndex:
+    """Rótulos de uma chave -> linha da tabela de features (-1 para rótulos desconhecidos)."""
+
+    def __init__(self, labels):
+        self.labels = np.asarray(labels)
+        self._dense = None
+        self._positions = None
+        if np.issubdtype(self.labels.dtype, np.integer) and len(self.labels):
+            low, high = int(self.labels.min()), int(self.labels.max())
+            if high - low < MAX_DENSE_CODES:
+                self._low = low
+                self._dense = np.full(high - low + 1, -1, dtype=np.int64)
+                self._dense[self.labels - low] = np.arange(len(self.labels))
+        if self._dense is None:
+            self._order = np.argsort(self.labels, kind='stable')
+            self._sorted = self.labels[self._order]
+
+    def _search(self, values):
+        values = np.asarray(values)
+        if self.labels.dtype.kind == 'U':
+            values = values.astype(str)
+        if not len(self._sorted):
+            return np.full(len(values), -1, dtype=np.int64)
+        position = np.searchsorted(self._sorted, values).clip(0, len(self._sorted) - 1)
+        return np.where(self._sorted[position] == values, self._order[position], -1)
+
+    def _lookup(self, values):
+        if self._dense is None:
+            return self._search(values)
+        values = np.asarray(values)
+        if not np.issubdtype(values.dtype, np.integer):
+            return np.full(len(values), -1, dtype=np.int64)
+        offset = values.astype(np.int64) - self._low
+        inside = (offset >= 0) & (offset < len(self._dense))
+        return np.where(inside, self._dense[offset.clip(0, len(self._dense) - 1)], -1)
+
+    def _listed(self, values):
+        """Consulta valor a valor em um dicionário (listas curtas, possivelmente com tipos misturados)."""
+        if self._positions is None:
+            self._positions = {label: i for i, label in enumerate(self.labels.tolist())}
+        if self.labels.dtype.kind == 'U':
+            keys = [str(value) for value in values]
+        elif self.labels.dtype.kind in 'iu':
+            # Como no caminho vetorizado, só valores inteiros casam com rótulos inteiros
+            keys = [value if isinstance(value, (int, np.integer)) and not isinstance(value, bool) else None
+                    for value in values]
+        else:
+            keys = values
+        return np.array([self._positions.get(key, -1) for key in keys], dtype=np.int64)
+
+    def rows(self, values):
+        """Linha de cada valor; colunas categóricas são consultadas uma vez por categoria."""
+        # Listas vêm de registros de requisições (serve.py): poucos valores, sem passar pelo pandas
+        if isinstance(values, (list, tuple)):
+            return self._listed(values)
+        series = values if isinstance(values, pd.Series) else pd.Series(values)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            lut = self._lookup(series.cat.categories.to_numpy())
+            # O código -1 (ausente) pega o -1 acrescentado ao final da tabela
+            return np.append(lut, -1)[series.cat.codes.to_numpy()]
+        if self._dense is None:
+            return self.rows(series.astype('category'))
+        return self._lookup(series.to_numpy())
+
+
+def _group_stats(codes, size, y, smoothing, global_mean, global_median):
+    """Contagem, média suavizada e mediana de y por código; última linha = valores globais."""
+    count = np.bincount(codes, minlength=size).astype(np.float64)
+    total = np.bincount(codes, weights=y, minlength=size)
+    mean = (total + smoothing * global_mean) / (count + smoothing)
+
+    # Mediana por grupo: y ordenado dentro de cada código, elementos do meio de cada trecho
+    sorted_y = y[np.lexsort((y, codes))]
+    starts = np.concatenate([[0], np.cumsum(count)[:-1]]).astype(np.int64)
+    n = count.astype(np.int64)
+    low = sorted_y[(starts + (n - 1) // 2).clip(0, len(y) - 1)]
+    high = sorted_y[(starts + n // 2).clip(0, len(y) - 1)]
+    median = np.where(n > 0, (low + high) / 2, global_median)
+
+    table = np.column_stack([count, mean, median])
+    return np.vstack([table, [0.0, global_mean, global_median]])
+
+
+class FeatureStore:
+    def __init__(self, smoothing=SMOOTHING, target='Purchase'):
+        self.smoothing = smoothing
+        self.target = target
+        self.indexes = {}
+        self.tables = {}
+        self.category_share = None
+
+    @property
+    def inputs(self):
+        """Colunas do dataset original necessárias para consultar as features."""
+        return list(KEYS) + [CATEGORY_COLUMN]
+
+    def fit(self, df):
+        """Calcula as tabelas a partir de `df` (somente dados de treino)."""
+        y = df[self.target].to_numpy(dtype=np.float64)
+        global_mean, global_median = float(y.mean()), float(np.median(y))
+        for key, prefix in KEYS.items():
+            codes, labels = _local_codes(df[key])
+            self.indexes[key] = LookupIndex(labels)
+            self.tables[prefix] = _group_stats(codes, len(labels), y, self.smoothing, global_mean, global_median)
+
+        # Participação de cada categoria principal nas compras do cliente
+        user_codes, users = _local_codes(df['User_ID'])
+        categories = df[CATEGORY_COLUMN].to_numpy().astype(np.int64)
+        n_categories = int(categories.max()) + 1
+        counts = np.bincount(user_codes * n_categories + categories,
+                             minlength=len(users) * n_categories).reshape(len(users), n_categories)
+        overall = np.bincount(categories, minlength=n_categories)
+        counts = np.vstack([counts, overall])
+        self.category_share = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+        return self
+
+    def transform(self, df):
+        """Features de cada linha de `df` (DataFrame ou dicionário de colunas)."""
+        index = df.index if isinstance(df, pd.DataFrame) else None
+        return pd.DataFrame(self.transform_arrays(df), index=index, columns=FEATURES)
+
+    def transform_arrays(self, df):
+        """Como transform(), mas devolve um dicionário feature -> array, sem montar o DataFrame."""
+        features = {}
+        rows = {}
+        for key, prefix in KEYS.items():
+            rows[key] = self.indexes[key].rows(df[key])
+            table = self.tables[prefix][rows[key]]
+            for j, stat in enumerate(STATS):
+                features[f'{prefix}_{stat}'] = table[:, j]
+        categories = np.asarray(df[CATEGORY_COLUMN]).astype(np.int64)
+        inside = (categories >= 0) & (categories < self.category_share.shape[1])
+        share = self.category_share[rows['User_ID'], categories.clip(0, self.category_share.shape[1] - 1)]
+        features['user_category_share'] = np.where(inside, share, 0.0)
+        return features
+
+    def fit_transform(self, df, n_splits=5, seed=42):
+        """Features de treino e ajuste final em `df`.
+
+        As estatísticas de Purchase vêm de validação cruzada (sem usar o Purchase da própria
+        linha). As contagens e a participação da categoria não usam o alvo e vêm do ajuste em
+        `df` inteiro: calculadas fora do fold, seriam ~(k-1)/k das vistas na predição.
+        """
+        out = np.empty((len(df), len(FEATURES)), dtype=np.float64)
+        for train, test in KFold(n_splits, shuffle=True, random_state=seed).split(np.empty((len(df), 0))):
+            fold = FeatureStore(self.smoothing, self.target).fit(df.iloc[train])
+            out[test] = fold.transform(df.iloc[test]).to_numpy()
+        self.fit(df)
+        full = self.transform_arrays(df)
+        for column in TARGET_FREE:
+            out[:, FEATURES.index(column)] = full[column]
+        return pd.DataFrame(out, index=df.index, columns=FEATURES)
+
+    def save(self, path):
+        arrays = {f'labels_{key}': index.labels for key, index in self.indexes.items()}
+        arrays.update({f'table_{prefix}': table for prefix, table in self.tables.items()})
+        np.savez(path, category_share=self.category_share, smoothing=self.smoothing,
+                 target=self.target, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            store = cls(float(data['smoothing']), str(data['target']))
+            for key, prefix in KEYS.items():
+                store.indexes[key] = LookupIndex(data[f'labels_{key}'])
+                store.tables[prefix] = data[f'table_{prefix}']
+            store.category_share = data['category_share']
+        return store
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Figuras do relatório do TP9.py, uma função por gráfico.
+#
+# Cada função recebe os dados já preparados (dataset ou tabela agregada), desenha a figura
+# como no notebook, grava o PNG em `path` e fecha a figura. As figuras da distribuição e dos
+# boxplots (*_binned/*_stats) e prediction_density partem de resumos pequenos (histogramas,
+# estatísticas do boxplot, grade de densidade) calculados pelo report.py.
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+import missingness
+
+
+def _save(path):
+    plt.savefig(path, bbox_inches='tight')
+    plt.close('all')
+
+
+def missing_heatmap(missing, path, title):
+    missingness.plot(missing)
+    plt.title(title)
+    _save(path)
+
+
+def distribution_binned(counts, edges, mean, median, path):
+    plt.stairs(counts, edges, fill=True, alpha=0.75, edgecolor='white')
+    plt.xlabel('Purchase')
+    plt.ylabel('Count')
+    plt.axvline(mean, color='green')
+    plt.axvline(median, color='red')
+    _save(path)
+
+
+def target_boxplot_stats(stats, path):
+    # Mesmo desenho do sns.boxplot(x=purchase), a partir de quartis, bigodes e outliers já calculados
+    ax = plt.gca()
+    ax.bxp([stats], vert=False, widths=0.8, patch_artist=True, showfliers=True,
+           boxprops={'facecolor': sns.color_palette()[0]}, medianprops={'color': 'black'},
+           flierprops={'marker': 'd', 'markerfacecolor': 'gray', 'markeredgecolor': 'gray', 'markersize': 5})
+    ax.set_yticks([])
+    ax.set_xlabel(stats['label'])
+    _save(path)
+
+
+def describe_bars(purchase_desc, path):
+    plt.bar(purchase_desc.index, purchase_desc.values)
+    plt.title('Estatísticas Descritivas de Purchase')
+    plt.ylabel('Valores')
+    plt.xlabel('Estatísticas')
+    plt.xticks(rotation=45)
+    _save(path)
+
+
+def numeric_boxplots_stats(stats, path):
+    _, axes = plt.subplots(1, len(stats), figsize=(10, 4))
+    for ax, column_stats in zip(np.atleast_1d(axes), stats):
+        ax.bxp([column_stats])
+    plt.tight_layout()
+    _save(path)
+
+
+def gender_purchase(gender_df, path):
+    sns.barplot(x='Gender', y='Purchase', data=gender_df)
+    plt.title('Valor médio da compra por gênero')
+    _save(path)
+
+
+def age_purchase(age_gender_count, path):
+    sns.barplot(x='Age', y='Count', hue='Gender', data=age_gender_count)
+    plt.title('Contagem de compras por faixa etária e gênero')
+    _save(path)
+
+
+def occupation_purchase(occupation_df, path):
+    sns.barplot(x='Occupation', y='Purchase', data=occupation_df)
+    plt.title('Total gasto em compras por profissão do cliente')
+    _save(path)
+
+
+def city_purchase(purchase_per_city, path):
+    sns.barplot(x='City_Category', y='Purchase', data=purchase_per_city)
+    plt.title('Total gasto em cada cidade')
+    plt.xticks(rotation=45)
+    _save(path)
+
+
+def years_purchase(years_sum, path):
+    sns.scatterplot(data=years_sum.set_index('Stay_In_Current_City_Years')['Purchase'])
+    plt.title('Valor total das compras pelo tempo na cidade')
+    plt.grid()
+    _save(path)
+
+
+def marital_purchase(marital_count, path):
+    plt.pie(marital_count['Count'], labels=['Not married', 'Married'], autopct='%1.1f%%')
+    _save(path)
+
+
+def categories_count(category_count, path):
+    sns.barplot(x='Product_Category_1', y='Count', data=category_count)
+    plt.title('Total de observações de cada categoria principal')
+    _save(path)
+
+
+def categories_mean(category_mean, path):
+    sns.barplot(x='Product_Category_1', y='Purchase', data=category_mean)
+    plt.title('Total gasto em cada categoria')
+    plt.xticks(rotation=45)
+    _save(path)
+
+
+def correlation_heatmap(corr, path):
+    sns.heatmap(corr, cmap='coolwarm', vmin=-1, vmax=1, annot=True)
+    _save(path)
+
+
+def prediction_bars(y_test, y_pred, path, samples=25):
+    result_df = pd.DataFrame({'Valor Real': np.asarray(y_test)[:samples],
+                              'Valor Previsto': np.asarray(y_pred)[:samples]})
+    result_df.plot(kind='bar', figsize=(8, 6))
+    plt.title('Valores Reais vs. Valores Previstos')
+    plt.xlabel('Amostras')
+    plt.ylabel('Valores')
+    plt.xticks(rotation=45)
+    plt.legend()
+    _save(path)
+
+
+def prediction_regplot(y_test, y_pred, path):
+    sns.regplot(x=np.asarray(y_test), y=np.asarray(y_pred))
+    _save(path)
+
+
+def prediction_density(counts, x_edges, y_edges, line, path):
+    # Versão do regplot para muitos pontos: densidade dos pares (real, previsto) e a reta ajustada
+    ax = plt.gca()
+    mesh = ax.pcolormesh(x_edges, y_edges, counts.T, cmap='Blues', norm='log')
+    plt.colorbar(mesh, ax=ax, label='Registros')
+    slope, intercept = line
+    ax.plot(x_edges[[0, -1]], intercept + slope * x_edges[[0, -1]], color=sns.color_palette()[1])
+    _save(path)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Carregamento do dataset Black Friday Sales, compartilhado pelo TP9.py e pelo Streamlit.py.
+#
+# O CSV original é lido uma única vez com tipos compactos e salvo em um cache colunar (Feather)
+# ao lado do arquivo. As leituras seguintes usam o cache, que só é reconstruído quando o
+# arquivo de origem muda (tamanho/mtime diferentes e hash diferente).
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+
+# Tipos explícitos de cada coluna do dataset
+# Product_Category_2 e Product_Category_3 possuem valores ausentes, por isso ficam como float32
+DTYPES = {
+    'User_ID': 'int32',
+    'Product_ID': 'category',
+    'Gender': 'category',
+    'Age': 'category',
+    'Occupation': 'int8',
+    'City_Category': 'category',
+    'Stay_In_Current_City_Years': 'category',
+    'Marital_Status': 'int8',
+    'Product_Category_1': 'int8',
+    'Product_Category_2': 'float32',
+    'Product_Category_3': 'float32',
+    'Purchase': 'int32',
+}
+
+CACHE_VERSION = 1
+
+
+def file_hash(path, block_size=1 << 20):
+    """Calcula o SHA-256 do conteúdo do arquivo."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(path):
+    """Identificação barata da versão do arquivo (tamanho e mtime)."""
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def cache_paths(path):
+    base, _ = os.path.splitext(path)
+    return base + '.feather', base + '.feather.json'
+
+
+def read_csv(path):
+    """Lê o CSV original com os tipos compactos definidos em DTYPES."""
+    return pd.read_csv(path, dtype=DTYPES)
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(manifest_path, manifest):
+    try:
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+    except OSError:
+        pass
+
+
+def _write_cache(df, cache_path, manifest_path, manifest):
+    try:
+        df.to_feather(cache_path)
+    except OSError:
+        # Diretório somente leitura: seguimos sem cache
+        return
+    _write_manifest(manifest_path, manifest)
+
+
+def dataset_version(path):
+    """Hash do conteúdo do arquivo, reaproveitando o manifesto do cache quando possível."""
+    size, mtime = fingerprint(path)
+    _, manifest_path = cache_paths(path)
+    manifest = _read_manifest(manifest_path)
+    if manifest and manifest.get('size') == size and manifest.get('mtime_ns') == mtime:
+        return manifest['sha256']
+    return file_hash(path)
+
+
+def load_sales(path='black_friday_sales.csv'):
+    """Carrega o dataset, usando o cache colunar quando ele ainda é válido."""
+    cache_path, manifest_path = cache_paths(path)
+    size, mtime = fingerprint(path)
+    manifest = _read_manifest(manifest_path)
+
+    if manifest and manifest.get('version') == CACHE_VERSION and os.path.exists(cache_path):
+        if manifest.get('size') == size and manifest.get('mtime_ns') == mtime:
+            return pd.read_feather(cache_path)
+
+        # O mtime mudou, mas o conteúdo pode ser o mesmo (ex.: cópia do arquivo)
+        sha256 = file_hash(path)
+        if manifest.get('sha256') == sha256:
+            manifest.update(size=size, mtime_ns=mtime)
+            _write_manifest(manifest_path, manifest)
+            return pd.read_feather(cache_path)
+    else:
+        sha256 = file_hash(path)
+
+    df = read_csv(path)
+    _write_cache(df, cache_path, manifest_path, {
+        'version': CACHE_VERSION,
+        'size': size,
+        'mtime_ns': mtime,
+        'sha256': sha256,
+    })
+    return df
+
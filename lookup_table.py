@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Tabela com a predição do modelo para cada combinação das features codificadas.
+#
+# Depois da codificação, todas as entradas do modelo do TP9.py são inteiros de poucos valores:
+# Gender 2, Age 7, Occupation 21, City_Category 3, Stay_In_Current_City_Years 5,
+# Marital_Status 2 e Product_Category_1 20, ou 2 x 7 x 21 x 3 x 5 x 2 x 20 = 176.400
+# combinações. PredictionTable avalia o modelo uma única vez em todas elas (em blocos) e
+# guarda as predições em um vetor denso indexado pelo código de base mista da combinação,
+# como as células do cube.py. Prever um lote passa a ser calcular esse código e fazer um
+# gather no vetor, sem avaliar o modelo, qualquer que seja a classe dele. Linhas com algum
+# valor fora dos domínios vão para o modelo (fallback) ou geram erro. check() compara a
+# tabela com model.predict nas mesmas linhas. O TP9.py salva o modelo base com a tabela; main()
+# acrescenta a tabela a um artefato já salvo, ignorando os que têm features contínuas.
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from encoder import DEFAULT_TABLES
+from feature_store import LookupIndex
+
+
+TABLE_PATH = 'prediction_table.npz'
+# Limite de combinações: acima disso a tabela deixa de ser pequena
+MAX_CELLS = 20_000_000
+BLOCK_ROWS = 1 << 16
+
+# Códigos possíveis de cada feature do modelo, na ordem das colunas do TP9.py
+DOMAINS = {
+    'Gender': sorted(DEFAULT_TABLES['Gender'].values()),
+    'Age': sorted(DEFAULT_TABLES['Age'].values()),
+    'Occupation': list(range(21)),
+    'City_Category': sorted(DEFAULT_TABLES['City_Category'].values()),
+    'Stay_In_Current_City_Years': sorted(DEFAULT_TABLES['Stay_In_Current_City_Years'].values()),
+    'Marital_Status': [0, 1],
+    'Product_Category_1': list(range(1, 21)),
+}
+
+
+def is_discrete(features, domains=DOMAINS):
+    """Se todas as features têm domínio discreto (e a tabela pode ser montada)."""
+    return all(feature in domains for feature in features)
+
+
+def domains_from(x):
+    """Domínios formados pelos valores observados em cada coluna de x (DataFrame codificado)."""
+    return {column: sorted(int(value) for value in pd.unique(x[column])) for column in x.columns}
+
+
+def _integer_codes(values):
+    """Valores como int64 e a máscara dos que são inteiros (floats com parte fracionária ou NaN não são)."""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.integer):
+        return values.astype(np.int64, copy=False), np.ones(len(values), dtype=bool)
+    values = values.astype(np.float64, copy=False)
+    integral = np.isfinite(values) & (values == np.floor(values))
+    return np.where(integral, values, 0).astype(np.int64), integral
+
+
+class PredictionTable:
+    def __init__(self, domains, values=None):
+        self.domains = {name: [int(code) for code in codes] for name, codes in domains.items()}
+        self.features = list(self.domains)
+        self.shape = tuple(len(codes) for codes in self.domains.values())
+        size = int(np.prod(self.shape, dtype=np.int64))
+        if size > MAX_CELLS:
+            raise ValueError(f'{size} combinações excedem o limite de {MAX_CELLS} da tabela')
+        self.values = np.full(size, np.nan) if values is None else np.asarray(values, dtype=np.float64)
+        if len(self.values) != size:
+            raise ValueError(f'A tabela tem {len(self.values)} valores para {size} combinações')
+        self._indexes = {name: LookupIndex(codes) for name, codes in self.domains.items()}
+
+    def __len__(self):
+        return len(self.values)
+
+    def grid(self, start=0, stop=None):
+        """Matriz (float64) com as combinações de códigos das células start..stop, uma por linha."""
+        cells = np.arange(start, len(self) if stop is None else stop)
+        positions = np.unravel_index(cells, self.shape)
+        x = np.empty((len(cells), len(self.features)), dtype=np.float64)
+        for j, (codes, position) in enumerate(zip(self.domains.values(), positions)):
+            x[:, j] = np.asarray(codes)[position]
+        return x
+
+    @classmethod
+    def build(cls, model, domains=None, features=None, block_rows=BLOCK_ROWS):
+        """Avalia model.predict em todas as combinações dos domínios.
+
+        As features seguem `features` ou, se omitido, as colunas vistas pelo modelo no treino;
+        os domínios vêm de DOMAINS quando não informados.
+        """
+        if features is None:
+            if not hasattr(model, 'feature_names_in_'):
+                raise ValueError('Informe as features: o modelo não guarda os nomes das colunas de treino')
+            features = list(model.feature_names_in_)
+        domains = domains or DOMAINS
+        missing = [feature for feature in features if feature not in domains]
+        if missing:
+            raise ValueError(f'Features sem domínio discreto: {missing}')
+
+        table = cls({feature: domains[feature] for feature in features})
+        named = hasattr(model, 'feature_names_in_')
+        for start in range(0, len(table), block_rows):
+            x = table.grid(start, min(start + block_rows, len(table)))
+            if named:
+                x = pd.DataFrame(x, columns=table.features)
+            table.values[start:start + len(x)] = np.asarray(model.predict(x), dtype=np.float64).reshape(-1)
+        return table
+
+    def cells(self, x):
+        """Célula de cada linha de x (DataFrame ou matriz com as features na ordem da tabela); -1 fora dos domínios."""
+        if isinstance(x, pd.DataFrame):
+            columns = [x[feature].to_numpy() for feature in self.features]
+        else:
+            x = np.asarray(x)
+            if x.ndim != 2 or x.shape[1] != len(self.features):
+                raise ValueError(f'Esperadas {len(self.features)} colunas ({self.features})')
+            columns = [x[:, j] for j in range(len(self.features))]
+
+        cells = np.zeros(len(columns[0]) if columns else 0, dtype=np.int64)
+        valid = np.ones(len(cells), dtype=bool)
+        for values, index, size in zip(columns, self._indexes.values(), self.shape):
+            codes, integral = _integer_codes(values)
+            local = index.rows(codes)
+            valid &= integral & (local >= 0)
+            cells = cells * size + local
+        return np.where(valid, cells, -1)
+
+    def predict(self, x, fallback=None):
+        """Predições por consulta à tabela.
+
+        Linhas fora dos domínios são avaliadas por fallback(x[linhas]) ou, sem fallback, geram
+        ValueError.
+        """
+        cells = self.cells(x)
+        outside = cells < 0
+        predictions = self.values[np.where(outside, 0, cells)]
+        if outside.any():
+            if fallback is None:
+                raise ValueError(f'{int(outside.sum())} linhas com valores fora dos domínios da tabela')
+            rows = np.flatnonzero(outside)
+            subset = x.iloc[rows] if isinstance(x, pd.DataFrame) else np.asarray(x)[rows]
+            predictions[rows] = np.asarray(fallback(subset), dtype=np.float64).reshape(-1)
+        return predictions
+
+    def check(self, model, x, tolerance=1e-9):
+        """Compara a tabela com model.predict(x); ValueError se alguma diferença passar da tolerância."""
+        expected = np.asarray(model.predict(x), dtype=np.float64).reshape(-1)
+        error = np.abs(self.predict(x) - expected)
+        result = {
+            'Linhas': len(expected),
+            'Idênticas': int(np.count_nonzero(error == 0)),
+            'Diferença máxima': float(error.max()) if len(error) else 0.0,
+        }
+        if result['Diferença máxima'] > tolerance * max(1.0, float(np.abs(expected).max(initial=0.0))):
+            raise ValueError(f"Tabela difere do modelo em até {result['Diferença máxima']:g}")
+        return result
+
+    def save(self, path=TABLE_PATH):
+        arrays = {f'domain_{i}': np.asarray(codes) for i, codes in enumerate(self.domains.values())}
+        np.savez(path, values=self.values, features=np.asarray(self.features), **arrays)
+
+    @classmethod
+    def load(cls, path=TABLE_PATH):
+        with np.load(path) as data:
+            features = data['features'].tolist()
+            domains = {feature: data[f'domain_{i}'].tolist() for i, feature in enumerate(features)}
+            return cls(domains, data['values'])
+
+
+def main():
+    from loader import load_sales
+    from model_store import MODELS_DIR, list_versions, load_model
+    from preprocessing import encode, fill_missing
+
+    parser = argparse.ArgumentParser(description='Pré-calcula a tabela de predições de um modelo salvo.')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--version', default=None,
+                        help='versão do modelo (padrão: a mais recente só com features discretas)')
+    parser.add_argument('--source', default='black_friday_sales.csv', help='dataset usado na conferência')
+    args = parser.parse_args()
+
+    # Modelos com features contínuas (ex.: as do feature store) não cabem em uma tabela
+    manifests = [manifest for manifest in list_versions(args.models_dir)
+                 if args.version in (None, manifest['version'])]
+    for manifest in manifests:
+        if is_discrete(manifest['features']):
+            break
+        print(f"{manifest['version']}: ignorada, features sem domínio discreto "
+              f"{[feature for feature in manifest['features'] if feature not in DOMAINS]}")
+    else:
+        print('Nenhuma versão só com features discretas')
+        return
+
+    artifact = load_model(args.models_dir, manifest['version'])
+    table = PredictionTable.build(artifact.model, features=artifact.features)
+    x = encode(fill_missing(load_sales(args.source)))[artifact.features]
+    result = table.check(artifact.model, x if hasattr(artifact.model, 'feature_names_in_')
+                         else x.to_numpy(dtype=np.float64))
+
+    path = os.path.join(args.models_dir, artifact.version)
+    table.save(os.path.join(path, TABLE_PATH))
+    manifest = dict(artifact.manifest, prediction_table=True)
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"{len(table)} combinações -> {os.path.join(path, TABLE_PATH)} | {result['Linhas']} linhas conferidas, "
+          f"{result['Idênticas']} idênticas, diferença máxima {result['Diferença máxima']:g}")
+
+
+if __name__ == '__main__':
+    main()
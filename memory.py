@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Execução do pipeline do TP9.py dentro de um orçamento de memória.
+#
+# O TP9.py mantém df, clean_df e encoded_df vivos ao mesmo tempo e faz uma cópia inteira do
+# dataframe a cada drop, no copy() e no x = encoded_df.drop('Purchase'). O modo enxuto
+# (lean_stages) lê só as colunas que o modelo usa, reduz cada coluna ao menor tipo que
+# representa os valores sem perda (downcast), remove os outliers coluna a coluna (o pico é
+# o dataframe mais uma coluna, e não duas cópias), codifica as categorias substituindo as
+# colunas no próprio dataframe, separa Purchase com pop() em vez de drop() e libera cada
+# intermediário assim que deixa de ser usado. O modo padrão (standard_stages) reproduz as
+# cópias do notebook, para comparação.
+#
+# MemoryMonitor mede cada etapa: tempo, RSS ao final e o pico de RSS dentro da etapa (VmHWM
+# do Linux, zerado no início de cada etapa), além das colunas que a etapa copiou em vez de
+# reaproveitar. Com um orçamento definido, uma etapa cujo pico o ultrapassa interrompe a
+# execução com MemoryBudgetError, e require() recusa antes uma alocação grande que não cabe.
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import outliers
+import preprocessing
+from encoder import CategoricalEncoder
+from loader import DTYPES
+from profiling import rss
+
+
+# Colunas de texto com até esta fração de valores distintos viram category no downcast
+CATEGORY_RATIO = 0.5
+MODES = ('standard', 'lean')
+
+
+class MemoryBudgetError(MemoryError):
+    """Uma etapa ultrapassou (ou ultrapassaria) o orçamento de memória."""
+
+
+def _status_kb(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak():
+    """Zera o pico de RSS do processo (VmHWM); False quando o sistema não permite."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    """Pico de RSS do processo desde o último reset_peak() (None fora do Linux)."""
+    return _status_kb('VmHWM')
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _buffer(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy()
+    return series.to_numpy()
+
+
+def buffers(df):
+    """Arrays por trás de cada coluna, para saber depois quais foram copiadas."""
+    return {column: _buffer(df[column]) for column in df.columns}
+
+
+def copied_columns(before, df):
+    """Colunas de df presentes em `before` (saída de buffers) que não compartilham mais memória."""
+    return [column for column in df.columns
+            if column in before and not np.shares_memory(before[column], _buffer(df[column]))]
+
+
+def _smallest(values):
+    """Valores inteiros no menor tipo inteiro que os comporta."""
+    return pd.to_numeric(values, downcast='unsigned' if values.min() >= 0 else 'integer')
+
+
+def downcast(df, category_ratio=CATEGORY_RATIO):
+    """Converte, no próprio dataframe, cada coluna para o menor tipo sem perda de valores.
+
+    Inteiros vão para o menor int/uint; floats sem ausentes e sem parte fracionária viram
+    inteiros, e os demais viram float32 quando a conversão é exata; texto com poucos valores
+    distintos vira category. Devolve o próprio df.
+    """
+    for column in df.columns:
+        values = df[column]
+        if len(values) == 0:
+            continue
+        if pd.api.types.is_bool_dtype(values) or isinstance(values.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_integer_dtype(values):
+            converted = _smallest(values)
+        elif pd.api.types.is_float_dtype(values):
+            array = values.to_numpy()
+            if not np.isnan(array).any() and np.array_equal(array, np.floor(array)):
+                converted = _smallest(values.astype(np.int64))
+            elif values.dtype != np.float32 and np.array_equal(array.astype(np.float32), array, equal_nan=True):
+                converted = values.astype(np.float32)
+            else:
+                continue
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            if values.nunique(dropna=False) > category_ratio * len(values):
+                continue
+            converted = values.astype('category')
+        else:
+            continue
+        if converted.dtype != values.dtype:
+            df[column] = converted
+    return df
+
+
+def compact(df, keep):
+    """Dataframe só com as linhas de `keep`, montado coluna a coluna.
+
+    Cada coluna é retirada de df (pop) antes da próxima ser filtrada, de modo que o pico é o
+    dataframe mais uma coluna. O índice volta a ser um RangeIndex; df fica vazio ao final.
+    """
+    positions = np.flatnonzero(keep)
+    columns = {}
+    for column in list(df.columns):
+        columns[column] = pd.Series(df.pop(column).array.take(positions), name=column, copy=False)
+    return pd.DataFrame(columns, copy=False)
+
+
+def encode_inplace(df, encoder=None):
+    """Substitui as colunas categóricas de df pelos códigos int8, sem copiar as demais."""
+    encoder = encoder or CategoricalEncoder()
+    for column in encoder.tables:
+        if column in df.columns:
+            df[column] = encoder.encode_column(column, df[column])
+    return df
+
+
+class MemoryMonitor:
+    """Tempo e memória de cada etapa, com orçamento opcional (bytes) para o pico de RSS."""
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.stages = []
+
+    @property
+    def peak(self):
+        return max((stage['Pico RSS (MB)'] for stage in self.stages), default=0.0) * 1e6
+
+    def require(self, nbytes, what):
+        """Recusa uma alocação de `nbytes` que levaria o RSS além do orçamento."""
+        if self.budget is not None and rss() + nbytes > self.budget:
+            raise MemoryBudgetError(f'{what}: precisa de {nbytes / 1e6:,.1f} MB além dos {rss() / 1e6:,.1f} MB '
+                                    f'em uso, acima do orçamento de {self.budget / 1e6:,.1f} MB')
+
+    @contextmanager
+    def stage(self, name):
+        """Mede o trecho; o dicionário devolvido recebe informações extras da etapa."""
+        extra = {}
+        exact = reset_peak()
+        before = rss()
+        start = time.perf_counter()
+        yield extra
+        seconds = time.perf_counter() - start
+        after = rss()
+        # Sem o reset do VmHWM, o pico é aproximado pelo maior RSS observado nas bordas
+        peak = peak_rss() if exact else max(before, after)
+        self.stages.append({
+            'Etapa': name,
+            'Tempo (s)': seconds,
+            'Pico RSS (MB)': peak / 1e6,
+            'RSS final (MB)': after / 1e6,
+            'Variação (MB)': (after - before) / 1e6,
+            'Frame (MB)': extra.get('frame', np.nan) / 1e6,
+            'Colunas copiadas': ', '.join(extra.get('copied', [])),
+        })
+        if self.budget is not None and peak > self.budget:
+            raise MemoryBudgetError(f'Etapa {name}: pico de {peak / 1e6:,.1f} MB acima do orçamento '
+                                    f'de {self.budget / 1e6:,.1f} MB')
+
+    def table(self):
+        return pd.DataFrame(self.stages)
+
+
+def _metrics(y_test, y_pred):
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    mse = mean_squared_error(y_test, y_pred)
+    return {'MSE': mse, 'RMSE': np.sqrt(mse), 'MAE': mean_absolute_error(y_test, y_pred)}
+
+
+def standard_stages(path, monitor, rules=outliers.DEFAULT_RULES, test_size=0.4, seed=42):
+    """Etapas como no TP9.py, com as cópias e os intermediários vivos até o fim."""
+    from sklearn.linear_model import LinearRegression
+    from sklearn.model_selection import train_test_split
+
+    with monitor.stage('load') as extra:
+        df = pd.read_csv(path, dtype=DTYPES)
+        extra['frame'] = frame_bytes(df)
+    with monitor.stage('clean') as extra:
+        df = preprocessing.fill_missing(df)
+        filtered, _ = outliers.remove_outliers(df, rules)
+        clean_df = filtered.drop('User_ID', axis=1)
+        clean_df = clean_df.drop('Product_ID', axis=1)
+        extra['frame'] = frame_bytes(clean_df)
+    with monitor.stage('encode') as extra:
+        before = buffers(clean_df)
+        encoded_df = CategoricalEncoder().transform(clean_df.copy())
+        encoded_df = encoded_df.drop('Product_Category_2', axis=1)
+        encoded_df = encoded_df.drop('Product_Category_3', axis=1)
+        extra['frame'] = frame_bytes(encoded_df)
+        extra['copied'] = copied_columns(before, encoded_df)
+    with monitor.stage('split'):
+        x = encoded_df.drop('Purchase', axis=1)
+        y = encoded_df['Purchase']
+        x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=test_size, random_state=seed)
+    with monitor.stage('train'):
+        model = LinearRegression().fit(x_train, y_train)
+    with monitor.stage('predict'):
+        y_pred = np.round(model.predict(x_test), 2)
+    return model, _metrics(y_test, y_pred)
+
+
+def lean_stages(path, monitor, rules=outliers.DEFAULT_RULES, test_size=0.4, seed=42):
+    """Mesmo modelo e mesmas métricas do modo padrão, com uma única cópia viva dos dados."""
+    from sklearn.linear_model import LinearRegression
+    from sklearn.model_selection import train_test_split
+
+    with monitor.stage('load') as extra:
+        # IDs e categorias secundárias são descartados pelo TP9 antes do modelo: nem são lidos
+        df = downcast(pd.read_csv(path, dtype=DTYPES, usecols=preprocessing.ENCODED_COLUMNS))
+        extra['frame'] = frame_bytes(df)
+    with monitor.stage('clean') as extra:
+        keep = ~outliers.OutlierFilter(outliers.fit(df, rules)).mask(df)
+        df = compact(df, keep)
+        del keep
+        extra['frame'] = frame_bytes(df)
+    with monitor.stage('encode') as extra:
+        before = buffers(df)
+        encode_inplace(df)
+        extra['frame'] = frame_bytes(df)
+        extra['copied'] = copied_columns(before, df)
+        del before
+    with monitor.stage('split'):
+        y = df.pop('Purchase').to_numpy()
+        train_rows, test_rows = train_test_split(np.arange(len(df)), test_size=test_size, random_state=seed)
+        x_train, x_test = df.take(train_rows), df.take(test_rows)
+        y_train, y_test = y[train_rows], y[test_rows]
+        del df, y, train_rows, test_rows
+    with monitor.stage('train'):
+        # O scikit-learn converte x para float64 antes de ajustar
+        monitor.require(x_train.shape[0] * x_train.shape[1] * 8, 'train')
+        model = LinearRegression().fit(x_train, y_train)
+        del x_train, y_train
+    with monitor.stage('predict'):
+        y_pred = np.round(model.predict(x_test), 2)
+    return model, _metrics(y_test, y_pred)
+
+
+def run(path, mode='lean', budget=None, rules=outliers.DEFAULT_RULES, test_size=0.4, seed=42):
+    """Executa um modo; devolve a tabela por etapa e as métricas do modelo."""
+    monitor = MemoryMonitor(budget)
+    stages = lean_stages if mode == 'lean' else standard_stages
+    _, metrics = stages(path, monitor, rules, test_size, seed)
+    return monitor.table(), metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Executa o pipeline do TP9 medindo (e limitando) a memória.')
+    parser.add_argument('--source', default='black_friday_sales.csv')
+    parser.add_argument('--mode', choices=MODES + ('both',), default='both')
+    parser.add_argument('--budget-mb', type=float, default=None, help='pico de RSS máximo por etapa, em MB')
+    parser.add_argument('--test-size', type=float, default=0.4)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    budget = args.budget_mb * 1e6 if args.budget_mb else None
+    modes = MODES if args.mode == 'both' else (args.mode,)
+    for mode in modes:
+        # Cada modo em um processo novo, para que a memória de um não conte no outro
+        with ProcessPoolExecutor(1) as pool:
+            try:
+                table, metrics = pool.submit(run, args.source, mode, budget, outliers.DEFAULT_RULES,
+                                             args.test_size, args.seed).result()
+            except MemoryBudgetError as error:
+                print(f'[{mode}] {error}')
+                continue
+        with pd.option_context('display.width', 200, 'display.float_format', '{:,.2f}'.format):
+            print(f'[{mode}]')
+            print(table.to_string(index=False))
+        print(f"Pico {table['Pico RSS (MB)'].max():,.1f} MB | "
+              + ' | '.join(f'{name} {value:,.2f}' for name, value in metrics.items()))
+
+
+if __name__ == '__main__':
+    main()
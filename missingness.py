@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Perfil de valores ausentes do dataset, no lugar do sns.heatmap(df.isnull()).
+#
+# Uma passada vetorizada por bloco calcula a contagem de ausentes por coluna, as sequências
+# (run-length) de ausentes de cada coluna, a frequência de cada padrão de ausência por linha
+# e uma matriz reduzida: as linhas são agrupadas em no máximo `max_bins` faixas com a fração
+# de ausentes de cada coluna. Quando as faixas passam do limite, faixas vizinhas são somadas
+# duas a duas, então o gráfico é desenhado a partir de uma matriz de tamanho fixo, qualquer
+# que seja o número de registros.
+
+import numpy as np
+import pandas as pd
+
+
+MAX_BINS = 512
+
+
+class MissingProfile:
+    def __init__(self, columns, max_bins=MAX_BINS):
+        self.columns = list(columns)
+        if len(self.columns) > 63:
+            raise ValueError('O perfil de ausentes suporta no máximo 63 colunas')
+        self.max_bins = max_bins
+        self.rows = 0
+        self.null_counts = np.zeros(len(self.columns), dtype=np.int64)
+        self.rows_per_bin = 1
+        self._bin_nulls = np.zeros((0, len(self.columns)), dtype=np.int64)
+        self._bin_rows = np.zeros(0, dtype=np.int64)
+        self._starts = [[] for _ in self.columns]
+        self._ends = [[] for _ in self.columns]
+        self._last = np.zeros(len(self.columns), dtype=np.int8)
+        self._patterns = {}
+
+    def update(self, block):
+        mask = block[self.columns].isna().to_numpy()
+        n = len(mask)
+        if n == 0:
+            return
+        self.null_counts += mask.sum(axis=0)
+
+        # Início (+1) e fim (-1) das sequências de ausentes, continuando as do bloco anterior
+        steps = np.diff(mask.view(np.int8), axis=0, prepend=self._last[None, :])
+        for j in range(len(self.columns)):
+            self._starts[j].append(np.flatnonzero(steps[:, j] == 1) + self.rows)
+            self._ends[j].append(np.flatnonzero(steps[:, j] == -1) + self.rows)
+
+        codes = mask @ (np.int64(1) << np.arange(len(self.columns), dtype=np.int64))
+        values, counts = np.unique(codes, return_counts=True)
+        for value, count in zip(values.tolist(), counts.tolist()):
+            self._patterns[value] = self._patterns.get(value, 0) + count
+
+        self._add_bins(mask)
+        self._last = mask[-1].view(np.int8).copy()
+        self.rows += n
+
+    def _add_bins(self, mask):
+        n, k = mask.shape
+        ids = (self.rows + np.arange(n)) // self.rows_per_bin
+        first = ids[0]
+        local = ids - first
+        size = local[-1] + 1
+        rows, cols = np.nonzero(mask)
+        nulls = np.bincount(local[rows] * k + cols, minlength=size * k).reshape(size, k)
+        counts = np.bincount(local, minlength=size)
+        # O primeiro bin do bloco pode ser o último do bloco anterior, ainda incompleto
+        overlap = len(self._bin_rows) - first
+        if overlap > 0:
+            self._bin_nulls[first:] += nulls[:overlap]
+            self._bin_rows[first:] += counts[:overlap]
+            nulls, counts = nulls[overlap:], counts[overlap:]
+        self._bin_nulls = np.concatenate([self._bin_nulls, nulls])
+        self._bin_rows = np.concatenate([self._bin_rows, counts])
+        while len(self._bin_rows) > self.max_bins:
+            self._coarsen()
+
+    def _coarsen(self):
+        if len(self._bin_rows) % 2:
+            self._bin_nulls = np.concatenate([self._bin_nulls, np.zeros((1, len(self.columns)), np.int64)])
+            self._bin_rows = np.append(self._bin_rows, 0)
+        self._bin_nulls = self._bin_nulls[0::2] + self._bin_nulls[1::2]
+        self._bin_rows = self._bin_rows[0::2] + self._bin_rows[1::2]
+        if self._bin_rows[-1] == 0:
+            self._bin_nulls, self._bin_rows = self._bin_nulls[:-1], self._bin_rows[:-1]
+        self.rows_per_bin *= 2
+
+    def runs(self, column):
+        """Sequências de ausentes da coluna: linha inicial e comprimento de cada uma."""
+        j = self.columns.index(column)
+        starts = np.concatenate(self._starts[j]) if self._starts[j] else np.zeros(0, np.int64)
+        ends = np.concatenate(self._ends[j]) if self._ends[j] else np.zeros(0, np.int64)
+        if self._last[j]:
+            ends = np.append(ends, self.rows)
+        return pd.DataFrame({'start': starts, 'length': ends - starts})
+
+    def binned(self):
+        """Fração de ausentes de cada coluna por faixa de linhas (índice = primeira linha da faixa)."""
+        fractions = self._bin_nulls / np.maximum(self._bin_rows, 1)[:, None]
+        index = np.arange(len(self._bin_rows)) * self.rows_per_bin
+        return pd.DataFrame(fractions, index=index, columns=self.columns)
+
+    def patterns(self):
+        """Padrões de ausência por linha (True = ausente) e quantos registros seguem cada um."""
+        codes = np.array(sorted(self._patterns, key=self._patterns.get, reverse=True), dtype=np.int64)
+        bits = (codes[:, None] >> np.arange(len(self.columns))) & 1
+        table = pd.DataFrame(bits.astype(bool), columns=self.columns)
+        table['Registros'] = [self._patterns[code] for code in codes.tolist()]
+        return table
+
+    def summary(self):
+        """Ausentes por coluna, percentual, número de sequências e a maior sequência."""
+        runs = [self.runs(column)['length'] for column in self.columns]
+        return pd.DataFrame({
+            'Ausentes': self.null_counts,
+            'Percentual': self.null_counts / max(self.rows, 1) * 100,
+            'Sequências': [len(r) for r in runs],
+            'Maior sequência': [int(r.max()) if len(r) else 0 for r in runs],
+        }, index=self.columns)
+
+
+def profile(df, max_bins=MAX_BINS, block_size=1 << 20):
+    missing = MissingProfile(df.columns, max_bins)
+    for start in range(0, len(df), block_size):
+        missing.update(df.iloc[start:start + block_size])
+    return missing
+
+
+def plot(missing, ax=None):
+    """Desenha a matriz reduzida de ausentes (linhas agrupadas em faixas) no eixo `ax`."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    ax = ax or plt.gca()
+    binned = missing.binned()
+    image = ax.imshow(binned.to_numpy(), aspect='auto', interpolation='nearest', vmin=0, vmax=1,
+                      cmap=sns.color_palette('rocket', as_cmap=True),
+                      extent=(-0.5, len(binned.columns) - 0.5, missing.rows, 0))
+    ax.set_xticks(range(len(binned.columns)))
+    ax.set_xticklabels(binned.columns, rotation=90)
+    ax.set_ylabel('Registro')
+    plt.colorbar(image, ax=ax, label='Fração de ausentes')
+    return ax
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Artefatos versionados do modelo de Purchase.
+#
+# Cada treino gera um diretório models/<versão>/ com o modelo (pickle), o encoder (JSON) e um
+# manifesto com as colunas de entrada, as métricas e o hash do modelo. Modelos treinados com
+# as features de cliente/produto levam também as tabelas do feature_store.py, e modelos só com
+# features discretas podem levar a tabela de predições do lookup_table.py, consultada no
+# lugar do modelo. O arquivo models/LATEST aponta para a versão mais recente.
+
+import hashlib
+import json
+import math
+import numbers
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from encoder import CategoricalEncoder
+from feature_store import FEATURES as STORE_FEATURES, KEYS as STORE_KEYS, FeatureStore
+from lookup_table import TABLE_PATH, PredictionTable
+
+
+MODELS_DIR = 'models'
+# Maior valor absoluto aceito nos campos numéricos dos registros (inteiros exatos em float64)
+MAX_NUMERIC = 2 ** 53
+
+
+class ModelArtifact:
+    """Modelo treinado + encoder + colunas de entrada, prontos para predição."""
+
+    def __init__(self, model, encoder, features, manifest=None, store=None, table=None):
+        self.model = model
+        self.encoder = encoder
+        self.features = list(features)
+        self.manifest = manifest or {}
+        self.store = store
+        if table is not None and table.features != self.features:
+            raise ValueError(f'Tabela de predições com features {table.features}, modelo com {self.features}')
+        self.table = table
+        # Modelos lineares são avaliados diretamente (X @ coef + intercepto), sem o overhead
+        # de validação do predict do scikit-learn em lotes pequenos
+        self._coef = getattr(model, 'coef_', None)
+        self._intercept = getattr(model, 'intercept_', 0.0)
+        if self._coef is not None and np.ndim(self._coef) != 1:
+            self._coef = None
+
+    @property
+    def version(self):
+        return self.manifest.get('version')
+
+    def matrix(self, records):
+        """Matriz de entrada (float64) a partir de registros brutos (dicionários com os campos do dataset)."""
+        x = np.empty((len(records), len(self.features)), dtype=np.float64)
+        stored = None
+        if self.store is not None:
+            stored = self.store.transform_arrays({
+                column: self._field(records, column) if column in STORE_KEYS else self._numeric(records, column)
+                for column in self.store.inputs})
+        for j, column in enumerate(self.features):
+            if stored is not None and column in STORE_FEATURES:
+                x[:, j] = stored[column]
+                continue
+            if column in self.encoder.tables:
+                x[:, j] = self.encoder.encode_values(column, self._field(records, column))
+            else:
+                x[:, j] = self._numeric(records, column)
+        return x
+
+    @staticmethod
+    def _field(records, column):
+        try:
+            return [record[column] for record in records]
+        except KeyError:
+            raise ValueError(f'Campo obrigatório ausente: {column}') from None
+
+    @classmethod
+    def _numeric(cls, records, column):
+        """Valores de um campo numérico; ValueError para texto, booleanos, NaN/infinito ou fora de MAX_NUMERIC."""
+        values = cls._field(records, column)
+        for value in values:
+            if isinstance(value, bool) or not isinstance(value, numbers.Real):
+                raise ValueError(f'{column}: valor não numérico: {value!r}')
+            if not math.isfinite(value) or abs(value) > MAX_NUMERIC:
+                raise ValueError(f'{column}: valor fora do intervalo aceito: {value!r}')
+        return values
+
+    def predict_matrix(self, x):
+        if self.table is not None:
+            # Combinações fora dos domínios da tabela são avaliadas pelo modelo
+            return self.table.predict(x, fallback=self._evaluate)
+        return self._evaluate(x)
+
+    def _evaluate(self, x):
+        if self._coef is not None:
+            return x @ self._coef + self._intercept
+        if hasattr(self.model, 'feature_names_in_'):
+            x = pd.DataFrame(x, columns=self.features)
+        return np.asarray(self.model.predict(x), dtype=np.float64)
+
+    def predict_records(self, records):
+        return self.predict_matrix(self.matrix(records))
+
+    def predict_frame(self, df):
+        """Predição para um DataFrame no formato do dataset original (ex.: lido pelo loader)."""
+        if self.store is None:
+            encoded = self.encoder.transform(df[self.features])
+            return self.predict_matrix(encoded.to_numpy(dtype=np.float64))
+        base = [column for column in self.features if column not in STORE_FEATURES]
+        x = pd.concat([self.encoder.transform(df[base]), self.store.transform(df)], axis=1)
+        return self.predict_matrix(x[self.features].to_numpy(dtype=np.float64))
+
+
+def _new_version(model_bytes):
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return f'{stamp}-{hashlib.sha256(model_bytes).hexdigest()[:8]}'
+
+
+def save_model(model, encoder, features, directory=MODELS_DIR, metrics=None, store=None, table=None):
+    """Grava um novo artefato versionado e o marca como o mais recente. Retorna a versão."""
+    model_bytes = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+    version = _new_version(model_bytes)
+    path = os.path.join(directory, version)
+    os.makedirs(path)
+
+    with open(os.path.join(path, 'model.pkl'), 'wb') as f:
+        f.write(model_bytes)
+    encoder.save(os.path.join(path, 'encoder.json'))
+    if store is not None:
+        store.save(os.path.join(path, 'feature_store.npz'))
+    if table is not None:
+        table.save(os.path.join(path, TABLE_PATH))
+    manifest = {
+        'version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'model': type(model).__name__,
+        'features': list(features),
+        'metrics': metrics or {},
+        'sha256': hashlib.sha256(model_bytes).hexdigest(),
+        'sklearn': sklearn.__version__,
+        'feature_store': store is not None,
+        'prediction_table': table is not None,
+    }
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    with open(os.path.join(directory, 'LATEST'), 'w') as f:
+        f.write(version)
+    return version
+
+
+def list_versions(directory=MODELS_DIR):
+    """Manifestos das versões salvas, da mais recente para a mais antiga.
+
+    A ordem vem da gravação do model.pkl, que nunca é reescrito (o manifesto pode ser
+    atualizado depois, ex.: pelo lookup_table.py).
+    """
+    names = os.listdir(directory) if os.path.isdir(directory) else []
+    names = [name for name in names if os.path.exists(os.path.join(directory, name, 'model.pkl'))]
+    names.sort(key=lambda name: os.stat(os.path.join(directory, name, 'model.pkl')).st_mtime_ns, reverse=True)
+    manifests = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name, 'manifest.json')) as f:
+                manifests.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return manifests
+
+
+def load_model(directory=MODELS_DIR, version=None):
+    """Carrega um artefato (por padrão, o mais recente), conferindo o hash do modelo."""
+    if version is None:
+        with open(os.path.join(directory, 'LATEST')) as f:
+            version = f.read().strip()
+    path = os.path.join(directory, version)
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    with open(os.path.join(path, 'model.pkl'), 'rb') as f:
+        model_bytes = f.read()
+    if hashlib.sha256(model_bytes).hexdigest() != manifest['sha256']:
+        raise ValueError(f'O arquivo do modelo {version} não corresponde ao manifesto')
+    model = pickle.loads(model_bytes)
+    encoder = CategoricalEncoder.load(os.path.join(path, 'encoder.json'))
+    store = FeatureStore.load(os.path.join(path, 'feature_store.npz')) if manifest.get('feature_store') else None
+    table = PredictionTable.load(os.path.join(path, TABLE_PATH)) if manifest.get('prediction_table') else None
+    return ModelArtifact(model, encoder, manifest['features'], manifest, store, table)
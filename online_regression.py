@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Regressão linear treinada fora da memória.
+#
+# Em vez de ajustar o LinearRegression sobre um x_train inteiro em memória, acumulamos as
+# estatísticas suficientes das equações normais (n, somas e XᵀX/Xᵀy, com y como última
+# coluna) bloco a bloco e resolvemos o sistema uma vez no final. As estatísticas de
+# partições diferentes (por exemplo, calculadas em processos separados) podem ser somadas
+# com merge(), então o treino no histórico completo é uma única passada com memória constante.
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from columnar import read_chunks
+
+
+class NormalEquations:
+    """Estatísticas suficientes de uma regressão linear com intercepto."""
+
+    def __init__(self, n_features=None):
+        self.n = 0
+        self.n_features = n_features
+        self.feature_names = None
+        # Os dados são acumulados deslocados pela média do primeiro bloco (estabilidade numérica)
+        self.shift = None
+        self.sums = None
+        self.cross = None
+
+    def _stack(self, x, y):
+        if isinstance(x, pd.DataFrame):
+            if self.feature_names is None:
+                self.feature_names = list(x.columns)
+            elif list(x.columns) != self.feature_names:
+                raise ValueError('As colunas do bloco não correspondem às do treino')
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64).reshape(-1, 1)
+        if self.n_features is None:
+            self.n_features = x.shape[1]
+        elif x.shape[1] != self.n_features:
+            raise ValueError(f'Esperadas {self.n_features} colunas, recebidas {x.shape[1]}')
+        return np.hstack([x, y])
+
+    def partial_fit(self, x, y):
+        """Acumula um bloco de observações."""
+        z = self._stack(x, y)
+        if not len(z):
+            return self
+        if self.shift is None:
+            self.shift = z.mean(axis=0)
+            self.sums = np.zeros(z.shape[1])
+            self.cross = np.zeros((z.shape[1], z.shape[1]))
+        z -= self.shift
+        self.n += len(z)
+        self.sums += z.sum(axis=0)
+        self.cross += z.T @ z
+        return self
+
+    def merge(self, other):
+        """Soma as estatísticas de outra partição (com qualquer deslocamento) a esta."""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.n_features, self.feature_names = other.n, other.n_features, other.feature_names
+            self.shift, self.sums, self.cross = other.shift.copy(), other.sums.copy(), other.cross.copy()
+            return self
+        if other.n_features != self.n_features:
+            raise ValueError('As partições têm números de colunas diferentes')
+        # Reescreve as somas do outro lado em relação ao nosso deslocamento
+        delta = other.shift - self.shift
+        sums = other.sums + other.n * delta
+        cross = (other.cross + np.outer(delta, other.sums) + np.outer(other.sums, delta)
+                 + other.n * np.outer(delta, delta))
+        self.n += other.n
+        self.sums += sums
+        self.cross += cross
+        return self
+
+    def solve(self):
+        """Coeficientes e intercepto de mínimos quadrados, como no LinearRegression."""
+        if self.n < 2:
+            raise ValueError('São necessárias ao menos duas observações')
+        mean = self.sums / self.n
+        centered = self.cross - self.n * np.outer(mean, mean)
+        xx, xy = centered[:-1, :-1], centered[:-1, -1]
+        # lstsq lida com colunas colineares da mesma forma que o LinearRegression (norma mínima)
+        coef = np.linalg.lstsq(xx, xy, rcond=None)[0]
+        mean = self.shift + mean
+        intercept = mean[-1] - mean[:-1] @ coef
+        return coef, intercept
+
+    def to_model(self):
+        """LinearRegression já ajustado com os coeficientes resolvidos (pronto para predict)."""
+        coef, intercept = self.solve()
+        model = LinearRegression()
+        model.coef_ = coef
+        model.intercept_ = intercept
+        model.n_features_in_ = self.n_features
+        if self.feature_names is not None:
+            model.feature_names_in_ = np.asarray(self.feature_names, dtype=object)
+        return model
+
+    def save(self, path):
+        np.savez(path, n=self.n, shift=self.shift, sums=self.sums, cross=self.cross,
+                 feature_names=np.asarray(self.feature_names or [], dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        stats = cls(n_features=len(data['shift']) - 1)
+        stats.n = int(data['n'])
+        stats.shift, stats.sums, stats.cross = data['shift'], data['sums'], data['cross']
+        stats.feature_names = [str(name) for name in data['feature_names']] or None
+        return stats
+
+
+def _split_mask(n, test_size, rng):
+    # Sorteio independente por linha: a proporção de teste é `test_size` em média
+    return rng.random(n) < test_size
+
+
+def fit_file(path, target='Purchase', chunksize=100_000, test_size=0.0, seed=42):
+    """Acumula as estatísticas de um dataset codificado (Arrow ou CSV), lido em blocos.
+
+    Com test_size > 0, cada linha é sorteada para teste com essa probabilidade (semente fixa,
+    então evaluate_file reproduz a mesma divisão) e fica fora do treino.
+    """
+    stats = NormalEquations()
+    rng = np.random.default_rng(seed)
+    for chunk in read_chunks(path, chunksize):
+        if test_size:
+            chunk = chunk[~_split_mask(len(chunk), test_size, rng)]
+        stats.partial_fit(chunk.drop(columns=target), chunk[target])
+    return stats
+
+
+def evaluate_file(model, path, target='Purchase', chunksize=100_000, test_size=0.4, seed=42):
+    """MSE, RMSE e MAE nas linhas de teste sorteadas por fit_file com os mesmos parâmetros."""
+    rng = np.random.default_rng(seed)
+    n, squared, absolute = 0, 0.0, 0.0
+    for chunk in read_chunks(path, chunksize):
+        chunk = chunk[_split_mask(len(chunk), test_size, rng)]
+        if not len(chunk):
+            continue
+        error = chunk[target].to_numpy() - model.predict(chunk.drop(columns=target))
+        n += len(error)
+        squared += float(error @ error)
+        absolute += float(np.abs(error).sum())
+    mse = squared / n
+    return {'MSE': mse, 'RMSE': np.sqrt(mse), 'MAE': absolute / n}
+
+
+def fit_partitions(paths, target='Purchase', chunksize=100_000, processes=None):
+    """Treina sobre vários arquivos em paralelo: cada processo acumula um arquivo e os resultados são somados."""
+    stats = NormalEquations()
+    with ProcessPoolExecutor(processes) as pool:
+        for partial in pool.map(fit_file, paths, [target] * len(paths), [chunksize] * len(paths)):
+            stats.merge(partial)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Treino da regressão linear em uma passada, fora da memória.')
+    parser.add_argument('paths', nargs='+', help='datasets codificados (.arrow ou .csv)')
+    parser.add_argument('--target', default='Purchase')
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--output', help='arquivo .npz para salvar as estatísticas acumuladas')
+    args = parser.parse_args()
+
+    if len(args.paths) == 1:
+        stats = fit_file(args.paths[0], args.target, args.chunksize)
+    else:
+        stats = fit_partitions(args.paths, args.target, args.chunksize, args.processes)
+    coef, intercept = stats.solve()
+    print(f'{stats.n} observações')
+    print(pd.Series(coef, index=stats.feature_names), f'\nIntercepto: {intercept:.4f}')
+    if args.output:
+        stats.save(args.output)
+
+
+if __name__ == '__main__':
+    main()
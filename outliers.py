@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Remoção de outliers por regras configuráveis, no lugar dos limites fixos lidos no boxplot.
+#
+# Cada regra define limites para uma coluna: pelo IQR (q1 - whis*IQR, q3 + whis*IQR, como os
+# bigodes do boxplot), por quantis ou por valores fixos. Os limites são calculados a partir
+# dos dados, com quantis exatos quando o dataset está em memória (fit) ou a partir dos
+# histogramas da aggregation.py quando os dados são lidos em blocos (fit_histograms). A
+# filtragem compara cada coluna com seus limites em buffers pré-alocados e soma os acertos em
+# um único vetor, de onde saem a máscara combinada e a contagem de registros removidos por
+# regra; o dataframe filtrado é gerado uma única vez a partir dessa máscara.
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from aggregation import Histogram
+
+
+METHODS = ('iqr', 'quantile', 'threshold')
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Regra de outlier de uma coluna.
+
+    method='iqr': fora de [q1 - whis*IQR, q3 + whis*IQR];
+    method='quantile': fora dos quantis `low` e `high` (ex.: 0.01 e 0.99);
+    method='threshold': fora dos valores fixos `low` e `high`.
+    Limites None não são verificados.
+    """
+    column: str
+    method: str = 'iqr'
+    low: float = None
+    high: float = None
+    whis: float = 1.5
+
+    def __post_init__(self):
+        if self.method not in METHODS:
+            raise ValueError(f'Método de outlier desconhecido: {self.method}')
+
+    @property
+    def name(self):
+        if self.method == 'iqr':
+            return f'{self.column} (IQR x {self.whis:g})'
+        return f'{self.column} ({self.method})'
+
+
+@dataclass(frozen=True)
+class Bounds:
+    rule: Rule
+    low: float = None
+    high: float = None
+
+
+# Os outliers de Product_Category_1 e Purchase vistos nos boxplots do TP9.py
+DEFAULT_RULES = [Rule('Product_Category_1'), Rule('Purchase')]
+# Limites fixos usados originalmente no notebook (Product_Category_1 > 17,5 ou Purchase > 20.000)
+TP9_RULES = [Rule('Product_Category_1', 'threshold', high=17.5), Rule('Purchase', 'threshold', high=20000)]
+
+
+def _bounds(rule, quantile):
+    if rule.method == 'threshold':
+        return Bounds(rule, rule.low, rule.high)
+    if rule.method == 'quantile':
+        low = None if rule.low is None else quantile(rule.low)
+        high = None if rule.high is None else quantile(rule.high)
+        return Bounds(rule, low, high)
+    q1, q3 = quantile(0.25), quantile(0.75)
+    iqr = q3 - q1
+    return Bounds(rule, q1 - rule.whis * iqr, q3 + rule.whis * iqr)
+
+
+def fit(df, rules=DEFAULT_RULES):
+    """Limites de cada regra com quantis exatos (interpolação linear, como no pandas)."""
+    bounds = []
+    for rule in rules:
+        values = df[rule.column].to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values)]
+        bounds.append(_bounds(rule, lambda q: float(np.quantile(values, q))))
+    return bounds
+
+
+def fit_histograms(histograms, rules=DEFAULT_RULES):
+    """Limites de cada regra a partir de histogramas (aggregation.Histogram) acumulados em blocos."""
+    return [_bounds(rule, histograms[rule.column].quantile) for rule in rules]
+
+
+def fit_chunks(chunks, rules=DEFAULT_RULES):
+    """Primeira passada de um processamento em blocos: acumula histogramas e calcula os limites."""
+    if all(rule.method == 'threshold' for rule in rules):
+        # Limites fixos não dependem dos dados: os blocos nem chegam a ser lidos
+        return [_bounds(rule, None) for rule in rules]
+    histograms = {rule.column: Histogram() for rule in rules}
+    for chunk in chunks:
+        for column, histogram in histograms.items():
+            histogram.update(chunk[column])
+    return fit_histograms(histograms, rules)
+
+
+def _outside(values, bounds, out, scratch):
+    out[:] = False
+    if bounds.low is not None:
+        np.less(values, bounds.low, out=out)
+    if bounds.high is not None:
+        np.greater(values, bounds.high, out=scratch)
+        np.logical_or(out, scratch, out=out)
+    return out
+
+
+class OutlierFilter:
+    """Aplica um conjunto de limites e acumula quantos registros cada regra removeu."""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.rows = 0
+        self.removed = 0
+        self.hits = np.zeros(len(self.bounds), dtype=np.int64)
+        self.exclusive = np.zeros(len(self.bounds), dtype=np.int64)
+
+    def mask(self, df):
+        """Máscara booleana dos outliers (True = removido) de todas as regras combinadas."""
+        n = len(df)
+        votes = np.zeros(n, dtype=np.uint8)
+        hit = np.empty(n, dtype=bool)
+        scratch = np.empty(n, dtype=bool)
+        columns = [df[b.rule.column].to_numpy() for b in self.bounds]
+        for i, (values, bounds) in enumerate(zip(columns, self.bounds)):
+            _outside(values, bounds, hit, scratch)
+            self.hits[i] += np.count_nonzero(hit)
+            votes += hit
+        outliers = votes > 0
+
+        # Registros removidos por uma única regra, avaliados só nas linhas com um voto
+        single = np.flatnonzero(votes == 1)
+        for i, (values, bounds) in enumerate(zip(columns, self.bounds)):
+            self.exclusive[i] += np.count_nonzero(_outside(values[single], bounds, hit[:len(single)],
+                                                           scratch[:len(single)]))
+        self.rows += n
+        self.removed += int(np.count_nonzero(outliers))
+        return outliers
+
+    def apply(self, df):
+        """Dataframe sem os outliers; o próprio df quando nenhum registro é removido."""
+        outliers = self.mask(df)
+        if not outliers.any():
+            return df
+        return df.take(np.flatnonzero(~outliers))
+
+    def report(self):
+        """Limites e registros removidos por regra (total e somente por ela)."""
+        total = max(self.rows, 1)
+        return pd.DataFrame({
+            'Regra': [b.rule.name for b in self.bounds],
+            'Limite inferior': [b.low for b in self.bounds],
+            'Limite superior': [b.high for b in self.bounds],
+            'Removidos': self.hits,
+            'Somente esta regra': self.exclusive,
+            'Percentual': self.hits / total * 100,
+        })
+
+
+def remove_outliers(df, rules=DEFAULT_RULES):
+    """Ajusta os limites nos próprios dados e devolve o dataframe filtrado e o relatório."""
+    outlier_filter = OutlierFilter(fit(df, rules))
+    return outlier_filter.apply(df), outlier_filter.report()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Pipeline do TP9.py dividido em etapas com cache por conteúdo.
+#
+# Cada etapa declara as entradas que consome, as saídas que produz e os parâmetros que usa.
+# A chave de uma etapa é o hash do seu código, dos parâmetros, dos arquivos de origem e dos
+# identificadores das entradas; cada saída é identificada pelo hash do seu conteúdo. Se já
+# existe um resultado para a chave (e os arquivos gerados ainda estão no disco), a etapa é
+# pulada. Assim, mudar o limite de outliers recalcula só as etapas que dependem dele, e uma
+# etapa que produz exatamente o mesmo resultado não invalida as seguintes.
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+from dataclasses import dataclass, field
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import aggregation
+import columnar
+import encoder
+import figures
+import loader
+import missingness
+import outliers
+import preprocessing
+import quality
+import report
+
+
+CACHE_DIR = '.pipeline_cache'
+
+
+@dataclass
+class Stage:
+    """Etapa do pipeline: func(**entradas, **params) devolve um dicionário com as saídas."""
+    name: str
+    func: object
+    inputs: tuple = ()
+    outputs: tuple = ()
+    params: dict = field(default_factory=dict)
+    # Arquivos lidos (o conteúdo entra na chave) e arquivos gravados (devem existir para reaproveitar)
+    sources: tuple = ()
+    files: tuple = ()
+    # Módulos/funções auxiliares cujo código também entra na chave
+    code: tuple = ()
+
+    def key(self, input_ids):
+        digest = hashlib.sha256()
+        digest.update(self.name.encode())
+        for obj in (self.func,) + tuple(self.code):
+            digest.update(inspect.getsource(obj).encode())
+        digest.update(json.dumps(self.params, sort_keys=True, default=str).encode())
+        for path in self.sources:
+            digest.update(loader.dataset_version(path).encode())
+        for name in self.inputs:
+            digest.update(f'{name}={input_ids[name]}'.encode())
+        return digest.hexdigest()
+
+
+class Pipeline:
+    def __init__(self, stages, cache_dir=CACHE_DIR):
+        self.stages = list(stages)
+        self.cache_dir = cache_dir
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, 'stages'), exist_ok=True)
+        produced = set()
+        for stage in self.stages:
+            missing = set(stage.inputs) - produced
+            if missing:
+                raise ValueError(f'Etapa {stage.name}: entradas sem etapa anterior que as produza: {sorted(missing)}')
+            produced.update(stage.outputs)
+
+    def _object_path(self, object_id):
+        return os.path.join(self.cache_dir, 'objects', object_id + '.pkl')
+
+    def _record_path(self, key):
+        return os.path.join(self.cache_dir, 'stages', key + '.json')
+
+    def _store(self, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        object_id = hashlib.sha256(data).hexdigest()
+        path = self._object_path(object_id)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(data)
+        return object_id
+
+    def _load(self, object_id):
+        with open(self._object_path(object_id), 'rb') as f:
+            return pickle.load(f)
+
+    def _cached(self, stage, key):
+        try:
+            with open(self._record_path(key)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not all(os.path.exists(self._object_path(i)) for i in record.values()):
+            return None
+        if not all(os.path.exists(path) for path in stage.files):
+            return None
+        return record
+
+    def run(self, force=()):
+        """Executa as etapas necessárias. `force` lista etapas a executar mesmo com cache válido."""
+        ids, values, report = {}, {}, []
+        for stage in self.stages:
+            start = time.perf_counter()
+            key = stage.key(ids)
+            record = None if stage.name in force else self._cached(stage, key)
+            if record is None:
+                inputs = {}
+                for name in stage.inputs:
+                    if name not in values:
+                        values[name] = self._load(ids[name])
+                    inputs[name] = values[name]
+                outputs = stage.func(**inputs, **stage.params) or {}
+                if set(outputs) != set(stage.outputs):
+                    raise ValueError(f'Etapa {stage.name}: saídas {sorted(outputs)}, '
+                                     f'declaradas {sorted(stage.outputs)}')
+                record = {name: self._store(value) for name, value in outputs.items()}
+                values.update(outputs)
+                with open(self._record_path(key), 'w') as f:
+                    json.dump(record, f)
+                status = 'executada'
+            else:
+                status = 'cache'
+            ids.update(record)
+            report.append({'etapa': stage.name, 'status': status, 'segundos': time.perf_counter() - start})
+        return report
+
+
+# Etapas do TP9.py
+
+RAW_FIGURES = ('ausentes.png', 'ausentes_2.png', 'distribuicao.png', 'boxplot_alvo.png', 'purchase_desc.png',
+               'outliers.png')
+ANALYSIS_FIGURES = ('gender_purchase.png', 'age_purchase.png', 'occ_purchase.png', 'city_purchase.png',
+                    'years_purchase.png', 'ms_purchase.png', 'categories_purchase_1.png',
+                    'categories_purchase_2.png', 'heatmap.png')
+MODEL_FIGURES = ('regressao.png', 'regplot.png')
+
+
+def _out(output_dir, *names):
+    return tuple(os.path.join(output_dir, name) for name in names)
+
+
+def ingest(path):
+    return {'raw': loader.load_sales(path)}
+
+
+def check_quality(raw, output_dir):
+    report = quality.profile_frame(raw, quality.DEFAULT_RULES)
+    quality.save_report(report, *_out(output_dir, quality.REPORT_PATH))
+    return {'quality': report}
+
+
+def clean(raw):
+    return {'clean': preprocessing.fill_missing(raw)}
+
+
+def filter_outliers(clean, rules):
+    filtered, report = outliers.remove_outliers(clean, rules)
+    return {'filtered': filtered, 'outlier_report': report}
+
+
+def encode(filtered, output_dir):
+    encoded = preprocessing.encode(filtered)
+    columnar.write_encoded(encoded, *_out(output_dir, 'encoded_black_friday.arrow'))
+    return {'encoded': encoded}
+
+
+def split(encoded, test_size, seed):
+    from sklearn.model_selection import train_test_split
+
+    x = encoded.drop('Purchase', axis=1)
+    y = encoded['Purchase']
+    x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=test_size, random_state=seed)
+    return {'x_train': x_train, 'x_test': x_test, 'y_train': y_train, 'y_test': y_test}
+
+
+def train(x_train, y_train):
+    from sklearn.linear_model import LinearRegression
+
+    return {'model': LinearRegression().fit(x_train, y_train)}
+
+
+def evaluate(model, x_test, y_test, output_dir):
+    import numpy as np
+    import pandas as pd
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    y_pred = np.round(model.predict(x_test), 2)
+    mse = mean_squared_error(y_test, y_pred)
+    metrics = {'MSE': mse, 'RMSE': np.sqrt(mse), 'MAE': mean_absolute_error(y_test, y_pred)}
+    pd.DataFrame({'Métricas': list(metrics), 'Valores': list(metrics.values())}).to_csv(
+        *_out(output_dir, 'metrics.csv'), index=False)
+    return {'y_pred': y_pred, 'metrics': metrics}
+
+
+def summarize_report(raw, clean, filtered, encoded, y_test, y_pred, scatter_points):
+    return {'report_data': report.summarize(raw, clean, filtered, encoded, y_test, y_pred, scatter_points)}
+
+
+def render_report(report_data, output_dir, processes):
+    # Cada figura é redesenhada só se o seu resumo (ou o código de desenho) mudou
+    report.render(report.figure_specs(report_data, output_dir), *_out(output_dir, report.MANIFEST_PATH),
+                  processes=processes)
+    return {}
+
+
+def outlier_rules(whis=1.5, category_limit=None, purchase_limit=None):
+    """Regras pelo IQR; um limite fixo informado substitui a regra IQR da coluna."""
+    return [
+        outliers.Rule('Product_Category_1', whis=whis) if category_limit is None
+        else outliers.Rule('Product_Category_1', 'threshold', high=category_limit),
+        outliers.Rule('Purchase', whis=whis) if purchase_limit is None
+        else outliers.Rule('Purchase', 'threshold', high=purchase_limit),
+    ]
+
+
+def tp9_stages(source, output_dir, rules=outliers.DEFAULT_RULES, test_size=0.4, seed=42, processes=None,
+               scatter_points=report.SCATTER_POINTS):
+    return [
+        Stage('ingest', ingest, outputs=('raw',), params={'path': source}, sources=(source,), code=(loader,)),
+        Stage('quality', check_quality, ('raw',), ('quality',), {'output_dir': output_dir},
+              files=_out(output_dir, quality.REPORT_PATH), code=(quality, aggregation, encoder, loader)),
+        Stage('clean', clean, ('raw',), ('clean',), code=(preprocessing,)),
+        Stage('outliers', filter_outliers, ('clean',), ('filtered', 'outlier_report'), {'rules': list(rules)},
+              code=(outliers, aggregation)),
+        Stage('encode', encode, ('filtered',), ('encoded',), {'output_dir': output_dir},
+              files=_out(output_dir, 'encoded_black_friday.arrow'), code=(preprocessing, encoder, columnar)),
+        Stage('split', split, ('encoded',), ('x_train', 'x_test', 'y_train', 'y_test'),
+              {'test_size': test_size, 'seed': seed}),
+        Stage('train', train, ('x_train', 'y_train'), ('model',)),
+        Stage('evaluate', evaluate, ('model', 'x_test', 'y_test'), ('y_pred', 'metrics'),
+              {'output_dir': output_dir}, files=_out(output_dir, 'metrics.csv')),
+        Stage('summarize', summarize_report, ('raw', 'clean', 'filtered', 'encoded', 'y_test', 'y_pred'),
+              ('report_data',), {'scatter_points': scatter_points}, code=(report, aggregation, missingness)),
+        Stage('report', render_report, ('report_data',), (), {'output_dir': output_dir, 'processes': processes},
+              files=_out(output_dir, *RAW_FIGURES, *ANALYSIS_FIGURES, *MODEL_FIGURES),
+              code=(report, figures, missingness)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Executa o pipeline do TP9 reaproveitando etapas já calculadas.')
+    parser.add_argument('--source', default='black_friday_sales.csv')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--whis', type=float, default=1.5, help='multiplicador do IQR nas regras de outlier')
+    parser.add_argument('--category-limit', type=float, default=None,
+                        help='limite fixo de outliers de Product_Category_1 (no lugar do IQR)')
+    parser.add_argument('--purchase-limit', type=float, default=None,
+                        help='limite fixo de outliers de Purchase (no lugar do IQR)')
+    parser.add_argument('--test-size', type=float, default=0.4)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--processes', type=int, default=None, help='processos que desenham as figuras')
+    parser.add_argument('--scatter-points', type=int, default=report.SCATTER_POINTS,
+                        help='acima deste número de pontos, o real x previsto vira uma grade de densidade')
+    parser.add_argument('--force', nargs='*', default=(), help='etapas a executar mesmo com cache válido')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    rules = outlier_rules(args.whis, args.category_limit, args.purchase_limit)
+    stages = tp9_stages(args.source, args.output_dir, rules, args.test_size, args.seed, args.processes,
+                        args.scatter_points)
+    for row in Pipeline(stages, args.cache_dir).run(args.force):
+        print(f"{row['etapa']:<16} {row['status']:<10} {row['segundos']:8.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Etapas de limpeza do TP9.py em forma de funções reutilizáveis (dashboard, pipelines).
+
+import outliers
+from encoder import CategoricalEncoder
+
+
+def fill_missing(df):
+    """Preenche as categorias secundária e terciária ausentes com 0 (ausência de categoria)."""
+    return df.fillna({'Product_Category_2': 0, 'Product_Category_3': 0})
+
+
+def drop_outliers(df, rules=outliers.DEFAULT_RULES):
+    """Dataframe sem os outliers das regras do outliers.py (sem o relatório de outliers.remove_outliers)."""
+    filtered, _ = outliers.remove_outliers(df, rules)
+    return filtered
+
+
+# Colunas do dataframe codificado, na ordem do encoded_black_friday.arrow
+ENCODED_COLUMNS = ['Gender', 'Age', 'Occupation', 'City_Category', 'Stay_In_Current_City_Years',
+                   'Marital_Status', 'Product_Category_1', 'Purchase']
+
+
+def encode(df, encoder=None):
+    """Dataframe pronto para o modelo: sem IDs e categorias secundárias, com as categorias codificadas."""
+    encoder = encoder or CategoricalEncoder()
+    return encoder.transform(df[ENCODED_COLUMNS])
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Tempo e memória de cada trecho do dashboard, medidos a cada execução do script.
+#
+# O Streamlit reexecuta o Streamlit.py inteiro a cada interação. Cada execução abre um
+# Profiler (start_run) e os trechos do script ficam dentro de section('nome'): o tempo é
+# medido com perf_counter e a memória pela variação do RSS do processo. As execuções ficam
+# guardadas neste módulo, que não é reexecutado, de modo que a primeira execução do processo
+# (fria: caches vazios, arquivos ainda não lidos) pode ser comparada com as seguintes
+# (quentes). O histórico é exportado no formato de trace do Chrome (chrome://tracing ou
+# https://ui.perfetto.dev) e resumido por trecho; main() executa o dashboard algumas vezes
+# sem navegador (streamlit.testing) e imprime o resumo, para acompanhar regressões.
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+MAX_RUNS = 50
+TRACE_PATH = 'dashboard_trace.json'
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss():
+    """Memória residente do processo em bytes (NaN fora do Linux)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return float('nan')
+
+
+class Profiler:
+    """Trechos medidos em uma execução do script."""
+
+    def __init__(self, number, cold):
+        self.number = number
+        self.cold = cold
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        self.rss = rss()
+        self.seconds = None
+        self.rss_delta = None
+        self.sections = []
+        self._depth = 0
+
+    @property
+    def kind(self):
+        return 'fria' if self.cold else 'quente'
+
+    @contextmanager
+    def section(self, name):
+        rss_before = rss()
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.sections.append({
+                'name': name,
+                'depth': self._depth,
+                'start': start - self.start,
+                'seconds': time.perf_counter() - start,
+                'rss_delta': rss() - rss_before,
+            })
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.start
+        self.rss_delta = rss() - self.rss
+
+    def table(self):
+        """Trechos na ordem em que começaram, com o nome recuado pelo aninhamento."""
+        sections = sorted(self.sections, key=lambda s: s['start'])
+        return pd.DataFrame({
+            'Trecho': ['  ' * s['depth'] + s['name'] for s in sections],
+            'Início (ms)': [s['start'] * 1e3 for s in sections],
+            'Tempo (ms)': [s['seconds'] * 1e3 for s in sections],
+            'Memória (MB)': [s['rss_delta'] / 1e6 for s in sections],
+        })
+
+
+RUNS = deque(maxlen=MAX_RUNS)
+_started = 0
+_lock = threading.Lock()
+# Cada sessão do Streamlit executa o script em uma thread própria
+_current = threading.local()
+
+
+def start_run():
+    """Abre a medição de uma execução; a primeira do processo é a execução fria."""
+    global _started
+    with _lock:
+        _started += 1
+        profiler = Profiler(_started, cold=_started == 1)
+    _current.profiler = profiler
+    return profiler
+
+
+def finish_run():
+    """Fecha a medição da execução atual e a guarda no histórico."""
+    profiler = getattr(_current, 'profiler', None)
+    if profiler is None:
+        return None
+    profiler.finish()
+    _current.profiler = None
+    RUNS.append(profiler)
+    return profiler
+
+
+@contextmanager
+def section(name):
+    """Mede um trecho da execução atual; sem execução aberta, não mede nada."""
+    profiler = getattr(_current, 'profiler', None)
+    if profiler is None:
+        yield
+        return
+    with profiler.section(name):
+        yield
+
+
+def summary(runs=RUNS):
+    """Tempo de cada trecho na execução fria e nas quentes (mediana e máximo)."""
+    rows = [(run.kind, s['name'], s['seconds'] * 1e3, s['rss_delta'] / 1e6)
+            for run in runs for s in run.sections]
+    rows += [(run.kind, 'execução completa', run.seconds * 1e3, run.rss_delta / 1e6) for run in runs]
+    df = pd.DataFrame(rows, columns=['kind', 'Trecho', 'ms', 'MB'])
+    order = list(dict.fromkeys(df['Trecho']))
+    cold = df[df['kind'] == 'fria'].groupby('Trecho')[['ms', 'MB']].sum()
+    warm = df[df['kind'] == 'quente'].groupby('Trecho')['ms'].agg(['median', 'max'])
+    table = pd.DataFrame(index=pd.Index(order, name='Trecho'))
+    table['Fria (ms)'] = cold['ms']
+    table['Fria (MB)'] = cold['MB']
+    table['Quente, mediana (ms)'] = warm['median']
+    table['Quente, máximo (ms)'] = warm['max']
+    return table.reset_index()
+
+
+def trace(runs=RUNS):
+    """Histórico no formato de trace do Chrome: uma linha do tempo (tid) por execução."""
+    pid = os.getpid()
+    events = []
+    for run in runs:
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': run.number,
+                       'args': {'name': f'execução {run.number} ({run.kind})'}})
+        events.append({'name': 'execução', 'ph': 'X', 'pid': pid, 'tid': run.number,
+                       'ts': run.wall * 1e6, 'dur': run.seconds * 1e6,
+                       'args': {'rss_delta_mb': run.rss_delta / 1e6}})
+        for s in run.sections:
+            events.append({'name': s['name'], 'ph': 'X', 'pid': pid, 'tid': run.number,
+                           'ts': (run.wall + s['start']) * 1e6, 'dur': s['seconds'] * 1e6,
+                           'args': {'rss_delta_mb': s['rss_delta'] / 1e6}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def export_trace(path=TRACE_PATH, runs=RUNS):
+    with open(path, 'w') as f:
+        json.dump(trace(runs), f)
+
+
+def main():
+    from streamlit.testing.v1 import AppTest
+
+    # O dashboard importa este arquivo como `profiling`, não como __main__
+    import profiling
+
+    parser = argparse.ArgumentParser(description='Mede a execução fria e as quentes do dashboard.')
+    parser.add_argument('script', nargs='?', default='Streamlit.py')
+    parser.add_argument('--runs', type=int, default=5, help='execuções, contando a fria')
+    parser.add_argument('--trace', default=TRACE_PATH)
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    app = AppTest.from_file(args.script, default_timeout=args.timeout)
+    for _ in range(args.runs):
+        app.run()
+        if app.exception:
+            raise SystemExit(app.exception[0].message)
+    profiling.export_trace(args.trace)
+    with pd.option_context('display.width', 200, 'display.float_format', '{:.1f}'.format):
+        print(profiling.summary().to_string(index=False))
+    print(f'Trace: {args.trace}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Perfil de qualidade dos dados, calculado durante a leitura do CSV.
+#
+# Uma única passada em blocos substitui as verificações avulsas do TP9.py (df.duplicated(),
+# df.isnull(), os unique() das categorias e os percentuais de outliers): registros duplicados
+# por hash de 64 bits de cada linha, ausentes por coluna, cardinalidade (exata para colunas
+# de domínio pequeno, HyperLogLog para User_ID/Product_ID), valores fora do domínio declarado
+# e taxa de outliers pelo IQR (histogramas da aggregation.py). O relatório é gravado em JSON
+# para o dashboard. Regras declaradas (Rule) interrompem a leitura com QualityError assim
+# que são violadas: as de contagem no primeiro bloco em que estouram, as de taxa ao final.
+
+import argparse
+import json
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from aggregation import Histogram
+from encoder import DEFAULT_TABLES
+from loader import DTYPES
+
+
+REPORT_PATH = 'quality_report.json'
+
+# Colunas de alta cardinalidade, contadas com HyperLogLog
+ID_COLUMNS = ['User_ID', 'Product_ID']
+NUMERIC_COLUMNS = [column for column, dtype in DTYPES.items()
+                   if dtype != 'category' and column not in ID_COLUMNS]
+
+# Domínio de cada coluna: ('in', valores) ou ('range', (mínimo, máximo)); None = sem limite
+DOMAINS = {
+    **{column: ('in', tuple(table)) for column, table in DEFAULT_TABLES.items()},
+    'Occupation': ('range', (0, 20)),
+    'Marital_Status': ('in', (0, 1)),
+    'Product_Category_1': ('range', (1, 20)),
+    'Product_Category_2': ('range', (1, 20)),
+    'Product_Category_3': ('range', (1, 20)),
+    'Purchase': ('range', (1, None)),
+}
+
+METRICS = ('duplicates', 'nulls', 'null_rate', 'domain_violations', 'outlier_rate')
+# Métricas que só crescem a cada bloco e por isso podem ser verificadas durante a leitura
+COUNT_METRICS = ('duplicates', 'nulls', 'domain_violations')
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Limite máximo de uma métrica; column=None vale para todas as colunas (ou para a tabela)."""
+    metric: str
+    limit: float
+    column: str = None
+
+    def __post_init__(self):
+        if self.metric not in METRICS:
+            raise ValueError(f'Métrica desconhecida: {self.metric}')
+
+
+# Sem valores fora do domínio e sem ausentes fora de Product_Category_2/3
+DEFAULT_RULES = [Rule('domain_violations', 0)] + [
+    Rule('nulls', 0, column) for column in DTYPES if column not in ('Product_Category_2', 'Product_Category_3')
+]
+
+
+class QualityError(ValueError):
+    """Regra de qualidade violada durante a leitura dos dados."""
+
+    def __init__(self, breaches):
+        self.breaches = breaches
+        super().__init__('Regras de qualidade violadas: ' + '; '.join(breaches))
+
+
+class HyperLogLog:
+    """Estimativa do número de valores distintos com 2**precision registradores (erro ~1,04/sqrt(m))."""
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        # Posição do primeiro bit 1 nos bits restantes, via bit_length das metades de 32 bits
+        high = np.frexp((rest >> np.uint64(32)).astype(np.float64))[1]
+        low = np.frexp((rest & np.uint64(0xFFFFFFFF)).astype(np.float64))[1]
+        bit_length = np.where(high > 0, high + 32, low)
+        rank = (64 - self.precision - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def update(self, values):
+        self.update_hashes(pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy())
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('Só é possível unir HyperLogLogs de mesma precisão')
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Correção para cardinalidades pequenas (contagem linear)
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+def _violations(series, domain):
+    kind, values = domain
+    if kind == 'in':
+        bad = ~series.isin(values)
+    else:
+        low, high = values
+        bad = pd.Series(False, index=series.index)
+        if low is not None:
+            bad |= series < low
+        if high is not None:
+            bad |= series > high
+    return int((bad & series.notna()).sum())
+
+
+class _SeenHashes:
+    """Hashes já vistos, guardados em trechos ordenados e sem repetição.
+
+    Um bloco é consultado com searchsorted em cada trecho, e um trecho novo é fundido com os
+    anteriores de tamanho menor ou igual, como em um contador binário. Assim há no máximo
+    log2(linhas / bloco) trechos, e cada bloco custa o mesmo, qualquer que seja o número de
+    blocos já lidos.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def contains(self, values):
+        """Máscara dos valores (ordenados) que já estão no conjunto."""
+        found = np.zeros(len(values), dtype=bool)
+        for run in self.runs:
+            position = np.searchsorted(run, values).clip(0, len(run) - 1)
+            found |= run[position] == values
+        return found
+
+    def add(self, values):
+        """Acrescenta valores ordenados, sem repetição e ainda ausentes do conjunto."""
+        run = values
+        while self.runs and len(self.runs[-1]) <= len(run):
+            # Dois trechos ordenados: a ordenação estável (timsort) só intercala os dois
+            run = np.sort(np.concatenate([self.runs.pop(), run]), kind='stable')
+        if len(run):
+            self.runs.append(run)
+
+
+class QualityProfiler:
+    def __init__(self, columns, rules=DEFAULT_RULES, domains=DOMAINS, id_columns=ID_COLUMNS,
+                 numeric_columns=NUMERIC_COLUMNS):
+        self.columns = list(columns)
+        self.rules = list(rules)
+        self.domains = {column: domain for column, domain in domains.items() if column in self.columns}
+        self.numeric_columns = [column for column in numeric_columns if column in self.columns]
+        self.rows = 0
+        self.duplicates = 0
+        self.nulls = dict.fromkeys(self.columns, 0)
+        self.violations = dict.fromkeys(self.domains, 0)
+        self.sketches = {column: HyperLogLog() for column in id_columns if column in self.columns}
+        self.distinct = {column: set() for column in self.columns if column not in self.sketches}
+        self.histograms = {column: Histogram() for column in self.numeric_columns}
+        self._seen = _SeenHashes()
+
+    def update(self, block):
+        """Acumula um bloco e levanta QualityError se uma regra de contagem for violada."""
+        block = block[self.columns]
+        self.rows += len(block)
+
+        # Duplicados: hash de cada linha, comparado com o bloco e com os hashes já vistos
+        hashes = pd.util.hash_pandas_object(block, index=False).to_numpy()
+        unique, counts = np.unique(hashes, return_counts=True)
+        seen = self._seen.contains(unique)
+        self.duplicates += int((counts - 1).sum()) + int(seen.sum())
+        self._seen.add(unique[~seen])
+
+        for column, count in block.isna().sum().items():
+            self.nulls[column] += int(count)
+        for column, domain in self.domains.items():
+            self.violations[column] += _violations(block[column], domain)
+        for column, sketch in self.sketches.items():
+            sketch.update(block[column])
+        for column, values in self.distinct.items():
+            values.update(block[column].dropna().unique().tolist())
+        for column, histogram in self.histograms.items():
+            histogram.update(block[column])
+
+        self.check(COUNT_METRICS)
+
+    def _metric(self, metric, column):
+        if metric == 'duplicates':
+            return self.duplicates
+        if metric == 'nulls':
+            return self.nulls[column]
+        if metric == 'null_rate':
+            return self.nulls[column] / max(self.rows, 1)
+        if metric == 'domain_violations':
+            return self.violations.get(column, 0)
+        histogram = self.histograms.get(column)
+        if histogram is None or not histogram.total:
+            return 0.0
+        return histogram.boxplot()['outliers'] / histogram.total
+
+    def breaches(self, metrics=METRICS):
+        found = []
+        for rule in self.rules:
+            if rule.metric not in metrics:
+                continue
+            if rule.metric == 'duplicates':
+                columns = [None]
+            elif rule.column is None:
+                columns = self.columns
+            else:
+                columns = [rule.column]
+            for column in columns:
+                value = self._metric(rule.metric, column)
+                if value > rule.limit:
+                    where = f' em {column}' if column else ''
+                    found.append(f'{rule.metric}{where} = {value:g} (limite {rule.limit:g})')
+        return found
+
+    def check(self, metrics=METRICS):
+        found = self.breaches(metrics)
+        if found:
+            raise QualityError(found)
+
+    def report(self):
+        columns = {}
+        for column in self.columns:
+            sketch = self.sketches.get(column)
+            entry = {
+                'nulls': self.nulls[column],
+                'null_rate': self._metric('null_rate', column),
+                'distinct': sketch.count() if sketch else len(self.distinct[column]),
+                'distinct_estimated': sketch is not None,
+            }
+            if column in self.domains:
+                entry['domain_violations'] = self.violations[column]
+            if column in self.histograms:
+                entry['outlier_rate'] = self._metric('outlier_rate', column)
+            columns[column] = entry
+        return {
+            'rows': self.rows,
+            'duplicates': self.duplicates,
+            'columns': columns,
+            'breaches': self.breaches(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+
+
+def profile_frame(df, rules=(), block_size=1 << 20):
+    """Relatório de qualidade de um DataFrame já carregado (sem regras por padrão)."""
+    profiler = QualityProfiler(df.columns, rules)
+    for start in range(0, len(df), block_size):
+        profiler.update(df.iloc[start:start + block_size])
+    profiler.check()
+    return profiler.report()
+
+
+def profile_file(path, rules=DEFAULT_RULES, chunksize=100_000):
+    """Lê o CSV em blocos, verificando as regras; devolve o relatório ou levanta QualityError.
+
+    As colunas vêm do cabeçalho, de modo que um CSV sem registros gera o relatório de 0 linhas.
+    """
+    profiler = QualityProfiler(pd.read_csv(path, dtype=DTYPES, nrows=0).columns, rules)
+    for chunk in pd.read_csv(path, dtype=DTYPES, chunksize=chunksize):
+        profiler.update(chunk)
+    profiler.check()
+    return profiler.report()
+
+
+def summary(report):
+    """Tabela por coluna do relatório, para exibição no notebook e no dashboard."""
+    table = pd.DataFrame.from_dict(report['columns'], orient='index')
+    return table.rename(columns={
+        'nulls': 'Ausentes',
+        'null_rate': 'Taxa de ausentes',
+        'distinct': 'Distintos',
+        'distinct_estimated': 'Estimado (HLL)',
+        'domain_violations': 'Fora do domínio',
+        'outlier_rate': 'Taxa de outliers (IQR)',
+    })
+
+
+def save_report(report, path=REPORT_PATH):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path=REPORT_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perfil de qualidade do CSV em uma única passada.')
+    parser.add_argument('source', nargs='?', default='black_friday_sales.csv')
+    parser.add_argument('--output', default=REPORT_PATH)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+
+    report = profile_file(args.source, chunksize=args.chunksize)
+    save_report(report, args.output)
+    print(f"{report['rows']} registros, {report['duplicates']} duplicados")
+    print(summary(report).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Geração das figuras do relatório (os PNGs do TP9.py) em paralelo.
+#
+# summarize() reduz os dados de cada figura a resumos pequenos: histogramas e estatísticas
+# de boxplot no lugar das colunas inteiras, as tabelas agregadas da análise, as 25 primeiras
+# predições e, para o gráfico real x previsto, uma amostra dos pontos ou, acima de
+# SCATTER_POINTS, uma grade de densidade com a reta ajustada em todos os dados. Cada figura
+# vira uma especificação (função do figures.py, argumentos e caminho) cuja chave é o hash dos
+# argumentos e do código das funções de desenho; figuras com a chave já registrada no
+# manifesto, e cujo PNG existe, não são redesenhadas. As demais são desenhadas em um pool de
+# processos com o backend Agg, uma figura por tarefa.
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+import aggregation
+import figures
+import missingness
+
+
+MANIFEST_PATH = 'report_manifest.json'
+# Acima deste número de pontos, o real x previsto vira uma grade de densidade
+SCATTER_POINTS = 5000
+DENSITY_BINS = 100
+PREDICTION_SAMPLES = 25
+
+
+@dataclass
+class Figure:
+    """Uma figura: figures.<func>(**kwargs, path=path)."""
+    path: str
+    func: str
+    kwargs: dict = field(default_factory=dict)
+
+    def key(self):
+        digest = hashlib.sha256(self.func.encode())
+        for module in (figures, missingness):
+            digest.update(inspect.getsource(module).encode())
+        digest.update(pickle.dumps(self.kwargs, protocol=pickle.HIGHEST_PROTOCOL))
+        return digest.hexdigest()
+
+
+def _auto_edges(histogram, moments_n):
+    """Bordas das faixas pela regra 'auto' do numpy (usada pelo sns.histplot), a partir do histograma."""
+    low = histogram.first * histogram.width
+    high = (histogram.first + len(histogram.counts)) * histogram.width - 1
+    if high <= low:
+        return np.array([low - 0.5, high + 0.5])
+    sturges = (high - low) / (np.log2(moments_n) + 1)
+    iqr = histogram.quantile(0.75) - histogram.quantile(0.25)
+    fd = 2 * iqr / np.cbrt(moments_n)
+    width = min(fd, sturges) if fd > 0 else sturges
+    return np.linspace(low, high, int(np.ceil((high - low) / width)) + 1)
+
+
+def _histogram_counts(histogram, edges):
+    centers = (np.arange(len(histogram.counts)) + histogram.first) * histogram.width + (histogram.width - 1) / 2
+    counts, _ = np.histogram(centers, bins=edges, weights=histogram.counts)
+    return counts
+
+
+def _box_stats(histogram, label, whis=1.5):
+    """Estatísticas do Axes.bxp (quartis, bigodes e valores além deles) a partir do histograma."""
+    box = histogram.boxplot(whis)
+    centers = (np.arange(len(histogram.counts)) + histogram.first) * histogram.width + (histogram.width - 1) / 2
+    present = centers[histogram.counts > 0]
+    fliers = present[(present < box['whisker_low']) | (present > box['whisker_high'])]
+    return {'label': label, 'q1': box['q1'], 'med': box['median'], 'q3': box['q3'],
+            'whislo': box['whisker_low'], 'whishi': box['whisker_high'], 'fliers': fliers}
+
+
+def _prediction_summary(y_test, y_pred, scatter_points, seed=42):
+    y_test = np.asarray(y_test, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    if len(y_test) <= scatter_points:
+        return 'prediction_regplot', {'y_test': y_test, 'y_pred': y_pred}
+    counts, x_edges, y_edges = np.histogram2d(y_test, y_pred, bins=DENSITY_BINS)
+    line = tuple(np.polyfit(y_test, y_pred, 1))
+    return 'prediction_density', {'counts': counts, 'x_edges': x_edges, 'y_edges': y_edges, 'line': line}
+
+
+def summarize(raw, clean, filtered, encoded, y_test, y_pred, scatter_points=SCATTER_POINTS):
+    """Resumos pequenos de que as figuras precisam, indexados pelo nome da figura."""
+    numeric = list(clean.select_dtypes('number').columns)
+    _, moments = aggregation.aggregate(clean, [], moments=numeric, histograms=numeric)
+    purchase = moments.hist['Purchase']
+    edges = _auto_edges(purchase, moments.n)
+    describe = moments.describe()['Purchase']
+    tables, _ = aggregation.aggregate(filtered, aggregation.EDA_SPECS)
+    _, encoded_moments = aggregation.aggregate(encoded, [], moments=encoded.columns)
+    regplot, regplot_kwargs = _prediction_summary(y_test, y_pred, scatter_points)
+
+    return {
+        'ausentes.png': ('missing_heatmap', {'missing': missingness.profile(raw),
+                                             'title': 'Verificando valores ausentes'}),
+        'ausentes_2.png': ('missing_heatmap', {'missing': missingness.profile(clean),
+                                               'title': 'Verificando preenchimento de ausentes'}),
+        'distribuicao.png': ('distribution_binned', {'counts': _histogram_counts(purchase, edges), 'edges': edges,
+                                                     'mean': describe['mean'], 'median': describe['50%']}),
+        'boxplot_alvo.png': ('target_boxplot_stats', {'stats': _box_stats(purchase, 'Purchase')}),
+        'purchase_desc.png': ('describe_bars', {'purchase_desc': describe}),
+        'outliers.png': ('numeric_boxplots_stats', {'stats': [_box_stats(moments.hist[column], column)
+                                                              for column in numeric]}),
+        'gender_purchase.png': ('gender_purchase', {'gender_df': tables['gender_mean']}),
+        'age_purchase.png': ('age_purchase', {'age_gender_count': tables['age_gender_count']}),
+        'occ_purchase.png': ('occupation_purchase', {'occupation_df': tables['occupation_sum']}),
+        'city_purchase.png': ('city_purchase', {'purchase_per_city': tables['city_sum']}),
+        'years_purchase.png': ('years_purchase', {'years_sum': tables['years_sum']}),
+        'ms_purchase.png': ('marital_purchase', {'marital_count': tables['marital_count']}),
+        'categories_purchase_1.png': ('categories_count', {'category_count': tables['category_count']}),
+        'categories_purchase_2.png': ('categories_mean', {'category_mean': tables['category_mean']}),
+        'heatmap.png': ('correlation_heatmap', {'corr': encoded_moments.correlation()}),
+        'regressao.png': ('prediction_bars', {'y_test': np.asarray(y_test)[:PREDICTION_SAMPLES],
+                                              'y_pred': np.asarray(y_pred)[:PREDICTION_SAMPLES]}),
+        'regplot.png': (regplot, regplot_kwargs),
+    }
+
+
+def figure_specs(summaries, output_dir='.'):
+    return [Figure(os.path.join(output_dir, name), func, kwargs) for name, (func, kwargs) in summaries.items()]
+
+
+def _init():
+    import matplotlib
+
+    matplotlib.use('Agg')
+
+
+def _draw(func, kwargs, path):
+    start = time.perf_counter()
+    getattr(figures, func)(**kwargs, path=path)
+    return time.perf_counter() - start
+
+
+def _read_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render(specs, manifest_path=MANIFEST_PATH, processes=None, force=False):
+    """Desenha as figuras alteradas (ou ausentes); devolve o status e o tempo de cada uma."""
+    manifest = _read_manifest(manifest_path)
+    keys = {spec.path: spec.key() for spec in specs}
+    todo = [spec for spec in specs
+            if force or manifest.get(spec.path) != keys[spec.path] or not os.path.exists(spec.path)]
+    report = {spec.path: {'figura': spec.path, 'status': 'sem alterações', 'segundos': 0.0} for spec in specs}
+
+    processes = min(processes or os.cpu_count() or 1, len(todo))
+    if processes > 1:
+        with ProcessPoolExecutor(processes, initializer=_init) as pool:
+            futures = {spec.path: pool.submit(_draw, spec.func, spec.kwargs, spec.path) for spec in todo}
+            seconds = {path: future.result() for path, future in futures.items()}
+    else:
+        _init()
+        seconds = {spec.path: _draw(spec.func, spec.kwargs, spec.path) for spec in todo}
+
+    for path, elapsed in seconds.items():
+        report[path].update(status='gerada', segundos=elapsed)
+        manifest[path] = keys[path]
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return [report[spec.path] for spec in specs]
+
+
+def main():
+    from sklearn.linear_model import LinearRegression
+    from sklearn.model_selection import train_test_split
+
+    import outliers
+    import preprocessing
+    from loader import load_sales
+
+    parser = argparse.ArgumentParser(description='Gera as figuras do relatório em paralelo.')
+    parser.add_argument('--source', default='black_friday_sales.csv')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--scatter-points', type=int, default=SCATTER_POINTS)
+    parser.add_argument('--force', action='store_true', help='redesenha mesmo as figuras sem alterações')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    raw = load_sales(args.source)
+    clean = preprocessing.fill_missing(raw)
+    filtered, _ = outliers.remove_outliers(clean)
+    encoded = preprocessing.encode(filtered)
+    x_train, x_test, y_train, y_test = train_test_split(encoded.drop('Purchase', axis=1), encoded['Purchase'],
+                                                        test_size=0.4, random_state=42)
+    y_pred = np.round(LinearRegression().fit(x_train, y_train).predict(x_test), 2)
+    summaries = summarize(raw, clean, filtered, encoded, y_test, y_pred, args.scatter_points)
+    print(f'Resumos em {time.perf_counter() - start:.2f} s')
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    rows = render(figure_specs(summaries, args.output_dir), os.path.join(args.output_dir, MANIFEST_PATH),
+                  args.processes, args.force)
+    for row in rows:
+        print(f"{row['figura']:<40} {row['status']:<15} {row['segundos']:6.2f} s")
+    print(f'Figuras em {time.perf_counter() - start:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Predição em lote de arquivos no formato do black_friday_sales.csv.
+#
+# O arquivo de entrada é dividido em blocos que os processos do pool leem sozinhos: trechos
+# de bytes terminados em quebra de linha, no CSV, ou row groups, no Parquet. Assim o processo
+# principal não interpreta nem serializa os dados de entrada. Cada processo carrega o
+# artefato do modelo (model_store.py) uma vez, no inicializador, e devolve só as predições
+# (e as colunas de identificação pedidas). O processo principal grava os resultados na ordem
+# dos blocos, à medida que ficam prontos, com no máximo `2 * processos` blocos em andamento,
+# e informa o progresso e a vazão (linhas/s).
+
+import argparse
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from loader import DTYPES
+from model_store import MODELS_DIR, load_model
+
+
+PREDICTION_COLUMN = 'Purchase_Previsto'
+CHUNK_BYTES = 32 << 20
+
+_data = {}
+
+
+def _load(directory, version, source, keep):
+    _data['artifact'] = load_model(directory, version)
+    _data['source'] = source
+    _data['keep'] = list(keep)
+    if not source.endswith('.parquet'):
+        with open(source, 'rb') as f:
+            _data['header'] = f.readline()
+
+
+def csv_ranges(path, chunk_bytes=CHUNK_BYTES):
+    """Trechos (início, fim) em bytes do CSV, alinhados a quebras de linha, após o cabeçalho."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _read_block(block):
+    source = _data['source']
+    if source.endswith('.parquet'):
+        df = pq.ParquetFile(source).read_row_group(block).to_pandas()
+        return df.astype({column: dtype for column, dtype in DTYPES.items() if column in df.columns})
+    start, end = block
+    with open(source, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(_data['header'] + data), dtype=DTYPES)
+
+
+def score_block(block):
+    """Predições de um bloco, calculadas no processo atual."""
+    df = _read_block(block)
+    result = df[_data['keep']].reset_index(drop=True)
+    # Categorias como valores simples: o esquema da saída não depende das categorias de cada bloco
+    for column in result.select_dtypes('category'):
+        result[column] = result[column].astype(object)
+    result[PREDICTION_COLUMN] = np.round(_data['artifact'].predict_frame(df), 2)
+    return result
+
+
+def _blocks(source, chunk_bytes):
+    if source.endswith('.parquet'):
+        metadata = pq.ParquetFile(source).metadata
+        return list(range(metadata.num_row_groups)), [metadata.row_group(i).num_rows
+                                                      for i in range(metadata.num_row_groups)]
+    ranges = csv_ranges(source, chunk_bytes)
+    return ranges, [end - start for start, end in ranges]
+
+
+class _Output:
+    """Grava os blocos de resultado em CSV ou Parquet, conforme a extensão."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.writer = None
+
+    def write(self, df):
+        if self.path.endswith('.parquet'):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self.writer = self.writer or pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+        else:
+            header = self.file is None
+            self.file = self.file or open(self.path, 'w', newline='')
+            df.to_csv(self.file, header=header, index=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.writer is not None:
+            self.writer.close()
+        if self.file is not None:
+            self.file.close()
+
+
+def score_file(source, output, directory=MODELS_DIR, version=None, keep=('User_ID', 'Product_ID'),
+               processes=None, chunk_bytes=CHUNK_BYTES, progress=sys.stderr):
+    """Aplica o modelo a `source` e grava `output`; devolve o número de linhas previstas."""
+    blocks, weights = _blocks(source, chunk_bytes)
+    processes = processes or os.cpu_count() or 1
+    total_weight = max(sum(weights), 1)
+    done_weight = rows = 0
+    start = time.perf_counter()
+
+    def write_oldest():
+        nonlocal rows, done_weight
+        future, weight = pending.popleft()
+        result = future.result()
+        out.write(result)
+        rows += len(result)
+        done_weight += weight
+        _report(progress, rows, done_weight / total_weight, time.perf_counter() - start)
+
+    pending = deque()
+    with ProcessPoolExecutor(processes, initializer=_load,
+                             initargs=(directory, version, source, keep)) as pool, _Output(output) as out:
+        for block, weight in zip(blocks, weights):
+            pending.append((pool.submit(score_block, block), weight))
+            # Grava na ordem dos blocos; com a janela cheia, espera o mais antigo em andamento
+            while pending and (len(pending) >= 2 * processes or pending[0][0].done()):
+                write_oldest()
+        while pending:
+            write_oldest()
+    return rows
+
+
+def _report(progress, rows, fraction, seconds):
+    if progress is not None:
+        print(f'\r{fraction:6.1%}  {rows:,} linhas  {rows / max(seconds, 1e-9):,.0f} linhas/s'.replace(',', '.'),
+              end='', file=progress, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aplica o modelo salvo a um arquivo CSV/Parquet em lote.')
+    parser.add_argument('source', help='arquivo no formato do black_friday_sales.csv (.csv ou .parquet)')
+    parser.add_argument('output', help='arquivo de predições (.csv ou .parquet)')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--version', default=None, help='versão do modelo (padrão: a mais recente)')
+    parser.add_argument('--keep', nargs='*', default=['User_ID', 'Product_ID'],
+                        help='colunas de entrada copiadas para a saída')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES >> 20, help='tamanho dos blocos do CSV (MB)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = score_file(args.source, args.output, args.models_dir, args.version, args.keep,
+                      args.processes, args.chunk_mb << 20)
+    seconds = time.perf_counter() - start
+    print(f'\n{rows} linhas previstas em {seconds:.1f} s ({rows / max(seconds, 1e-9):.0f} linhas/s) -> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
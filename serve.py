@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Servidor local de predição do valor de Purchase.
+#
+# O artefato do modelo é carregado uma vez na inicialização. Cada requisição POST /predict
+# recebe um registro (ou uma lista de registros) com os campos do dataset original e
+# devolve o Purchase previsto. Requisições simultâneas são agrupadas em micro-lotes: o
+# laço de predição espera no máximo `max_wait` segundos (ou `max_batch` registros), monta uma
+# única matriz de entrada com os registros de todas as requisições e faz uma única predição
+# vetorizada para o lote inteiro. Um registro inválido faz falhar só a sua requisição.
+#
+# Rotas: POST /predict, GET /health, GET /stats (latências p50/p99 das últimas requisições,
+# medidas por requisição do início ao fim, qualquer que seja o número de registros).
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from http import HTTPStatus
+
+import numpy as np
+
+from encoder import UnknownCategoryError
+from model_store import MODELS_DIR, load_model
+
+
+class MicroBatcher:
+    """Agrupa registros de requisições concorrentes em uma única chamada de predição."""
+
+    def __init__(self, artifact, max_batch=1024, max_wait=0.0005):
+        self.artifact = artifact
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.rows = 0
+
+    async def predict(self, records):
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise ValueError('Esperado um registro ou uma lista de registros')
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((records, future))
+        return await future
+
+    def _matrix(self, items):
+        """Matriz do lote inteiro; se algum registro for inválido, só a requisição dele falha."""
+        try:
+            return self.artifact.matrix([record for records, _ in items for record in records]), items
+        except (UnknownCategoryError, ValueError, KeyError, TypeError):
+            pass
+        parts, valid = [], []
+        for records, future in items:
+            try:
+                parts.append(self.artifact.matrix(records))
+            except (UnknownCategoryError, ValueError, KeyError, TypeError) as error:
+                future.set_exception(error)
+                continue
+            valid.append((records, future))
+        width = len(self.artifact.features)
+        return (np.vstack(parts) if parts else np.empty((0, width))), valid
+
+    async def run(self):
+        while True:
+            items = [await self.queue.get()]
+            try:
+                await self._collect(items)
+                self._predict(items)
+            except Exception as error:
+                # Um erro inesperado derruba só as requisições deste lote, não o laço
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(error)
+
+    async def _collect(self, items):
+        """Acrescenta a `items` as requisições que chegarem até max_wait ou max_batch registros."""
+        size = len(items[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 and self.queue.empty():
+                break
+            try:
+                item = self.queue.get_nowait() if remaining <= 0 else \
+                    await asyncio.wait_for(self.queue.get(), remaining)
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            items.append(item)
+            size += len(item[0])
+
+    def _predict(self, items):
+        # Uma única matriz por micro-lote, montada fora das requisições
+        x, valid = self._matrix(items)
+        if not valid:
+            return
+        predictions = self.artifact.predict_matrix(x)
+        self.batches += 1
+        self.rows += len(x)
+        start = 0
+        for rows, future in valid:
+            future.set_result(predictions[start:start + len(rows)])
+            start += len(rows)
+
+
+class PredictionServer:
+    def __init__(self, artifact, max_batch=1024, max_wait=0.0005):
+        self.artifact = artifact
+        self.batcher = MicroBatcher(artifact, max_batch, max_wait)
+        self.latencies = deque(maxlen=10_000)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                try:
+                    status, payload = await self.route(method, path, body)
+                except Exception as error:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f'Erro interno: {error}'}
+                data = json.dumps(payload).encode()
+                writer.write(f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                             f'Content-Type: application/json\r\n'
+                             f'Content-Length: {len(data)}\r\n\r\n'.encode() + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            return HTTPStatus.OK, {'status': 'ok', 'version': self.artifact.version}
+        if method == 'GET' and path == '/stats':
+            return HTTPStatus.OK, self.stats()
+        if method == 'POST' and path == '/predict':
+            return await self.predict(body)
+        return HTTPStatus.NOT_FOUND, {'error': f'Rota não encontrada: {method} {path}'}
+
+    async def predict(self, body):
+        start = time.perf_counter()
+        try:
+            data = json.loads(body)
+            single = isinstance(data, dict) and 'records' not in data
+            records = [data] if single else (data['records'] if isinstance(data, dict) else data)
+            predictions = await self.batcher.predict(records)
+        except (UnknownCategoryError, ValueError, KeyError, TypeError) as error:
+            return HTTPStatus.BAD_REQUEST, {'error': str(error)}
+        self.latencies.append(time.perf_counter() - start)
+        if single:
+            return HTTPStatus.OK, {'Purchase': float(predictions[0])}
+        return HTTPStatus.OK, {'Purchase': predictions.tolist()}
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'version': self.artifact.version,
+            'requests': len(latencies),
+            'batches': self.batcher.batches,
+            'rows': self.batcher.rows,
+            'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        }
+
+    async def serve(self, host, port):
+        batch_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f'Modelo {self.artifact.version} servindo em http://{host}:{port}')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batch_task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor de predição do valor da compra (Purchase).')
+    parser.add_argument('--models', default=MODELS_DIR, help='diretório dos artefatos do modelo')
+    parser.add_argument('--version', help='versão do modelo (padrão: a mais recente)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch', type=int, default=1024, help='registros por micro-lote')
+    parser.add_argument('--max-wait', type=float, default=0.0005, help='espera máxima (s) para completar um lote')
+    args = parser.parse_args()
+
+    artifact = load_model(args.models, args.version)
+    server = PredictionServer(artifact, args.max_batch, args.max_wait)
+    asyncio.run(server.serve(args.host, args.port))
+
+
+if __name__ == '__main__':
+    main()
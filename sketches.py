@@ -0,0 +1,431 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Estatísticas aproximadas, com erro limitado, para a análise exploratória em dados grandes.
+#
+# O describe(), o boxplot, o histograma de Purchase e as contagens por categoria do TP9.py
+# exigem ordenar ou percorrer o dataset inteiro. Aqui cada partição do arquivo é resumida
+# por sketches de tamanho fixo, que podem ser unidos (merge) depois:
+#   - KLL para quantis (quartis, mediana, bigodes e taxa de outliers do boxplot), com o erro
+#     de posição calculado a partir das compactações efetivamente feitas;
+#   - aggregation.Histogram, com número de faixas limitado, para o gráfico de distribuição;
+#   - Count-Min para a frequência de cada valor de uma coluna (erro <= eps*N com
+#     probabilidade 1 - delta) e quality.HyperLogLog para o número de valores distintos;
+#   - contagem, média, desvio padrão, mínimo e máximo exatos (fórmula de Chan para unir).
+# As partições são trechos do CSV alinhados a quebras de linha (score.csv_ranges), resumidas
+# em paralelo num pool de processos; o processo principal só une sketches pequenos.
+
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from aggregation import Histogram
+from loader import DTYPES
+from quality import HyperLogLog
+from score import csv_ranges
+
+
+NUMERIC_COLUMNS = ['Purchase', 'Product_Category_1']
+CATEGORICAL_COLUMNS = ['User_ID', 'Product_ID', 'Gender', 'Age', 'Occupation', 'City_Category',
+                       'Stay_In_Current_City_Years', 'Marital_Status', 'Product_Category_1']
+CHUNK_BYTES = 16 << 20
+# Faixas do histograma de distribuição e candidatos guardados para os valores mais frequentes
+HISTOGRAM_BINS = 2048
+TOP_CANDIDATES = 256
+# Semente fixa do hash do Count-Min: sketches de partições diferentes precisam ser compatíveis
+HASH_SEED = 20231124
+
+
+class KLL:
+    """Sketch de quantis KLL: níveis de itens com peso 2**nível, capacidade ~k*(2/3)**profundidade.
+
+    Cada compactação ordena um nível e promove os itens de posição par ou ímpar (sorteada) ao
+    nível seguinte; o erro de posição que ela introduz em qualquer consulta fica entre -w e w
+    (w = peso do nível) e tem média zero. rank_error() usa a soma dos w² das compactações
+    feitas (desigualdade de Hoeffding).
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.levels = [np.zeros(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._variance = 0.0
+        self._sorted = None
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.zeros(0))
+                items = np.sort(items)
+                # Com um número ímpar de itens, o primeiro fica no nível
+                odd = len(items) % 2
+                promoted = items[odd + int(self.rng.integers(2))::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = items[:odd]
+                self._variance += float(4 ** level)
+            level += 1
+        self._sorted = None
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.zeros(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._variance += other._variance
+        self._compress()
+        return self
+
+    @property
+    def size(self):
+        return sum(len(items) for items in self.levels)
+
+    def rank_error(self, delta=0.01):
+        """Erro de posição normalizado (fração de n) com probabilidade 1 - delta."""
+        if not self.n:
+            return 0.0
+        return float(np.sqrt(2 * self._variance * np.log(2 / delta))) / self.n
+
+    def _cumulative(self):
+        if self._sorted is None:
+            items = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+            order = np.argsort(items, kind='stable')
+            self._sorted = items[order], np.cumsum(weights[order])
+        return self._sorted
+
+    def quantile(self, q):
+        if not self.n:
+            return np.nan
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        items, cumulative = self._cumulative()
+        index = int(np.searchsorted(cumulative, q * cumulative[-1], side='left'))
+        return float(items[min(index, len(items) - 1)])
+
+    def rank(self, value):
+        """Fração estimada dos valores <= value."""
+        if not self.n:
+            return np.nan
+        items, cumulative = self._cumulative()
+        index = int(np.searchsorted(items, value, side='right'))
+        return float(cumulative[index - 1] / cumulative[-1]) if index else 0.0
+
+    def quantile_bounds(self, q, delta=0.01):
+        """Intervalo que contém o quantil exato q com probabilidade 1 - delta.
+
+        Além do erro de posição, o quantil devolvido pode estar até o peso de um item (o do
+        nível mais alto) além da posição pedida.
+        """
+        error = self.rank_error(delta) + 2.0 ** (len(self.levels) - 1) / max(self.n, 1)
+        return self.quantile(max(q - error, 0.0)), self.quantile(min(q + error, 1.0))
+
+
+def _hash(values):
+    """Hash de 64 bits de cada valor; colunas categóricas calculam o hash uma vez por categoria."""
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        hashes = pd.util.hash_array(series.cat.categories.to_numpy())
+        return hashes[codes[codes >= 0]]
+    return pd.util.hash_array(series.dropna().to_numpy())
+
+
+class CountMin:
+    """Frequência aproximada de valores: nunca subestima e excede em no máximo e/width * N
+    com probabilidade 1 - exp(-depth)."""
+
+    def __init__(self, width=2048, depth=5, seed=HASH_SEED):
+        if width & (width - 1):
+            raise ValueError('A largura do Count-Min deve ser uma potência de 2')
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self._bits = width.bit_length() - 1
+        # Hash multiplicativo: multiplicadores ímpares, bits mais altos do produto
+        self._multipliers = np.random.default_rng(seed).integers(0, 1 << 63, depth, dtype=np.uint64) * 2 + 1
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    @classmethod
+    def from_error(cls, epsilon=0.001, delta=0.01, seed=HASH_SEED):
+        width = 1 << int(np.ceil(np.log2(np.e / epsilon)))
+        return cls(width, int(np.ceil(np.log(1 / delta))), seed)
+
+    def _columns(self, hashes):
+        shift = np.uint64(64 - self._bits)
+        return [(hashes * multiplier) >> shift for multiplier in self._multipliers]
+
+    def update_hashes(self, hashes):
+        for row, columns in enumerate(self._columns(hashes)):
+            self.table[row] += np.bincount(columns.astype(np.int64), minlength=self.width)
+        self.total += len(hashes)
+
+    def estimate_hashes(self, hashes):
+        return np.min([self.table[row][columns.astype(np.int64)]
+                       for row, columns in enumerate(self._columns(hashes))], axis=0)
+
+    def update(self, values):
+        self.update_hashes(_hash(values))
+
+    def estimate(self, values):
+        return self.estimate_hashes(_hash(values))
+
+    def merge(self, other):
+        if (other.width, other.depth, other.seed) != (self.width, self.depth, self.seed):
+            raise ValueError('Só é possível unir Count-Mins de mesma largura, profundidade e semente')
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    @property
+    def error(self):
+        """Excesso máximo de cada frequência estimada (com probabilidade 1 - exp(-depth))."""
+        return np.e / self.width * self.total
+
+
+class FrequencySketch:
+    """Frequências (Count-Min), distintos (HyperLogLog) e candidatos aos valores mais frequentes."""
+
+    def __init__(self, width=2048, depth=5, candidates=TOP_CANDIDATES):
+        self.counts = CountMin(width, depth)
+        self.distinct = HyperLogLog()
+        self.max_candidates = candidates
+        self.candidates = {}
+
+    def update(self, values):
+        series = values if isinstance(values, pd.Series) else pd.Series(values)
+        hashes = _hash(series)
+        self.counts.update_hashes(hashes)
+        self.distinct.update_hashes(hashes)
+        # Os mais frequentes do bloco entram como candidatos, identificados pelo hash
+        top = series.value_counts(sort=True).head(self.max_candidates)
+        top = top[top > 0]
+        for value, value_hash in zip(top.index, _hash(pd.Series(top.index, dtype=series.dtype))):
+            self.candidates[int(value_hash)] = value
+        self._prune()
+
+    def _prune(self):
+        if len(self.candidates) <= self.max_candidates:
+            return
+        hashes = np.fromiter(self.candidates, dtype=np.uint64, count=len(self.candidates))
+        keep = hashes[np.argsort(-self.counts.estimate_hashes(hashes), kind='stable')[:self.max_candidates]]
+        self.candidates = {int(h): self.candidates[int(h)] for h in keep}
+
+    def merge(self, other):
+        self.counts.merge(other.counts)
+        self.distinct.merge(other.distinct)
+        self.candidates.update(other.candidates)
+        self._prune()
+        return self
+
+    def top(self, n=10):
+        """Valores mais frequentes, com a frequência estimada e o excesso máximo."""
+        hashes = np.fromiter(self.candidates, dtype=np.uint64, count=len(self.candidates))
+        estimates = self.counts.estimate_hashes(hashes) if len(hashes) else np.zeros(0, dtype=np.int64)
+        order = np.argsort(-estimates, kind='stable')[:n]
+        return pd.DataFrame({
+            'Valor': [self.candidates[int(hashes[i])] for i in order],
+            'Frequência (estimada)': estimates[order],
+            'Erro máximo': int(np.ceil(self.counts.error)),
+        })
+
+
+class Moments:
+    """Contagem, média, variância, mínimo e máximo exatos, com união pela fórmula de Chan."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            other = Moments()
+            other.n, other.mean = len(values), float(values.mean())
+            other.m2 = float(((values - other.mean) ** 2).sum())
+            other.min, other.max = float(values.min()), float(values.max())
+            self.merge(other)
+        return self
+
+    def merge(self, other):
+        n = self.n + other.n
+        if not other.n:
+            return self
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else np.nan
+
+
+class EdaSketch:
+    """Sketches de todas as colunas da análise exploratória, para um bloco, partição ou arquivo."""
+
+    def __init__(self, numeric=NUMERIC_COLUMNS, categorical=CATEGORICAL_COLUMNS, k=200,
+                 histogram_bins=HISTOGRAM_BINS, width=2048, depth=5, seed=None):
+        rng = np.random.default_rng(seed)
+        self.moments = {column: Moments() for column in numeric}
+        self.quantiles = {column: KLL(k, rng.integers(1 << 32)) for column in numeric}
+        self.histograms = {column: Histogram(histogram_bins) for column in numeric}
+        self.frequencies = {column: FrequencySketch(width, depth) for column in categorical}
+
+    def update(self, block):
+        for column in self.moments:
+            values = block[column].to_numpy(dtype=np.float64)
+            self.moments[column].update(values)
+            self.quantiles[column].update(values)
+            self.histograms[column].update(values)
+        for column, sketch in self.frequencies.items():
+            sketch.update(block[column])
+        return self
+
+    def merge(self, other):
+        for column in self.moments:
+            self.moments[column].merge(other.moments[column])
+            self.quantiles[column].merge(other.quantiles[column])
+            self.histograms[column].merge(other.histograms[column])
+        for column, sketch in self.frequencies.items():
+            sketch.merge(other.frequencies[column])
+        return self
+
+    def describe(self, delta=0.01):
+        """Equivalente ao df.describe(); os quartis são aproximados e trazem seus intervalos."""
+        rows = {}
+        for column, moments in self.moments.items():
+            kll = self.quantiles[column]
+            entry = {'count': moments.n, 'mean': moments.mean, 'std': moments.std, 'min': moments.min}
+            for q, label in ((0.25, '25%'), (0.5, '50%'), (0.75, '75%')):
+                low, high = kll.quantile_bounds(q, delta)
+                entry[label] = kll.quantile(q)
+                entry[f'{label} (intervalo)'] = f'[{low:g}, {high:g}]'
+            entry['max'] = moments.max
+            entry['erro de posição'] = kll.rank_error(delta)
+            rows[column] = entry
+        return pd.DataFrame(rows)
+
+    def boxplot(self, column, whis=1.5):
+        """Quartis, bigodes e taxa de outliers estimados pelo KLL."""
+        kll = self.quantiles[column]
+        q1, median, q3 = kll.quantile(0.25), kll.quantile(0.5), kll.quantile(0.75)
+        low, high = q1 - whis * (q3 - q1), q3 + whis * (q3 - q1)
+        items, _ = kll._cumulative()
+        inside = items[(items >= low) & (items <= high)]
+        below = kll.rank(np.nextafter(low, -np.inf))
+        return {
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'whisker_low': float(inside.min()) if len(inside) else np.nan,
+            'whisker_high': float(inside.max()) if len(inside) else np.nan,
+            'outlier_rate': below + 1 - kll.rank(high),
+            'rank_error': kll.rank_error(),
+        }
+
+    def histogram(self, column, bins=50):
+        """Contagens e bordas de `bins` faixas iguais, a partir do histograma acumulado."""
+        histogram = self.histograms[column]
+        starts = (np.arange(len(histogram.counts)) + histogram.first) * histogram.width
+        edges = np.linspace(starts[0], starts[-1] + histogram.width, bins + 1)
+        counts, _ = np.histogram(starts, bins=edges, weights=histogram.counts)
+        return counts.astype(np.int64), edges
+
+    def distinct(self):
+        """Número de valores distintos estimado por coluna (erro padrão ~0,8% com 2**14 registradores)."""
+        return pd.Series({column: sketch.distinct.count() for column, sketch in self.frequencies.items()},
+                         name='Distintos (estimado)')
+
+
+def sketch_frame(df, partitions=1, **options):
+    """Sketches de um DataFrame em memória, partição por partição."""
+    result = None
+    for i, part in enumerate(np.array_split(np.arange(len(df)), partitions)):
+        sketch = EdaSketch(seed=i, **options).update(df.iloc[part])
+        result = sketch if result is None else result.merge(sketch)
+    return result
+
+
+def _sketch_range(path, start, end, seed, options):
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(header + data), dtype=DTYPES)
+    return EdaSketch(seed=seed, **options).update(df)
+
+
+def sketch_file(path, processes=None, chunk_bytes=CHUNK_BYTES, **options):
+    """Resume o CSV em paralelo, uma partição por trecho de bytes, e une os sketches."""
+    ranges = csv_ranges(path, chunk_bytes)
+    result = EdaSketch(**options)
+    with ProcessPoolExecutor(processes or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(_sketch_range, path, start, end, i, options)
+                   for i, (start, end) in enumerate(ranges)]
+        for future in futures:
+            result.merge(future.result())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estatísticas aproximadas do CSV, calculadas em paralelo.')
+    parser.add_argument('source', nargs='?', default='black_friday_sales.csv')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES >> 20)
+    parser.add_argument('--k', type=int, default=200, help='tamanho do KLL (maior = quantis mais precisos)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sketch = sketch_file(args.source, args.processes, args.chunk_mb << 20, k=args.k)
+    print(f'Sketches em {time.perf_counter() - start:.2f} s\n')
+    with pd.option_context('display.width', 200):
+        print(sketch.describe().to_string(), '\n')
+        for column in sketch.quantiles:
+            box = sketch.boxplot(column)
+            print(f"Boxplot de {column}: " + ', '.join(f'{key} {value:g}' for key, value in box.items()))
+        print('\n' + sketch.distinct().to_string(), '\n')
+        print('Produtos mais vendidos:')
+        print(sketch.frequencies['Product_ID'].top().to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
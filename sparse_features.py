@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Matriz de features esparsa (CSR) para os modelos lineares.
+#
+# Em vez de tratar Occupation e as categorias de produto como inteiros (ou de descartar
+# Product_Category_2/3), cada valor vira uma coluna: one-hot para Occupation (e demais colunas
+# configuradas), multi-hot para as três categorias de produto, em que o 0 do preenchimento
+# significa "sem categoria", e, opcionalmente, cruzamentos entre colunas com hashing em 2**bits
+# colunas. Cada linha ocupa um número fixo de posições (uma por coluna one-hot, três para as
+# categorias, uma por cruzamento, uma por coluna numérica); as posições ausentes são
+# descartadas por uma máscara e os vetores indptr/indices/data da CSR saem direto dela, sem
+# passar por uma matriz densa de dummies.
+
+import argparse
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from feature_store import LookupIndex
+
+
+CATEGORY_COLUMNS = ['Product_Category_1', 'Product_Category_2', 'Product_Category_3']
+ONE_HOT_COLUMNS = ['Occupation', 'Age', 'City_Category']
+NUMERIC_COLUMNS = ['Gender', 'Marital_Status', 'Stay_In_Current_City_Years']
+# Cruzamentos opcionais (pares de colunas one-hot ou de categoria principal)
+CROSSES = [('Age', 'Product_Category_1'), ('Occupation', 'Product_Category_1'), ('Gender', 'Age')]
+HASH_BITS = 16
+
+
+def _codes(index, values):
+    return index.rows(values).astype(np.int64)
+
+
+class SparseEncoder:
+    """Gera a matriz CSR; fit() guarda o vocabulário de cada coluna visto no treino."""
+
+    def __init__(self, one_hot=ONE_HOT_COLUMNS, categories=CATEGORY_COLUMNS, numeric=NUMERIC_COLUMNS,
+                 crosses=(), hash_bits=HASH_BITS):
+        self.one_hot = list(one_hot)
+        self.categories = list(categories)
+        self.numeric = list(numeric)
+        self.crosses = [tuple(cross) for cross in crosses]
+        self.hash_bits = hash_bits
+        self.vocabulary = {}
+
+    def fit(self, df):
+        for column in self.one_hot + [column for cross in self.crosses for column in cross]:
+            if column not in self.vocabulary:
+                self.vocabulary[column] = LookupIndex(sorted(pd.unique(df[column].dropna())))
+        values = pd.unique(pd.concat([df[column] for column in self.categories]).dropna())
+        self.vocabulary['categories'] = LookupIndex(sorted(value for value in values if value != 0))
+        return self
+
+    @property
+    def offsets(self):
+        """Coluna inicial de cada bloco de features, na ordem em que aparecem na matriz."""
+        offsets, start = {}, 0
+        for column in self.one_hot:
+            offsets[column] = start
+            start += len(self.vocabulary[column].labels)
+        offsets['categories'] = start
+        start += len(self.vocabulary['categories'].labels)
+        for cross in self.crosses:
+            offsets[cross] = start
+            start += 1 << self.hash_bits
+        offsets['numeric'] = start
+        return offsets
+
+    @property
+    def n_features(self):
+        return self.offsets['numeric'] + len(self.numeric)
+
+    def feature_names(self):
+        names = []
+        for column in self.one_hot:
+            names += [f'{column}={label}' for label in self.vocabulary[column].labels]
+        names += [f'Product_Category={label:g}' for label in self.vocabulary['categories'].labels]
+        for cross in self.crosses:
+            names += [f'{cross[0]}x{cross[1]}#{bucket}' for bucket in range(1 << self.hash_bits)]
+        return names + self.numeric
+
+    def transform(self, df):
+        n = len(df)
+        offsets = self.offsets
+        columns, values, valid = [], [], []
+
+        for column in self.one_hot:
+            codes = _codes(self.vocabulary[column], df[column])
+            columns.append(offsets[column] + codes)
+            valid.append(codes >= 0)
+            values.append(np.ones(n))
+
+        # Multi-hot das categorias: 0/ausente não gera coluna e uma categoria repetida na
+        # mesma linha conta uma única vez
+        category_codes = []
+        for column in self.categories:
+            codes = _codes(self.vocabulary['categories'], df[column])
+            present = codes >= 0
+            for previous in category_codes:
+                present &= codes != previous
+            columns.append(offsets['categories'] + codes)
+            valid.append(present)
+            values.append(np.ones(n))
+            category_codes.append(codes)
+
+        for j, cross in enumerate(self.crosses):
+            first = _codes(self.vocabulary[cross[0]], df[cross[0]])
+            second = _codes(self.vocabulary[cross[1]], df[cross[1]])
+            # Chave do par de códigos, distinta para cada cruzamento, espalhada pelo hash
+            key = (np.int64(j) << 48) | (first << 24) | second
+            bucket = pd.util.hash_array(key.astype(np.uint64)) & np.uint64((1 << self.hash_bits) - 1)
+            columns.append(offsets[cross] + bucket.astype(np.int64))
+            valid.append((first >= 0) & (second >= 0))
+            values.append(np.ones(n))
+
+        for j, column in enumerate(self.numeric):
+            numeric = np.asarray(df[column], dtype=np.float64)
+            columns.append(np.full(n, offsets['numeric'] + j))
+            valid.append(numeric != 0)
+            values.append(numeric)
+
+        # Cada linha tem uma posição por bloco; a máscara remove as vazias mantendo a ordem das linhas
+        columns = np.column_stack(columns)
+        values = np.column_stack(values)
+        valid = np.column_stack(valid)
+        indptr = np.concatenate([[0], np.cumsum(valid.sum(axis=1))])
+        return sp.csr_matrix((values[valid], columns[valid], indptr), shape=(n, self.n_features))
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+
+def main():
+    from sklearn.linear_model import LinearRegression, Ridge
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+    from sklearn.model_selection import train_test_split
+
+    from encoder import DEFAULT_TABLES, CategoricalEncoder
+    from loader import load_sales
+    from preprocessing import drop_outliers, fill_missing
+
+    parser = argparse.ArgumentParser(description='Treina modelos lineares com a matriz esparsa de features.')
+    parser.add_argument('--source', default='black_friday_sales.csv')
+    parser.add_argument('--crosses', action='store_true', help='inclui os cruzamentos com hashing')
+    parser.add_argument('--hash-bits', type=int, default=HASH_BITS)
+    args = parser.parse_args()
+
+    df = drop_outliers(fill_missing(load_sales(args.source)))
+    # Gender e Stay_In_Current_City_Years entram como números; Age e City_Category viram one-hot
+    df = CategoricalEncoder({column: DEFAULT_TABLES[column] for column in NUMERIC_COLUMNS
+                             if column in DEFAULT_TABLES}).transform(df)
+    train, test = train_test_split(df, test_size=0.4, random_state=42)
+    encoder = SparseEncoder(crosses=CROSSES if args.crosses else (), hash_bits=args.hash_bits).fit(train)
+    x_train, x_test = encoder.transform(train), encoder.transform(test)
+    stored = x_train.data.nbytes + x_train.indices.nbytes + x_train.indptr.nbytes
+    print(f'Matriz de treino: {x_train.shape[0]} x {x_train.shape[1]}, {x_train.nnz} valores, '
+          f'{stored / 1e6:.1f} MB (densa: {x_train.shape[0] * x_train.shape[1] * 8 / 1e6:.1f} MB)')
+
+    for model in (LinearRegression(), Ridge(alpha=1.0, solver='sparse_cg')):
+        model.fit(x_train, train['Purchase'])
+        y_pred = model.predict(x_test)
+        mse = mean_squared_error(test['Purchase'], y_pred)
+        print(f'{type(model).__name__}: MSE {mse:.2f}  RMSE {np.sqrt(mse):.2f}  '
+              f'MAE {mean_absolute_error(test["Purchase"], y_pred):.2f}')
+
+
+if __name__ == '__main__':
+    main()
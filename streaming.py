@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Modo streaming do pipeline do TP9.py, para arquivos maiores que a memória.
+#
+# O CSV é lido em blocos de tamanho fixo; cada bloco passa pelas mesmas etapas do notebook
+# (preenchimento de ausentes, remoção de outliers e codificação) e é anexado ao arquivo de
+# saída. Ao mesmo tempo são acumuladas as estatísticas da análise: contagens, somas e
+# produtos cruzados (média, desvio padrão e correlação exatos) e histogramas limitados
+# (quantis do describe() e do boxplot). O pico de memória depende só do tamanho do bloco.
+# Cada bloco lido passa antes pelo perfil de qualidade (quality.py), que interrompe a leitura
+# se uma das regras declaradas for violada. Quando as regras de outlier dependem dos dados
+# (IQR, quantis), uma primeira passada lê só as colunas dessas regras para calcular os limites.
+
+import argparse
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+import outliers
+from aggregation import Aggregator
+from columnar import EncodedWriter
+from encoder import CategoricalEncoder
+from loader import DTYPES
+from preprocessing import ENCODED_COLUMNS, encode, fill_missing
+from quality import DEFAULT_RULES, REPORT_PATH, QualityProfiler, save_report
+
+
+NUMERIC_COLUMNS = ['Occupation', 'Marital_Status', 'Product_Category_1', 'Product_Category_2',
+                   'Product_Category_3', 'Purchase']
+
+
+@dataclass
+class StreamResult:
+    rows_in: int = 0
+    rows_out: int = 0
+    chunks: int = 0
+    missing: dict = field(default_factory=dict)
+    quality: dict = None
+    outliers: pd.DataFrame = None
+    raw: Aggregator = None
+    encoded: Aggregator = None
+    seconds: float = 0.0
+
+    @property
+    def removed(self):
+        return self.rows_in - self.rows_out
+
+    def describe(self):
+        """describe() das colunas numéricas originais (antes da remoção de outliers)."""
+        return self.raw.moments.describe()
+
+    def boxplot(self, column='Purchase'):
+        return self.raw.moments.hist[column].boxplot()
+
+    def correlation(self):
+        """Correlação entre as colunas do dataframe codificado."""
+        return self.encoded.moments.correlation()
+
+
+def read_chunks(path, chunksize, usecols=None):
+    dtypes = {column: dtype for column, dtype in DTYPES.items() if usecols is None or column in usecols}
+    return pd.read_csv(path, dtype=dtypes, usecols=usecols, chunksize=chunksize)
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.header = True
+
+    def write(self, df):
+        df.to_csv(self.file, header=self.header, index=False)
+        self.header = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+
+def _output_writer(path):
+    # Arrow (padrão) ou CSV, conforme a extensão do arquivo de saída
+    return _CsvWriter(path) if path.endswith('.csv') else EncodedWriter(path)
+
+
+def stream_pipeline(source, output, chunksize=100_000, rules=DEFAULT_RULES,
+                    outlier_rules=outliers.DEFAULT_RULES):
+    """Executa limpeza, remoção de outliers e codificação bloco a bloco, gravando `output`.
+
+    Levanta quality.QualityError no primeiro bloco que violar uma das `rules`.
+    """
+    start = time.perf_counter()
+    result = StreamResult(
+        raw=Aggregator([], moments=NUMERIC_COLUMNS, histograms=NUMERIC_COLUMNS),
+        encoded=Aggregator([], moments=ENCODED_COLUMNS),
+    )
+    encoder = CategoricalEncoder()
+    profiler = None
+    columns = sorted({rule.column for rule in outlier_rules})
+    outlier_filter = outliers.OutlierFilter(
+        outliers.fit_chunks(read_chunks(source, chunksize, columns), outlier_rules))
+
+    with _output_writer(output) as writer:
+        for chunk in read_chunks(source, chunksize):
+            # Perfil de qualidade antes do preenchimento (inclui o df.isnull().sum())
+            profiler = profiler or QualityProfiler(chunk.columns, rules)
+            profiler.update(chunk)
+
+            chunk = fill_missing(chunk)
+            result.raw.update(chunk)
+
+            encoded = encode(outlier_filter.apply(chunk), encoder)
+            result.encoded.update(encoded)
+            writer.write(encoded)
+
+            result.rows_in += len(chunk)
+            result.rows_out += len(encoded)
+            result.chunks += 1
+
+    if profiler is not None:
+        profiler.check()
+        result.quality = profiler.report()
+        result.missing = dict(profiler.nulls)
+    result.outliers = outlier_filter.report()
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pipeline do TP9 em modo streaming (blocos de tamanho fixo).')
+    parser.add_argument('source', help='CSV no formato do black_friday_sales.csv')
+    parser.add_argument('output', help='arquivo codificado de saída (.arrow ou .csv)')
+    parser.add_argument('--chunksize', type=int, default=100_000, help='linhas por bloco')
+    parser.add_argument('--quality-report', default=REPORT_PATH, help='relatório de qualidade (JSON)')
+    args = parser.parse_args()
+
+    result = stream_pipeline(args.source, args.output, args.chunksize)
+    save_report(result.quality, args.quality_report)
+    print(f'{result.rows_in} registros lidos em {result.chunks} blocos ({result.seconds:.1f} s)')
+    print(f'{result.removed} outliers removidos, {result.rows_out} registros gravados em {args.output}')
+    print(result.outliers.to_string(index=False))
+    print('Valores ausentes:', {k: v for k, v in result.missing.items() if v})
+    print(result.describe())
+    print('Boxplot de Purchase:', result.boxplot())
+
+
+if __name__ == '__main__':
+    main()
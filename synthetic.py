@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Gerador de dados sintéticos no formato do black_friday_sales.csv, em qualquer escala.
+#
+# As distribuições marginais seguem as do dataset original: ~75% de compras de homens, faixa
+# 26-35 como a maior, cidade B mais frequente, "4+" em Stay_In_Current_City_Years, ocupações
+# de 0 a 20, Product_Category_2/3 ausentes em ~32% e ~70% das linhas e Purchase assimétrico,
+# com a média dependendo da categoria principal do produto. Como no original, os atributos
+# demográficos são fixos por cliente e as categorias e o preço-base são fixos por produto;
+# clientes e produtos são sorteados com pesos desiguais (poucos concentram muitas compras).
+# As linhas são geradas em blocos, de modo que 50 milhões de linhas não precisam caber na
+# memória; a saída é CSV ou Parquet, conforme a extensão.
+
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+AGES = {'0-17': 0.027, '18-25': 0.181, '26-35': 0.399, '36-45': 0.200, '46-50': 0.083,
+        '51-55': 0.070, '55+': 0.040}
+GENDERS = {'F': 0.247, 'M': 0.753}
+CITIES = {'A': 0.269, 'B': 0.420, 'C': 0.311}
+STAY_YEARS = {'0': 0.135, '1': 0.352, '2': 0.185, '3': 0.173, '4+': 0.155}
+MARITAL_STATUS = {0: 0.590, 1: 0.410}
+OCCUPATIONS = {0: 0.126, 1: 0.086, 2: 0.048, 3: 0.032, 4: 0.131, 5: 0.022, 6: 0.037, 7: 0.108,
+               8: 0.003, 9: 0.011, 10: 0.024, 11: 0.021, 12: 0.057, 13: 0.014, 14: 0.050,
+               15: 0.022, 16: 0.046, 17: 0.073, 18: 0.012, 19: 0.015, 20: 0.062}
+# Participação de cada categoria principal nas compras e valor médio de Purchase nela
+CATEGORIES = {1: (0.255, 13600), 2: (0.043, 11250), 3: (0.037, 10100), 4: (0.021, 2330),
+              5: (0.274, 6240), 6: (0.037, 15840), 7: (0.007, 16370), 8: (0.207, 7500),
+              9: (0.001, 15540), 10: (0.009, 19680), 11: (0.044, 4690), 12: (0.007, 1350),
+              13: (0.010, 720), 14: (0.003, 13140), 15: (0.011, 14780), 16: (0.018, 14770),
+              17: (0.001, 10170), 18: (0.006, 2970), 19: (0.003, 40), 20: (0.005, 370)}
+MISSING_CATEGORY_2 = 0.316
+MISSING_CATEGORY_3 = 0.697
+PURCHASE_RANGE = (12, 23961)
+
+# Proporções do dataset original (~550 mil linhas, 5.891 clientes e 3.631 produtos)
+ROWS_PER_USER = 93
+ROWS_PER_PRODUCT = 150
+CHUNK_ROWS = 1_000_000
+
+
+def _choice(rng, table, size):
+    values = np.array(list(table))
+    p = np.array(list(table.values()), dtype=np.float64)
+    return values[rng.choice(len(values), size, p=p / p.sum())]
+
+
+def _weights(rng, size, sigma):
+    weights = rng.lognormal(0.0, sigma, size)
+    return weights / weights.sum()
+
+
+class SyntheticSales:
+    """Tabelas de clientes e produtos; sample() sorteia compras a partir delas."""
+
+    def __init__(self, rows, seed=42):
+        rng = np.random.default_rng(seed)
+        self.rng = rng
+        n_users = max(rows // ROWS_PER_USER, 100)
+        n_products = max(rows // ROWS_PER_PRODUCT, 100)
+
+        self.users = pd.DataFrame({
+            'User_ID': 1_000_001 + np.arange(n_users, dtype=np.int64),
+            'Gender': _choice(rng, GENDERS, n_users),
+            'Age': _choice(rng, AGES, n_users),
+            'Occupation': _choice(rng, OCCUPATIONS, n_users),
+            'City_Category': _choice(rng, CITIES, n_users),
+            'Stay_In_Current_City_Years': _choice(rng, STAY_YEARS, n_users),
+            'Marital_Status': _choice(rng, MARITAL_STATUS, n_users),
+        })
+        self.user_weights = _weights(rng, n_users, 1.0)
+
+        categories = np.array(list(CATEGORIES))
+        share = np.array([p for p, _ in CATEGORIES.values()])
+        means = np.array([mean for _, mean in CATEGORIES.values()], dtype=np.float64)
+        pick = rng.choice(len(categories), n_products, p=share / share.sum())
+        category_2 = rng.integers(2, 19, n_products).astype(np.float32)
+        category_2[rng.random(n_products) < MISSING_CATEGORY_2] = np.nan
+        # Só produtos com categoria secundária têm terciária
+        category_3 = rng.integers(3, 19, n_products).astype(np.float32)
+        category_3[np.isnan(category_2) | (rng.random(n_products) < (MISSING_CATEGORY_3 - MISSING_CATEGORY_2)
+                                           / (1 - MISSING_CATEGORY_2))] = np.nan
+        self.products = pd.DataFrame({
+            'Product_ID': [f'P00{i:06d}' for i in rng.choice(1_000_000, n_products, replace=False)],
+            'Product_Category_1': categories[pick],
+            'Product_Category_2': category_2,
+            'Product_Category_3': category_3,
+        })
+        self.prices = means[pick] * rng.lognormal(0.0, 0.25, n_products)
+        # Produtos sorteados pela participação da sua categoria, com popularidade desigual dentro dela
+        popularity = rng.lognormal(0.0, 1.2, n_products)
+        per_category = np.bincount(pick, weights=popularity, minlength=len(categories))
+        self.product_weights = share[pick] * popularity / per_category[pick]
+        self.product_weights /= self.product_weights.sum()
+
+    def sample(self, rows):
+        """DataFrame com `rows` compras, nas colunas e na ordem do CSV original."""
+        rng = self.rng
+        users = rng.choice(len(self.users), rows, p=self.user_weights)
+        products = rng.choice(len(self.products), rows, p=self.product_weights)
+        df = pd.concat([self.users.iloc[users].reset_index(drop=True),
+                        self.products.iloc[products].reset_index(drop=True)], axis=1)
+        # Preço-base do produto com variação assimétrica à direita (descontos raros, ágio comum)
+        purchase = self.prices[products] * rng.gamma(8.0, 1 / 8.0, rows)
+        df['Purchase'] = np.clip(np.round(purchase), *PURCHASE_RANGE).astype(np.int64)
+        return df[['User_ID', 'Product_ID', 'Gender', 'Age', 'Occupation', 'City_Category',
+                   'Stay_In_Current_City_Years', 'Marital_Status', 'Product_Category_1',
+                   'Product_Category_2', 'Product_Category_3', 'Purchase']]
+
+    def chunks(self, rows, chunk_rows=CHUNK_ROWS):
+        for start in range(0, rows, chunk_rows):
+            yield self.sample(min(chunk_rows, rows - start))
+
+
+def generate(rows, seed=42):
+    """Dataset sintético inteiro em memória."""
+    return SyntheticSales(rows, seed).sample(rows)
+
+
+def write(path, rows, seed=42, chunk_rows=CHUNK_ROWS):
+    """Grava `rows` linhas sintéticas em `path` (.csv ou .parquet), um bloco por vez."""
+    chunks = SyntheticSales(rows, seed).chunks(rows, chunk_rows)
+    if path.endswith('.parquet'):
+        writer = None
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = writer or pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    else:
+        with open(path, 'w', newline='') as f:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(f, header=i == 0, index=False)
+    return path
+
+
+def parse_rows(text):
+    """'500k', '0.5M', '50M' ou '1000' -> número de linhas."""
+    text = str(text).strip().upper()
+    scale = {'K': 1_000, 'M': 1_000_000}.get(text[-1:], 1)
+    number = text[:-1] if scale > 1 else text
+    return int(round(float(number) * scale))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera dados sintéticos no formato do black_friday_sales.csv.')
+    parser.add_argument('rows', help='número de linhas (ex.: 500k, 5M, 50M)')
+    parser.add_argument('output', help='arquivo de saída (.csv ou .parquet)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    rows = parse_rows(args.rows)
+    write(args.output, rows, args.seed, args.chunk_rows)
+    print(f'{rows} linhas sintéticas -> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Visualização paginada de DataFrames grandes no dashboard.
+#
+# Filtros, ordenação e paginação são resolvidos no servidor: o navegador recebe apenas
+# a página atual, então o tamanho da resposta não depende do tamanho do dataset.
+
+import numpy as np
+import pandas as pd
+
+
+PAGE_SIZES = (25, 50, 100, 250)
+
+# Colunas com até este número de valores distintos são filtradas por seleção de valores;
+# as demais colunas numéricas são filtradas por intervalo
+MAX_FILTER_CHOICES = 30
+
+
+def summarize(df):
+    """Resumo do DataFrame: número de linhas/colunas, memória e tipos de cada coluna."""
+    memory = df.memory_usage(deep=True)
+    columns = pd.DataFrame({
+        'Tipo': df.dtypes.astype(str),
+        'Memória (MB)': (memory.drop('Index') / 1e6).round(2),
+    })
+    return {
+        'rows': len(df),
+        'columns': df.shape[1],
+        'memory_mb': memory.sum() / 1e6,
+        'dtypes': columns,
+    }
+
+
+def filter_choices(df, column):
+    """Valores possíveis para o filtro por seleção, ou None se a coluna deve ser filtrada por intervalo."""
+    series = df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if len(series.cat.categories) <= MAX_FILTER_CHOICES:
+            return list(series.cat.categories)
+        return None
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.dropna().unique()
+        if len(values) <= MAX_FILTER_CHOICES:
+            return sorted(values.tolist())
+    return None
+
+
+def _filter_mask(df, filters):
+    mask = np.ones(len(df), dtype=bool)
+    for column, kind, value in filters:
+        series = df[column]
+        if kind == 'in':
+            mask &= series.isin(value).to_numpy()
+        elif kind == 'range':
+            low, high = value
+            mask &= series.between(low, high).to_numpy()
+        else:
+            raise ValueError(f'Tipo de filtro desconhecido: {kind}')
+    return mask
+
+
+def query_index(df, filters=(), sort_by=None, ascending=True):
+    """Posições das linhas que atendem aos filtros, na ordem pedida.
+
+    `filters` é uma sequência de tuplas (coluna, 'in', valores) ou (coluna, 'range', (mín, máx)).
+    """
+    if filters:
+        index = np.flatnonzero(_filter_mask(df, filters))
+    else:
+        index = np.arange(len(df))
+
+    if sort_by is not None:
+        series = df[sort_by]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Ordena pelos códigos, que seguem a ordem das categorias
+            values = series.cat.codes.to_numpy()[index]
+        else:
+            values = series.to_numpy()[index]
+        order = np.argsort(values, kind='stable')
+        if not ascending:
+            order = order[::-1]
+        index = index[order]
+    return index
+
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
+
+
+def get_page(df, index, page, page_size):
+    """Linhas da página `page` (a partir de 1) dentre as posições em `index`."""
+    start = (page - 1) * page_size
+    return df.take(index[start:start + page_size])
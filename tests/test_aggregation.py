@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Histogram.merge deve chegar ao mesmo histograma que um único update com todos os valores.
+
+import numpy as np
+import pytest
+
+from aggregation import Histogram
+
+
+def _same(merged, single):
+    assert merged.width == single.width
+    assert merged.first == single.first
+    np.testing.assert_array_equal(merged.counts, single.counts)
+
+
+def _histogram(values, max_bins):
+    histogram = Histogram(max_bins)
+    histogram.update(values)
+    return histogram
+
+
+@pytest.mark.parametrize('left, right', [
+    # Faixas disjuntas: a união exige faixas mais largas que as dos dois histogramas
+    (np.arange(0, 1001), np.arange(5000, 9001)),
+    (np.arange(5000, 9001), np.arange(0, 1001)),
+    # Faixas sobrepostas, com larguras diferentes
+    (np.arange(0, 100), np.arange(0, 3000)),
+    # Valores negativos
+    (np.arange(-4000, -3000), np.arange(2000, 2500)),
+])
+def test_merge_matches_single_update(left, right):
+    merged = _histogram(left, 2048).merge(_histogram(right, 2048))
+    _same(merged, _histogram(np.concatenate([left, right]), 2048))
+
+
+def test_merge_partitions():
+    values = np.random.default_rng(0).integers(0, 24_000, 100_000)
+    merged = Histogram(1024)
+    for part in np.array_split(values, 7):
+        merged.merge(_histogram(part, 1024))
+    _same(merged, _histogram(values, 1024))
+
+
+def test_merge_empty():
+    histogram = _histogram(np.arange(10), 2048)
+    counts = histogram.counts.copy()
+    histogram.merge(Histogram(2048))
+    np.testing.assert_array_equal(histogram.counts, counts)
+    _same(Histogram(2048).merge(histogram), histogram)